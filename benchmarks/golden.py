@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+黄金输出回归检查
+record 在线运行主入口，录制引擎响应（见 tts_core/replay.py）并把输出保存为黄金输出；
+check 离线回放同样的录制，与黄金输出逐个比较：哈希一致为 identical，否则按波形最大误差判断是否在容差内。
+用例为标准语料的每一条（单次调用），外加一条分块合成并裁剪静音、交叉淡化拼接的长文本。
+
+用法:
+    python benchmarks/golden.py record --engine edge-tts --engine qwen3-tts
+    python benchmarks/golden.py check                 # 不访问网络，也不需要模型环境
+    python benchmarks/golden.py check --tolerance 1e-4
+输出有差异时以退出码 1 结束，可直接用于 CI。
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tts_core.profiler import CORPUS
+
+DEFAULT_DIR = Path(__file__).resolve().parent / 'golden'
+DEFAULT_TOLERANCE = 1e-3
+
+# 长文本用例：分块足够小，覆盖分块、裁剪静音与交叉淡化拼接
+LONG_CASE = 'long-joined'
+LONG_ARGS = ['--chunk-chars', '80', '--trim-silence', '--crossfade-ms', '30']
+
+
+def cases():
+    """(用例名, 文本, 额外参数)"""
+    result = [(name, text, []) for name, _, text in CORPUS]
+    result.append((LONG_CASE, '\n\n'.join(text for _, _, text in CORPUS), LONG_ARGS))
+    return result
+
+
+def sha256(path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def run_case(engine, text, extra, output, mode, recordings, work_dir) -> bool:
+    text_file = Path(work_dir) / f'{output.stem}.txt'
+    text_file.write_text(text, encoding='utf-8')
+    cmd = [sys.executable, str(ROOT / 'tts-skill.py'), engine, '--text-file', str(text_file),
+           '--output', str(output), '--format', 'wav', f'--{mode}', str(recordings)] + extra
+    env = {**os.environ, 'PYTHONIOENCODING': 'utf-8'}
+    result = subprocess.run(cmd, cwd=str(ROOT), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0 or not output.exists():
+        print(result.stdout[-2000:])
+        return False
+    return True
+
+
+def compare(golden, actual, tolerance):
+    """返回 (状态, 最大误差)"""
+    if sha256(golden) == sha256(actual):
+        return 'identical', 0.0
+    import numpy as np
+    import soundfile as sf
+    expected, expected_rate = sf.read(str(golden), dtype='float32')
+    samples, rate = sf.read(str(actual), dtype='float32')
+    if rate != expected_rate or samples.shape != expected.shape:
+        return f'FAIL: {samples.shape[0]} frames @ {rate} Hz, expected {expected.shape[0]} @ {expected_rate} Hz', None
+    error = float(np.max(np.abs(samples - expected))) if len(samples) else 0.0
+    return ('within tolerance' if error <= tolerance else 'FAIL: waveform differs'), error
+
+
+def record(args):
+    golden_dir = Path(args.dir)
+    manifest_path = golden_dir / 'golden.json'
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8')) if manifest_path.exists() else {}
+    failed = False
+    with tempfile.TemporaryDirectory(prefix='tts-golden-') as work_dir:
+        for engine in args.engine or ['edge-tts']:
+            entries = manifest.setdefault(engine, {})
+            for name, text, extra in cases():
+                output = golden_dir / 'outputs' / engine / f'{name}.wav'
+                output.parent.mkdir(parents=True, exist_ok=True)
+                if not run_case(engine, text, extra, output, 'record', golden_dir / 'recordings', work_dir):
+                    print(f"{engine:<12} {name:<14} FAIL: synthesis failed")
+                    failed = True
+                    continue
+                entries[name] = {'sha256': sha256(output)}
+                print(f"{engine:<12} {name:<14} recorded")
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+    if failed:
+        sys.exit(1)
+
+
+def check(args):
+    golden_dir = Path(args.dir)
+    manifest_path = golden_dir / 'golden.json'
+    if not manifest_path.exists():
+        print(f"no golden outputs in {golden_dir}; run `python benchmarks/golden.py record` first")
+        sys.exit(1)
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+
+    failures = []
+    checked = 0
+    with tempfile.TemporaryDirectory(prefix='tts-golden-') as work_dir:
+        for engine in args.engine or sorted(manifest):
+            for name, text, extra in cases():
+                if name not in manifest.get(engine, {}):
+                    continue
+                golden = golden_dir / 'outputs' / engine / f'{name}.wav'
+                actual = Path(work_dir) / f'{engine}-{name}.wav'
+                if not run_case(engine, text, extra, actual, 'replay', golden_dir / 'recordings', work_dir):
+                    status, error = 'FAIL: replay failed', None
+                else:
+                    status, error = compare(golden, actual, args.tolerance)
+                checked += 1
+                detail = f'  max error {error:.2e}' if error else ''
+                print(f"{engine:<12} {name:<14} {status}{detail}")
+                if status.startswith('FAIL'):
+                    failures.append(f'{engine}/{name}')
+                    if args.keep:
+                        Path(args.keep).mkdir(parents=True, exist_ok=True)
+                        shutil.copy(actual, Path(args.keep) / actual.name)
+
+    if failures:
+        print(f"\n{len(failures)} output(s) changed")
+        sys.exit(1)
+    if not checked:
+        print("no recorded cases to check")
+        sys.exit(1)
+    print(f"\nall {checked} outputs match")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TTS-Skill 黄金输出回归检查')
+    parser.add_argument('command', choices=['record', 'check'])
+    parser.add_argument('--engine', action='append', help='引擎 (可重复)；record 默认 edge-tts，check 默认全部已录制的引擎')
+    parser.add_argument('--dir', default=str(DEFAULT_DIR), help='录制与黄金输出目录 (默认 benchmarks/golden)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='哈希不一致时允许的最大采样误差 (满幅为 1.0)')
+    parser.add_argument('--keep', metavar='DIR', help='check 时把有差异的输出复制到该目录')
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args)
+    else:
+        check(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动基准与回归检查
+测量工具命令的启动耗时，并通过 -X importtime 检查启动路径上不应出现的模块
+
+用法:
+    python benchmarks/startup.py               # 默认每条命令运行 10 次
+    python benchmarks/startup.py -n 30 --budget-ms 40
+超出预算或导入了禁止模块时以退出码 1 结束，可直接用于 CI。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (命令, 启动路径上禁止出现的模块)
+FRONTEND_FORBIDDEN = ('argparse', 'subprocess', 'sqlite3', 'requests', 'numpy', 'soundfile')
+ENGINE_FORBIDDEN = ('requests', 'numpy', 'soundfile', 'sqlite3')
+
+COMMANDS = [
+    (['tts-skill.py', '--list-engines'], FRONTEND_FORBIDDEN),
+    (['tts-skill.py', '--list-voices'], FRONTEND_FORBIDDEN),
+    (['tts-skill.py', '--help'], FRONTEND_FORBIDDEN),
+    (['engines/edge-tts-cli.py', '--list-styles'], ENGINE_FORBIDDEN),
+    (['engines/openai-tts-cli.py', '--list-models'], ENGINE_FORBIDDEN),
+    (['engines/qwen3-tts-cli.py', '--list-voices'], ENGINE_FORBIDDEN),
+]
+
+
+def run_once(args, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += args
+    env = {**os.environ, 'PYTHONIOENCODING': 'utf-8', 'PYTHONDONTWRITEBYTECODE': '1'}
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=str(ROOT), env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    return time.perf_counter() - start, result
+
+
+def imported_modules(stderr):
+    """解析 -X importtime 输出，返回 {顶层模块名: 累计耗时(us)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        top = name.strip().split('.')[0]
+        modules[top] = max(modules.get(top, 0), int(cumulative_us))
+    return modules
+
+
+def median_ms(args, repeat):
+    samples = [run_once(args)[0] for _ in range(repeat)]
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TTS-Skill 冷启动基准')
+    parser.add_argument('-n', '--repeat', type=int, default=10, help='每条命令运行次数')
+    parser.add_argument('--budget-ms', type=float, default=60.0,
+                        help='相对空解释器启动的额外耗时预算 (毫秒，取中位数)')
+    parser.add_argument('--top', type=int, default=5, help='列出耗时最多的导入模块数量')
+    args = parser.parse_args()
+
+    baseline = median_ms(['-c', 'pass'], args.repeat)
+    print(f"interpreter baseline: {baseline:.1f} ms\n")
+    print(f"{'command':<45} {'median':>9} {'overhead':>9}  status")
+
+    failures = []
+    for command, forbidden in COMMANDS:
+        label = ' '.join(command)
+        elapsed = median_ms(command, args.repeat)
+        overhead = elapsed - baseline
+
+        _, result = run_once(command, importtime=True)
+        modules = imported_modules(result.stderr)
+        leaked = [name for name in forbidden if name in modules]
+
+        problems = []
+        if overhead > args.budget_ms:
+            problems.append(f"over budget ({args.budget_ms:.0f} ms)")
+        if leaked:
+            problems.append("imports " + ', '.join(leaked))
+        status = 'FAIL: ' + '; '.join(problems) if problems else 'ok'
+        print(f"{label:<45} {elapsed:>7.1f}ms {overhead:>7.1f}ms  {status}")
+
+        if problems:
+            failures.append(label)
+            heaviest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+            for name, cumulative_us in heaviest:
+                print(f"    {name:<30} {cumulative_us / 1000:>7.1f} ms")
+
+    if failures:
+        print(f"\n{len(failures)} command(s) regressed")
+        sys.exit(1)
+    print("\nall commands within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,21 +5,18 @@ Edge-TTS CLI Engine
 对接VoiceCraft在线TTS服务，支持多种微软语音
 """
 
-import os
 import sys
 import argparse
-import requests
-import json
+import time
 from pathlib import Path
-import configparser
-import re
 
-def detect_language(text: str) -> str:
-    chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
-    english_pattern = re.compile(r'[a-zA-Z]')
-    chinese_count = len(chinese_pattern.findall(text))
-    english_count = len(english_pattern.findall(text))
-    return 'zh' if chinese_count > english_count else 'en'
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tts_core.config import ConfigError, load_config
+from tts_core.enginepool import run_main
+from tts_core.lang import detect_language
+from tts_core.metrics import emit
+from tts_core.voices import EDGE_STYLES, EDGE_VOICES
 
 
 def t(lang: str, zh: str, en: str) -> str:
@@ -27,68 +24,18 @@ def t(lang: str, zh: str, en: str) -> str:
 
 class EdgeTTSClient:
     def __init__(self, config_file=None):
-        self.config = configparser.ConfigParser()
+        # 默认值、配置文件与环境变量的合并及校验见 tts_core/config.py
+        self.config = load_config('edge-tts', config_file)
 
-        if config_file and os.path.exists(config_file):
-            self.config.read(config_file, encoding='utf-8')
-        else:
-            # 默认配置
-            self.config['DEFAULT'] = {
-                'api_url': 'https://tts.wangwangit.com/v1/audio/speech',
-                'voice': 'zh-CN-XiaoxiaoNeural',
-                'speed': '1.0',
-                'pitch': '0',
-                'style': 'general'
-            }
-
-        self.api_url = self.config.get('DEFAULT', 'api_url')
-        self.default_voice = self.config.get('DEFAULT', 'voice')
-        self.default_speed = float(self.config.get('DEFAULT', 'speed'))
-        self.default_pitch = self.config.get('DEFAULT', 'pitch')
-        self.default_style = self.config.get('DEFAULT', 'style')
-
-        # 支持的语音列表
-        self.supported_voices = {
-            # 女声
-            'xiaoxiao': 'zh-CN-XiaoxiaoNeural',      # 晓晓 (温柔)
-            'xiaoyi': 'zh-CN-XiaoyiNeural',          # 晓伊 (甜美)
-            'xiaochen': 'zh-CN-XiaochenNeural',      # 晓辰 (知性)
-            'xiaohan': 'zh-CN-XiaohanNeural',        # 晓涵 (优雅)
-            'xiaomeng': 'zh-CN-XiaomengNeural',      # 晓梦 (梦幻)
-            'xiaomo': 'zh-CN-XiaomoNeural',          # 晓墨 (文艺)
-            'xiaoqiu': 'zh-CN-XiaoqiuNeural',        # 晓秋 (成熟)
-            'xiaorui': 'zh-CN-XiaoruiNeural',        # 晓睿 (智慧)
-            'xiaoshuang': 'zh-CN-XiaoshuangNeural',  # 晓双 (活泼)
-            'xiaoxuan': 'zh-CN-XiaoxuanNeural',      # 晓萱 (清新)
-            'xiaoyan': 'zh-CN-XiaoyanNeural',        # 晓颜 (柔美)
-            'xiaoyou': 'zh-CN-XiaoyouNeural',        # 晓悠 (悠扬)
-            'xiaozhen': 'zh-CN-XiaozhenNeural',      # 晓甄 (端庄)
-
-            # 男声
-            'yunxi': 'zh-CN-YunxiNeural',            # 云希 (清朗)
-            'yunyang': 'zh-CN-YunyangNeural',        # 云扬 (阳光)
-            'yunjian': 'zh-CN-YunjianNeural',        # 云健 (稳重)
-            'yunfeng': 'zh-CN-YunfengNeural',        # 云枫 (磁性)
-            'yunhao': 'zh-CN-YunhaoNeural',          # 云皓 (豪迈)
-            'yunxia': 'zh-CN-YunxiaNeural',          # 云夏 (热情)
-            'yunye': 'zh-CN-YunyeNeural',            # 云野 (野性)
-            'yunze': 'zh-CN-YunzeNeural',            # 云泽 (深沉)
-        }
+        self.api_url = self.config['api_url']
+        self.default_voice = self.config['voice']
+        self.default_speed = self.config['speed']
+        self.default_pitch = self.config['pitch']
+        self.default_style = self.config['style']
 
-        # 支持的语音风格
-        self.supported_styles = [
-            'general',           # 通用风格
-            'assistant',         # 智能助手
-            'chat',             # 聊天对话
-            'customerservice',   # 客服专业
-            'newscast',         # 新闻播报
-            'affectionate',     # 亲切温暖
-            'calm',             # 平静舒缓
-            'cheerful',         # 愉快欢乐
-            'gentle',           # 温和柔美
-            'lyrical',          # 抒情诗意
-            'serious',          # 严肃正式
-        ]
+        # 支持的语音与风格，见 tts_core/voices.py
+        self.supported_voices = {key: voice.voice_id for key, voice in EDGE_VOICES.items()}
+        self.supported_styles = list(EDGE_STYLES)
 
     def find_voice_by_keyword(self, keyword):
         """根据关键词查找匹配的语音"""
@@ -108,14 +55,10 @@ class EdgeTTSClient:
 
     def generate_speech(self, text, voice=None, speed=None, pitch=None, style=None, output_path=None):
         """生成语音"""
-        def sanitize_filename_part(value: str) -> str:
-            if not value:
-                return "tts"
-            value = value.strip().replace("\n", " ").replace("\r", " ")
-            value = re.sub(r"\s+", "_", value)
-            value = re.sub(r'[<>:"/\\\\|?*]', "", value)
-            value = value.strip(" ._")
-            return value or "tts"
+        # requests 导入较慢，仅在真正发起请求时加载（回放录制时不加载），--list-* 等工具命令无需等待
+        from tts_core.outputs import atomic_open, new_output_path
+        from tts_core.replay import http_post, request_error
+        request_errors = request_error()
 
         lang = detect_language(text)
 
@@ -143,44 +86,34 @@ class EdgeTTSClient:
             print(t(lang, f"文本内容: {text[:50]}{'...' if len(text) > 50 else ''}", f"Text: {text[:50]}{'...' if len(text) > 50 else ''}"))
             print(t(lang, f"参数: 语速={selected_speed}, 音调={selected_pitch}, 风格={selected_style}", f"Params: speed={selected_speed}, pitch={selected_pitch}, style={selected_style}"))
 
-            # 发送请求
-            response = requests.post(
-                self.api_url,
-                headers={'Content-Type': 'application/json'},
-                data=json.dumps(payload),
-                stream=True
-            )
+            # 发送请求（HTTP 往返耗时计到响应体下载完成）
+            request_start = time.perf_counter()
+            response = http_post('edge-tts', self.api_url, payload,
+                                 headers={'Content-Type': 'application/json'}, stream=True)
 
             if response.status_code == 200:
                 # 设置输出路径
                 if not output_path:
-                    # 生成默认文件名：日期+文本前6个字
-                    import time
-                    date_str = time.strftime("%Y%m%d_%H%M%S")
-                    prefix = text[:6] if len(text) >= 6 else text
-                    prefix = sanitize_filename_part(prefix)
-                    filename = f"{date_str}_{prefix}.mp3"
-
-                    # 默认输出到上级目录的output文件夹
-                    output_dir = Path(__file__).parent.parent / 'output'
-                    output_dir.mkdir(exist_ok=True)
-                    output_path = output_dir / filename
+                    # 生成默认文件名：日期+文本前6个字，默认输出到上级目录的output文件夹
+                    output_path = new_output_path(Path(__file__).parent.parent / 'output', text, 'mp3')
                 else:
-                    # 确保输出目录存在
                     output_path = Path(output_path)
-                    output_path.parent.mkdir(exist_ok=True, parents=True)
 
-                # 保存音频文件
-                with open(output_path, 'wb') as f:
+                # 保存音频文件（先写临时文件，完成后原子替换）
+                with atomic_open(output_path) as f:
                     for chunk in response.iter_content(chunk_size=8192):
                         f.write(chunk)
+                emit('tts_http_request_seconds', time.perf_counter() - request_start,
+                     engine='edge-tts', status=str(response.status_code))
 
                 return True, str(output_path)
             else:
+                emit('tts_http_request_seconds', time.perf_counter() - request_start,
+                     engine='edge-tts', status=str(response.status_code))
                 error_msg = response.json().get('error', 'Unknown error') if response.headers.get('content-type', '').startswith('application/json') else response.text
                 return False, t(lang, f"API请求失败 ({response.status_code}): {error_msg}", f"API request failed ({response.status_code}): {error_msg}")
 
-        except requests.exceptions.RequestException as e:
+        except request_errors as e:
             return False, t(lang, f"网络请求错误: {str(e)}", f"Network error: {str(e)}")
         except Exception as e:
             return False, t(lang, f"生成失败: {str(e)}", f"Generation failed: {str(e)}")
@@ -188,17 +121,11 @@ class EdgeTTSClient:
     def list_voices(self):
         """列出所有支持的语音"""
         print("支持的语音列表:")
-        print("\n女声:")
-        female_voices = {k: v for k, v in self.supported_voices.items() if 'xia' in k}
-        for key, voice_id in female_voices.items():
-            name = voice_id.split('-')[-1].replace('Neural', '')
-            print(f"  {key} -> {voice_id} ({name})")
-
-        print("\n男声:")
-        male_voices = {k: v for k, v in self.supported_voices.items() if 'yun' in k}
-        for key, voice_id in male_voices.items():
-            name = voice_id.split('-')[-1].replace('Neural', '')
-            print(f"  {key} -> {voice_id} ({name})")
+        for gender, title in (('female', '女声'), ('male', '男声')):
+            print(f"\n{title}:")
+            for key, voice in EDGE_VOICES.items():
+                if voice.gender == gender:
+                    print(f"  {key} -> {voice.voice_id} ({voice.name}, {voice.description})")
 
         print(f"\n默认语音: {self.default_voice}")
 
@@ -213,7 +140,7 @@ def main():
     parser.add_argument('text', nargs='?', help='要转换为语音的文本内容')
     parser.add_argument('--voice', '-v', help='语音选择 (如: xiaoxiao, yunxi)')
     parser.add_argument('--output', '-o', help='输出文件路径')
-    parser.add_argument('--text-file', '-f', help='从文本文件读取内容')
+    parser.add_argument('--text-file', '-f', help='从文本文件读取内容 (- 表示标准输入)')
     parser.add_argument('--speed', '-s', type=float, help='语速 (0.5-2.0)')
     parser.add_argument('--pitch', '-p', help='音调 (-50 到 50)')
     parser.add_argument('--style', help='语音风格')
@@ -224,7 +151,11 @@ def main():
     args = parser.parse_args()
 
     # 初始化客户端
-    client = EdgeTTSClient(args.config)
+    try:
+        client = EdgeTTSClient(args.config)
+    except ConfigError as e:
+        print(f"ERROR: 配置无效: {e}")
+        sys.exit(1)
 
     if args.list_voices:
         client.list_voices()
@@ -236,7 +167,10 @@ def main():
 
     # 获取文本内容
     text = ""
-    if args.text_file:
+    if args.text_file == '-':
+        # 主入口通过标准输入传递文本，不受命令行长度限制
+        text = sys.stdin.read().strip()
+    elif args.text_file:
         with open(args.text_file, 'r', encoding='utf-8') as f:
             text = f.read().strip()
     elif args.text:
@@ -244,11 +178,11 @@ def main():
     else:
         print("❌ 请提供文本内容或文本文件")
         parser.print_help()
-        return
+        sys.exit(1)
 
     if not text:
         print("❌ 文本内容不能为空")
-        return
+        sys.exit(1)
 
     lang = detect_language(text)
 
@@ -266,6 +200,7 @@ def main():
         print(t(lang, f"语音生成成功: {result}", f"Success: {result}"))
     else:
         print(t(lang, f"生成失败: {result}", f"Failed: {result}"))
+        sys.exit(1)
 
 if __name__ == '__main__':
-    main()
+    run_main(main)
@@ -5,22 +5,18 @@ OpenAI-TTS CLI Engine
 对接OpenAI TTS API，支持高质量语音生成
 """
 
-import os
 import sys
 import argparse
-import requests
-import json
-from pathlib import Path
-import configparser
 import time
-import re
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def detect_language(text: str) -> str:
-    chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
-    english_pattern = re.compile(r'[a-zA-Z]')
-    chinese_count = len(chinese_pattern.findall(text))
-    english_count = len(english_pattern.findall(text))
-    return 'zh' if chinese_count > english_count else 'en'
+from tts_core.config import ConfigError, load_config
+from tts_core.enginepool import run_main
+from tts_core.lang import detect_language
+from tts_core.metrics import emit
+from tts_core.voices import OPENAI_VOICES
 
 
 def t(lang: str, zh: str, en: str) -> str:
@@ -34,75 +30,37 @@ if sys.stderr.encoding != 'utf-8':
 
 class OpenAITTSClient:
     def __init__(self, config_file=None):
-        self.config = configparser.ConfigParser()
-
-        # 查找配置文件
-        config_paths = [
-            config_file,
-            './openai-tts.config',
-            str(Path(__file__).parent / 'openai-tts.config'),
-            str(Path(__file__).parent.parent / 'openai-tts.config')
-        ]
-
-        config_loaded = False
-        for path in config_paths:
-            if path and os.path.exists(path):
-                self.config.read(path, encoding='utf-8')
-                config_loaded = True
-                break
-
-        if not config_loaded:
-            # 默认配置
-            self.config['OpenAI'] = {
-                'api_key': '',
-                'base_url': 'https://api.openai.com/v1',
-                'voice': 'alloy',
-                'model': 'tts-1',
-                'speed': '1.0',
-                'output_format': 'mp3'
-            }
-
-        # 从配置文件读取设置
-        try:
-            openai_config = self.config['OpenAI']
-        except KeyError:
-            openai_config = self.config['DEFAULT'] if 'DEFAULT' in self.config else {}
-
-        self.api_key = openai_config.get('api_key', '')
-        base_url = openai_config.get('base_url', 'https://api.openai.com/v1')
-        self.api_url = f"{base_url.rstrip('/')}/audio/speech"
-        self.default_voice = openai_config.get('voice', 'alloy')
-        self.default_model = openai_config.get('model', 'tts-1')
-        self.default_speed = float(openai_config.get('speed', '1.0'))
-        self.output_format = openai_config.get('output_format', 'mp3')
-
-        # 支持的语音
+        # 默认值、配置文件与环境变量的合并及校验见 tts_core/config.py
+        self.config = load_config('openai-tts', config_file)
+
+        self.api_key = self.config['api_key']
+        self.api_url = f"{self.config['base_url'].rstrip('/')}/audio/speech"
+        self.default_voice = self.config['voice']
+        self.default_model = self.config['model']
+        self.default_speed = self.config['speed']
+        self.output_format = self.config['output_format']
+        self.timeout = self.config['timeout']
+
+        # 支持的语音，见 tts_core/voices.py
         self.supported_voices = {
-            'alloy': {'zh': '中性平衡的声音', 'en': 'Neutral and balanced'},
-            'echo': {'zh': '深沉有磁性的声音', 'en': 'Deep and resonant'},
-            'fable': {'zh': '轻快活泼的声音', 'en': 'Light and lively'},
-            'onyx': {'zh': '严肃有力的声音', 'en': 'Serious and powerful'},
-            'nova': {'zh': '温暖女性的声音', 'en': 'Warm and feminine'},
-            'shimmer': {'zh': '清晰悦耳的声音', 'en': 'Clear and bright'}
+            voice: {'zh': zh, 'en': en} for voice, (_, zh, en) in OPENAI_VOICES.items()
         }
 
+        # 支持的输出格式 (response_format)
+        self.supported_formats = ['mp3', 'opus', 'aac', 'flac', 'wav', 'pcm']
+
         # 支持的模型
         self.supported_models = {
             'tts-1': {'zh': '标准质量 (快速)', 'en': 'Standard quality (fast)'},
             'tts-1-hd': {'zh': '高质量 (较慢)', 'en': 'High quality (slower)'}
         }
 
-    def generate_speech(self, text, voice=None, model=None, speed=None, output_path=None):
+    def generate_speech(self, text, voice=None, model=None, speed=None, output_path=None, output_format=None):
         """生成语音"""
-        def sanitize_filename_part(value: str) -> str:
-            if not value:
-                return "tts"
-            value = value.strip().replace("\n", " ").replace("\r", " ")
-            value = "_".join(value.split())
-            invalid_chars = '<>:"/\\|?*'
-            value = "".join(c for c in value if c not in invalid_chars)
-            value = value.strip(" ._") or "tts"
-            return value
+        # requests 导入较慢，仅在真正发起请求时加载（回放录制时不加载），--list-* 等工具命令无需等待
+        from tts_core.outputs import atomic_open, new_output_path
+        from tts_core.replay import http_post, request_error
+        request_errors = request_error()
 
         lang = detect_language(text)
 
@@ -113,6 +71,7 @@ class OpenAITTSClient:
         selected_voice = voice or self.default_voice
         selected_model = model or self.default_model
         selected_speed = speed or self.default_speed
+        selected_format = output_format or self.output_format
 
         # 验证参数
         if selected_voice not in self.supported_voices:
@@ -124,13 +83,16 @@ class OpenAITTSClient:
         if not 0.25 <= selected_speed <= 4.0:
             return False, t(lang, f"❌ 语速超出范围 (0.25-4.0): {selected_speed}", f"❌ Speed out of range (0.25-4.0): {selected_speed}")
 
+        if selected_format not in self.supported_formats:
+            return False, t(lang, f"❌ 不支持的输出格式: {selected_format}", f"❌ Unsupported output format: {selected_format}")
+
         # 准备请求数据
         payload = {
             'model': selected_model,
             'input': text,
             'voice': selected_voice,
             'speed': selected_speed,
-            'response_format': 'mp3'
+            'response_format': selected_format
         }
 
         try:
@@ -141,28 +103,28 @@ class OpenAITTSClient:
             print(t(lang, f"📝 文本内容: {text[:50]}{'...' if len(text) > 50 else ''}", f"📝 Text: {text[:50]}{'...' if len(text) > 50 else ''}"))
             print(t(lang, f"⚡ 语速: {selected_speed}", f"⚡ Speed: {selected_speed}"))
 
-            # 发送请求
-            response = requests.post(
+            # 发送请求（HTTP 往返耗时计到响应体下载完成）
+            request_start = time.perf_counter()
+            response = http_post(
+                'openai-tts',
                 self.api_url,
+                payload,
                 headers={
                     'Authorization': f'Bearer {self.api_key}',
                     'Content-Type': 'application/json'
                 },
-                data=json.dumps(payload)
+                timeout=self.timeout or None
             )
+            emit('tts_http_request_seconds', time.perf_counter() - request_start,
+                 engine='openai-tts', status=str(response.status_code))
 
             if response.status_code == 200:
                 # 设置输出路径
                 if not output_path:
-                    timestamp = time.strftime("%Y%m%d_%H%M%S")
-                    prefix = sanitize_filename_part(text[:6] if len(text) >= 6 else text)
-                    filename = f"{timestamp}_{prefix}.mp3"
-                    output_dir = Path(__file__).parent.parent / 'output'
-                    output_dir.mkdir(exist_ok=True)
-                    output_path = str(output_dir / filename)
-
-                # 保存音频文件
-                with open(output_path, 'wb') as f:
+                    output_path = str(new_output_path(Path(__file__).parent.parent / 'output', text, selected_format))
+
+                # 保存音频文件（先写临时文件，完成后原子替换）
+                with atomic_open(output_path) as f:
                     f.write(response.content)
 
                 return True, output_path
@@ -170,7 +132,7 @@ class OpenAITTSClient:
                 error_msg = response.json().get('error', {}).get('message', 'Unknown error') if response.headers.get('content-type', '').startswith('application/json') else response.text
                 return False, t(lang, f"API请求失败 ({response.status_code}): {error_msg}", f"API request failed ({response.status_code}): {error_msg}")
 
-        except requests.exceptions.RequestException as e:
+        except request_errors as e:
             return False, t(lang, f"网络请求错误: {str(e)}", f"Network error: {str(e)}")
         except Exception as e:
             return False, t(lang, f"生成失败: {str(e)}", f"Generation failed: {str(e)}")
@@ -195,8 +157,9 @@ def main():
     parser.add_argument('--voice', '-v', help='语音选择 (alloy, echo, fable, onyx, nova, shimmer)')
     parser.add_argument('--model', '-m', help='TTS模型 (tts-1, tts-1-hd)')
     parser.add_argument('--output', '-o', help='输出文件路径')
-    parser.add_argument('--text-file', '-f', help='从文本文件读取内容')
+    parser.add_argument('--text-file', '-f', help='从文本文件读取内容 (- 表示标准输入)')
     parser.add_argument('--speed', '-s', type=float, help='语速 (0.25-4.0)')
+    parser.add_argument('--format', help='输出格式 (mp3, opus, aac, flac, wav, pcm)，默认读取配置文件的 output_format')
     parser.add_argument('--list-voices', action='store_true', help='列出可用的语音')
     parser.add_argument('--list-models', action='store_true', help='列出可用的模型')
     parser.add_argument('--config', help='配置文件路径')
@@ -204,7 +167,11 @@ def main():
     args = parser.parse_args()
 
     # 初始化客户端
-    client = OpenAITTSClient(args.config)
+    try:
+        client = OpenAITTSClient(args.config)
+    except ConfigError as e:
+        print(f"ERROR: 配置无效: {e}")
+        sys.exit(1)
 
     if args.list_voices:
         client.list_voices()
@@ -216,7 +183,10 @@ def main():
 
     # 获取文本内容
     text = ""
-    if args.text_file:
+    if args.text_file == '-':
+        # 主入口通过标准输入传递文本，不受命令行长度限制
+        text = sys.stdin.read().strip()
+    elif args.text_file:
         with open(args.text_file, 'r', encoding='utf-8') as f:
             text = f.read().strip()
     elif args.text:
@@ -224,11 +194,11 @@ def main():
     else:
         print("❌ 请提供文本内容或文本文件")
         parser.print_help()
-        return
+        sys.exit(1)
 
     if not text:
         print("❌ 文本内容不能为空")
-        return
+        sys.exit(1)
 
     lang = detect_language(text)
 
@@ -238,13 +208,15 @@ def main():
         voice=args.voice,
         model=args.model,
         speed=args.speed,
-        output_path=args.output
+        output_path=args.output,
+        output_format=args.format
     )
 
     if success:
         print(t(lang, f"✅ 语音生成成功: {result}", f"✅ Success: {result}"))
     else:
         print(t(lang, f"❌ {result}", f"❌ {result}"))
+        sys.exit(1)
 
 if __name__ == '__main__':
-    main()
+    run_main(main)
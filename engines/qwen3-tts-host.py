@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Qwen3-TTS 常驻模型进程
+在 qwen3-tts 虚拟环境中运行（由 qwen3-tts-cli.py 经 micromamba 启动），模型在第一个作业时加载，
+之后的作业直接推理；空闲卸载与内存上限见 tts_core/modelhost.py
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tts_core.modelhost import serve
+
+MODEL_ID = 'Qwen/Qwen3-TTS-12Hz-0.6B-Base'
+
+
+class Qwen3Host:
+    """持有已加载的模型，逐个执行生成作业"""
+
+    def __init__(self, model_dir: str):
+        self.model_dir = model_dir
+        self.model = None
+
+    def load(self, t):
+        """下载（如果未下载）并加载模型，返回加载耗时"""
+        from modelscope import snapshot_download
+        from qwen_tts import Qwen3TTSModel
+
+        print("\n" + t("📥 下载/加载 Qwen3-TTS 模型...", "📥 Loading Qwen3-TTS model..."))
+        configured_model_dir = Path(self.model_dir)
+        if configured_model_dir.exists():
+            try:
+                any_file = any(configured_model_dir.rglob('*'))
+            except Exception:
+                any_file = False
+
+            if any_file:
+                print(t("✅ 检测到本地模型目录，跳过下载: ", "✅ Local model directory detected, skipping download: ") + str(configured_model_dir))
+                model_dir = str(configured_model_dir)
+            else:
+                print(t("⚠️  本地模型目录为空，将尝试下载: ", "⚠️  Local model directory is empty, will try to download: ") + str(configured_model_dir))
+                model_dir = snapshot_download(MODEL_ID, local_dir=str(configured_model_dir))
+        else:
+            try:
+                model_dir = snapshot_download(MODEL_ID, local_dir=str(configured_model_dir))
+            except Exception as e:
+                print(t("模型下载警告: ", "Model download warning: ") + str(e))
+                model_dir = str(configured_model_dir)
+
+        print(t("🔧 初始化模型...", "🔧 Initializing model..."))
+        load_start = time.time()
+        self.model = Qwen3TTSModel.from_pretrained(model_dir)
+        return time.time() - load_start
+
+    def __call__(self, job: dict) -> int:
+        lang = job.get('lang', 'zh')
+
+        def t(zh: str, en: str) -> str:
+            return zh if lang == 'zh' else en
+
+        # 作业的环境变量（指标文件、剖析文件）只在本次作业内生效
+        saved_env = {name: os.environ.get(name) for name in job.get('env', {})}
+        os.environ.update(job.get('env', {}))
+        try:
+            return self.generate(job, t)
+        except Exception as e:
+            print("\n" + t("❌ 错误: ", "❌ Error: ") + str(e))
+            import traceback
+            traceback.print_exc()
+            return 1
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def generate(self, job: dict, t) -> int:
+        import numpy as np
+        from tqdm import tqdm
+
+        from tts_core.audio import resample, write_audio
+        from tts_core.metrics import emit
+
+        text = job['text']
+        reference_audio = job['reference_audio']
+        start_time = time.time()
+        generation_start = time.time()
+
+        print(t("⏰ 开始时间: ", "⏰ Start time: ") + time.strftime('%Y-%m-%d %H:%M:%S'))
+        preview = text if len(text) <= 50 else text[:50] + "..."
+        print(t("📝 输入文本: ", "📝 Input text: ") + preview + " (" + str(len(text)) + t(" 字)", " chars)"))
+        print(t("🎵 参考音频: ", "🎵 Reference audio: ") + os.path.basename(reference_audio) + "...")
+
+        if self.model is None:
+            load_time = self.load(t)
+            emit('tts_model_load_seconds', load_time, engine='qwen3-tts')
+        else:
+            print(t("♻️  复用已加载的模型", "♻️  Reusing the loaded model"))
+
+        if job.get('seed') is not None:
+            # 录制模式固定随机种子，相同输入得到相同的音频
+            import random
+            import torch
+            random.seed(job['seed'])
+            np.random.seed(job['seed'])
+            torch.manual_seed(job['seed'])
+
+        # 读取参考文本
+        with open(job['reference_text'], 'r', encoding='utf-8') as f:
+            ref_text = f.read().strip()
+
+        # 进度跟踪变量；结束时通过事件唤醒进度线程，不必等它睡满一个周期
+        progress_status = {'progress': 0}
+        stop_progress = threading.Event()
+
+        # 创建进度条和预计完成时间显示
+        print("\n" + t("🎵 正在生成语音...", "🎵 Generating audio..."))
+        progress_bar = tqdm(
+            total=100,
+            desc=t("语音生成进度", "Generation progress"),
+            bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_noinv_fmt}]",
+            ncols=80
+        )
+
+        def update_progress():
+            """更新进度条的后台线程"""
+            while not stop_progress.is_set() and progress_status['progress'] < 100:
+                elapsed = time.time() - generation_start
+                # 基于文本长度估算进度（假设每字0.5秒）
+                estimated_total_time = len(text) * 0.5
+                progress_status['progress'] = min(99, int((elapsed / estimated_total_time) * 100))
+                progress_bar.set_description(t("语音生成进度", "Generation progress") + " (" + str(progress_status['progress']) + "%)")
+                progress_bar.update(max(0, progress_status['progress'] - progress_bar.n))
+                stop_progress.wait(0.5)
+
+            # 完成时更新到100%
+            if progress_status['progress'] < 100:
+                progress_bar.update(100 - progress_bar.n)
+            progress_bar.close()
+
+        progress_thread = threading.Thread(target=update_progress)
+        progress_thread.start()
+        try:
+            # 生成语音；设置 TTS_PROFILE_FILE 时只对推理部分做 cProfile
+            profile_file = os.environ.get('TTS_PROFILE_FILE')
+            if profile_file:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            inference_start = time.time()
+            result = self.model.generate_voice_clone(
+                text=text,
+                ref_audio=reference_audio,
+                ref_text=ref_text,
+                x_vector_only_mode=False
+            )
+            inference_time = time.time() - inference_start
+            if profile_file:
+                profiler.disable()
+                profiler.dump_stats(profile_file)
+        finally:
+            # 停止进度条
+            stop_progress.set()
+            progress_thread.join()
+
+        # 处理不同的返回格式
+        if isinstance(result, tuple) and len(result) == 2:
+            wavs, sample_rate = result
+        else:
+            # 如果只返回音频数据，使用默认采样率
+            wavs = result
+            sample_rate = 22050
+
+        generation_time = time.time() - generation_start
+        emit('tts_inference_seconds', inference_time, engine='qwen3-tts', voice=Path(reference_audio).stem)
+
+        # 保存结果：在当前进程内完成重采样与编码，无需额外的转码步骤
+        audio = wavs[0]
+        target_sample_rate = job.get('sample_rate')
+        if target_sample_rate and target_sample_rate != sample_rate:
+            audio = resample(np.asarray(audio, dtype=np.float32), sample_rate, target_sample_rate)
+            sample_rate = target_sample_rate
+
+        output_path = job['output_path']
+        write_audio(output_path, audio, sample_rate, job.get('output_format', 'wav'))
+
+        # 计算统计信息
+        total_time = time.time() - start_time
+        text_length = len(text)
+        time_per_char = generation_time / text_length if text_length > 0 else 0
+
+        print("\n" + t("✅ 语音生成成功!", "✅ Generation succeeded!"))
+        print(t("📁 输出文件: ", "📁 Output file: ") + str(output_path))
+        print(t("🎵 采样率: ", "🎵 Sample rate: ") + str(sample_rate) + " Hz")
+        print(t("⏱️  音频长度: ", "⏱️  Audio duration: ") + str(len(audio) / sample_rate) + t(" 秒", " seconds"))
+
+        print("\n" + t("📊 性能统计:", "📊 Stats:"))
+        print(t("   总用时: ", "   Total time: ") + str(total_time/60) + t(" 分钟 (", " min (") + str(total_time) + t(" 秒)", " s)"))
+        print(t("   生成用时: ", "   Generation time: ") + str(generation_time/60) + t(" 分钟 (", " min (") + str(generation_time) + t(" 秒)", " s)"))
+        print(t("   文本长度: ", "   Text length: ") + str(text_length) + t(" 字", " chars"))
+        print(t("   平均每字用时: ", "   Avg time per char: ") + str(time_per_char) + t(" 秒", " s"))
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Qwen3-TTS 常驻模型进程')
+    parser.add_argument('--state', required=True, help='状态文件路径（端口与令牌）')
+    parser.add_argument('--model-dir', required=True, help='模型目录路径')
+    parser.add_argument('--idle-unload', type=float, default=300, help='空闲多少秒后退出并释放模型 (0 为每个作业后退出)')
+    parser.add_argument('--max-rss-mb', type=float, default=0, help='作业完成后内存超过该值 (MB) 即退出，0 为不限')
+    args = parser.parse_args()
+
+    serve(args.state, Qwen3Host(args.model_dir), idle_unload=args.idle_unload, max_rss_mb=args.max_rss_mb)
+
+
+if __name__ == '__main__':
+    main()
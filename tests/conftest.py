@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""tts_core 不是安装包，测试从仓库根目录导入"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+@pytest.fixture(scope='session')
+def cli():
+    """主入口脚本 tts-skill.py（文件名含连字符，按路径加载）"""
+    spec = importlib.util.spec_from_file_location('tts_skill_cli', ROOT_DIR / 'tts-skill.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""音频后处理（tts_core/audio.py）"""
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from tts_core import audio
+
+RATE = 16000
+
+
+def tone(seconds=0.5, rate=RATE, amplitude=0.3, freq=440.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_format_from_path():
+    assert audio.format_from_path('a/b.FLAC') == 'flac'
+    assert audio.format_from_path('b.ogg') == 'opus'
+    assert audio.format_from_path('b.aac') is None
+    assert audio.format_from_path('b.aac', 'wav') == 'wav'
+
+
+def test_resample_keeps_duration():
+    samples = tone(1.0)
+    out = audio.resample(samples, RATE, 24000)
+    assert out.dtype == np.float32 and abs(len(out) - 24000) <= 1
+    assert audio.resample(samples, RATE, RATE) is samples
+
+
+def test_normalize_loudness_hits_target_and_limits_peak():
+    samples = tone(1.0, amplitude=0.05)
+    out = audio.normalize_loudness(samples, RATE, -20.0)
+    assert audio.measure_loudness(out, RATE) == pytest.approx(-20.0, abs=0.5)
+    # 目标过高时峰值被限制在 -1 dBFS
+    loud = audio.normalize_loudness(samples, RATE, 0.0)
+    assert np.max(np.abs(loud)) <= 10 ** (-1 / 20) + 1e-6
+    silent = np.zeros(RATE, dtype=np.float32)
+    assert audio.normalize_loudness(silent, RATE, -20.0) is silent
+
+
+@pytest.mark.parametrize('fmt', ['wav', 'flac'])
+def test_process_file_converts_and_removes_source(tmp_path, fmt):
+    src = tmp_path / 'in.wav'
+    sf.write(str(src), tone(), RATE)
+    dst = tmp_path / f'out.{fmt}'
+    assert audio.process_file(src, dst, sample_rate=24000) == str(dst)
+    assert not src.exists()
+    info = sf.info(str(dst))
+    assert info.samplerate == 24000 and info.duration == pytest.approx(0.5, abs=0.01)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [dst.name]
+
+
+def test_write_audio_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        audio.write_audio(tmp_path / 'out.aac', tone(), RATE, 'aac')
+
+
+def test_concat_files_resamples_each_part(tmp_path):
+    first, second = tmp_path / '1.wav', tmp_path / '2.wav'
+    sf.write(str(first), tone(0.5), RATE)
+    sf.write(str(second), tone(0.5, rate=24000), 24000)
+    dst = tmp_path / 'joined.wav'
+    audio.concat_files([first, second], dst)
+    info = sf.info(str(dst))
+    # 输出采样率取第一个片段
+    assert info.samplerate == RATE and info.duration == pytest.approx(1.0, abs=0.01)
+    assert not first.exists() and not second.exists()
+
+
+def test_concat_writer_abort_leaves_nothing(tmp_path):
+    src = tmp_path / '1.wav'
+    sf.write(str(src), tone(), RATE)
+    writer = audio.ConcatWriter(tmp_path / 'out.wav', loudness=-20.0)
+    writer.add(src)
+    writer.abort()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['1.wav']
+    with pytest.raises(ValueError):
+        audio.ConcatWriter(tmp_path / 'out.wav').close()
+
+
+def test_trim_silence_keeps_padding():
+    silence = np.zeros(RATE // 2, dtype=np.float32)
+    samples = np.concatenate([silence, tone(0.5), silence])
+    trimmed = audio.trim_silence(samples, RATE)
+    pad = int(RATE * 0.02)
+    assert len(trimmed) == pytest.approx(RATE // 2 + 2 * pad, abs=RATE // 100)
+    # 整段静音原样返回
+    assert audio.trim_silence(silence, RATE) is silence
+
+
+def _join(parts, **options):
+    written = []
+    joiner = audio.SegmentJoiner(written.append, RATE, **options)
+    for part in parts:
+        joiner.add(part)
+    joiner.close()
+    return np.concatenate(written)
+
+
+def test_segment_joiner_gap_and_crossfade():
+    a, b = np.ones(1600, dtype=np.float32), np.ones(1600, dtype=np.float32)
+    assert len(_join([a, b])) == 3200
+    gapped = _join([a, b], gap_ms=50)
+    assert len(gapped) == 3200 + 800 and not gapped[1600:2400].any()
+    # 交叉淡化重叠 crossfade_ms，等功率曲线下常数信号的幅度不超过 sqrt(2)
+    faded = _join([a, b], crossfade_ms=50)
+    assert len(faded) == 3200 - 800
+    assert np.max(faded) <= np.sqrt(2) + 1e-6
+    # 间隔优先于交叉淡化
+    assert len(_join([a, b], gap_ms=50, crossfade_ms=50)) == 4000
+
+
+def test_concat_writer_normalizes_joined_output(tmp_path):
+    quiet, loud = tmp_path / 'quiet.wav', tmp_path / 'loud.wav'
+    sf.write(str(quiet), tone(1.0, amplitude=0.02), RATE)
+    sf.write(str(loud), tone(1.0, amplitude=0.2), RATE)
+    dst = tmp_path / 'out.wav'
+    audio.concat_files([quiet, loud], dst, loudness=-20.0, gap_ms=100)
+    samples, rate = sf.read(str(dst), dtype='float32')
+    assert len(samples) == pytest.approx(2.1 * RATE, abs=2)
+    # 各片段增益相同：两段的相对音量保持不变
+    first, second = samples[:RATE], samples[-RATE:]
+    ratio = np.sqrt(np.mean(second ** 2) / np.mean(first ** 2))
+    assert ratio == pytest.approx(10, rel=0.05)
+    assert audio.measure_loudness(samples, rate) == pytest.approx(-20.0, abs=1.5)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""长文本流式分块（tts_core/chunking.py）"""
+
+import io
+
+from tts_core.chunking import chunk_text, detect_encoding, iter_chunks, iter_sentences, split_sentences
+
+
+def test_split_sentences_keeps_punctuation():
+    assert split_sentences('你好。“走吧！”他说. Ok') == ['你好。', '“走吧！”', '他说.', ' Ok']
+    assert split_sentences('第一行\n第二行') == ['第一行\n', '第二行']
+
+
+def test_chunks_respect_limit_and_keep_text():
+    text = '短句。' * 50 + '没有标点的超长句子' * 30
+    chunks = chunk_text(text, 40)
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert ''.join(chunks) == text
+    # 相邻短句合并到同一块
+    assert chunks[0] == '短句。' * 13
+
+
+def test_single_line_file_is_read_in_pieces():
+    # 整个文件只有一行时按 readline 限长分段读取，被截断的半句拼回下一段
+    sentence = '这是一个句子。'
+    f = io.StringIO(sentence * 100)
+    sentences = list(iter_sentences(f, 10))
+    assert sentences == [sentence] * 100
+
+
+def test_iter_chunks_matches_chunk_text(tmp_path):
+    text = '第一段第一句。第一段第二句。\n\n第二段。\n' * 20
+    path = tmp_path / 'book.txt'
+    path.write_text(text, encoding='utf-8')
+    assert list(iter_chunks(path, 50)) == chunk_text(text, 50)
+
+
+def test_paragraph_mode_breaks_at_blank_lines(tmp_path):
+    path = tmp_path / 'book.txt'
+    path.write_text('第一段的内容比较长一些。\n\n第二段。\n\n第三段。\n', encoding='utf-8')
+    assert list(iter_chunks(path, 40, paragraphs=True)) == ['第一段的内容比较长一些。', '第二段。\n\n第三段。']
+    assert list(iter_chunks(path, 40)) == ['第一段的内容比较长一些。\n\n第二段。\n\n第三段。']
+
+
+def test_detect_encoding(tmp_path):
+    utf8, bom, gbk = tmp_path / 'a.txt', tmp_path / 'b.txt', tmp_path / 'c.txt'
+    utf8.write_text('你好', encoding='utf-8')
+    bom.write_text('你好', encoding='utf-8-sig')
+    gbk.write_bytes('你好，世界'.encode('gbk'))
+    assert [detect_encoding(p) for p in (utf8, bom, gbk)] == ['utf-8', 'utf-8-sig', 'gbk']
+    assert list(iter_chunks(gbk)) == ['你好，世界']
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from tts_core import chunksize
+from tts_core.chunksize import Curve, best_chunk_chars, fit_curve, load_samples, record
+
+
+def _samples(overhead, per_char, quadratic, lengths=(100, 200, 300, 400, 600, 800, 1000, 1200)):
+    return [(n, overhead + per_char * n + quadratic * n * n) for n in lengths]
+
+
+def test_fit_recovers_coefficients():
+    curve = fit_curve(_samples(2.0, 0.01, 1e-6))
+    assert curve.overhead == pytest.approx(2.0, rel=1e-6)
+    assert curve.per_char == pytest.approx(0.01, rel=1e-6)
+    assert curve.quadratic == pytest.approx(1e-6, rel=1e-6)
+    assert curve.samples == 8 and curve.max_chars == 1200
+
+
+def test_fit_needs_enough_spread_samples():
+    assert fit_curve(_samples(1.0, 0.01, 0.0)[:chunksize.MIN_SAMPLES - 1]) is None
+    assert fit_curve(_samples(1.0, 0.01, 0.0, lengths=range(500, 900, 50))) is None
+
+
+def test_fit_never_returns_negative_terms():
+    curve = fit_curve(_samples(0.0, 0.02, 0.0))
+    assert curve.overhead >= 0 and curve.quadratic >= 0
+    assert curve.seconds(1000) == pytest.approx(20.0, rel=1e-3)
+
+
+def test_fit_drops_outliers():
+    samples = _samples(1.0, 0.01, 0.0) + [(150, 1.0 + 1.5 + 60.0)]
+    curve = fit_curve(samples)
+    assert curve.samples == 8
+    assert curve.per_char == pytest.approx(0.01, rel=1e-6)
+
+
+def test_best_chunk_chars_follows_cost_shape():
+    flat = Curve(overhead=5.0, per_char=0.01, quadratic=0.0, samples=8, max_chars=4000)
+    assert best_chunk_chars(flat, 1000) == 4000
+    steep = Curve(overhead=0.1, per_char=0.001, quadratic=1e-5, samples=8, max_chars=4000)
+    # 最优点 sqrt(a/c) = 100，限制在 chunk_chars/4 以上
+    assert best_chunk_chars(steep, 1000) == 250
+    assert best_chunk_chars(steep, 400) == pytest.approx(100, abs=5)
+
+
+def test_best_chunk_chars_uses_total_length():
+    flat = Curve(overhead=5.0, per_char=0.01, quadratic=0.0, samples=8, max_chars=4000)
+    # 全文可以一块合成时不再切分
+    assert best_chunk_chars(flat, 1000, total_chars=1500) >= 1500
+    steep = Curve(overhead=0.1, per_char=0.001, quadratic=1e-5, samples=8, max_chars=4000)
+    size = best_chunk_chars(steep, 400, total_chars=1000)
+    assert 1000 % size == 0 or size == pytest.approx(100, abs=10)
+
+
+def test_record_keeps_recent_samples(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunksize, 'MAX_SAMPLES', 5)
+    path = tmp_path / 'timings.sqlite'
+    for n in range(1, 9):
+        record(path, 'edge-tts', None, n * 100, n * 1.0)
+    record(path, 'edge-tts', 'other', 100, 1.0)
+    samples = load_samples(path)
+    assert [chars for chars, _ in samples[('edge-tts', 'default')]] == [400, 500, 600, 700, 800]
+    assert len(samples[('edge-tts', 'other')]) == 1
+    assert load_samples(tmp_path / 'missing.sqlite') == {}
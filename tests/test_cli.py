@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""主入口 (tts-skill.py) 中不调用引擎的部分"""
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def skill(cli, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return cli.TTSSkill()
+
+
+def test_default_format_reads_engine_config(skill, tmp_path):
+    assert skill.default_format('edge-tts') == 'mp3'
+    (tmp_path / 'openai-tts.config').write_text('[OpenAI]\noutput_format = flac\n', encoding='utf-8')
+    assert skill.default_format('openai-tts') == 'flac'
+    other = tmp_path / 'other.config'
+    other.write_text('[OpenAI]\noutput_format = opus\n', encoding='utf-8')
+    assert skill.default_format('openai-tts', ['--speed', '1.2', '--config', str(other)]) == 'opus'
+    assert skill.default_format('openai-tts', [f'--config={other}']) == 'opus'
+
+
+def test_default_format_falls_back_for_non_native_formats(skill, tmp_path):
+    # aac 不能由后处理解码，pcm 是共享内存交接格式：都回退到引擎的默认文件格式
+    (tmp_path / 'openai-tts.config').write_text('[OpenAI]\noutput_format = aac\n', encoding='utf-8')
+    assert skill.default_format('openai-tts') == 'mp3'
+    (tmp_path / 'qwen3-tts.config').write_text('[Qwen3-TTS]\noutput_format = pcm\n', encoding='utf-8')
+    assert skill.default_format('qwen3-tts') == 'wav'
+
+
+def test_plan_output_passes_configured_format(skill, tmp_path):
+    (tmp_path / 'openai-tts.config').write_text('[OpenAI]\noutput_format = wav\n', encoding='utf-8')
+    path, engine_args, post = skill.plan_output('openai-tts', tmp_path / 'out.wav')
+    assert (path, engine_args, post) == (tmp_path / 'out.wav', ['--format', 'wav'], None)
+    # 后缀不是引擎可直接输出的格式时按配置格式输出后转换
+    path, engine_args, post = skill.plan_output('openai-tts', tmp_path / 'out.ogg', fmt='opus', loudness=-16.0)
+    assert engine_args == ['--format', 'wav'] and post['fmt'] == 'opus'
+
+
+def _fake_engine(calls):
+    """代替引擎子进程：把文本写入 --output 指定的文件"""
+    def run_engine(engine, engine_args, lang='zh', input_text=None):
+        output = engine_args[engine_args.index('--output') + 1]
+        calls.append(output)
+        with open(output, 'wb') as f:
+            f.write(input_text.encode('utf-8'))
+        return True
+    return run_engine
+
+
+def test_pack_staging_stays_inside_batch_dir(cli, skill, tmp_path, monkeypatch):
+    from tts_core.batch import BatchItem
+    from tts_core.pack import PackReader
+
+    calls = []
+    monkeypatch.setattr(skill, 'run_engine', _fake_engine(calls))
+    batch_dir = tmp_path / 'batch'
+    pack_path = tmp_path / 'lines.pack'
+    items = [BatchItem('../escape', 'one'), BatchItem('a/b', 'two'), BatchItem('ab', 'three'),
+             BatchItem('c:d', 'four')]
+    assert skill.run_items('edge-tts', items, batch_dir, pack_path=pack_path)
+
+    staging = (batch_dir / '.staging').resolve()
+    assert len(set(calls)) == 4
+    assert all(Path(call).resolve().parent == staging for call in calls)
+    assert not (tmp_path / 'escape.mp3').exists()
+    with PackReader(pack_path) as reader:
+        assert sorted(reader.ids()) == ['../escape', 'a/b', 'ab', 'c:d']
+        assert bytes(reader.get('a/b')) == b'two'
+        assert bytes(reader.get('ab')) == b'three'
+
+
+def _enqueue_unit(queue_path, batch_dir):
+    from tts_core.workqueue import WorkQueue
+
+    with WorkQueue(queue_path) as queue:
+        queue.enqueue('unit-1', {'engine': 'edge-tts', 'batch_dir': str(batch_dir),
+                                 'items': [{'id': 'a', 'text': 'hello'}]})
+
+
+def test_worker_journal_survives_restart(cli, skill, tmp_path, monkeypatch):
+    from tts_core.workqueue import WorkQueue
+
+    journals = []
+
+    def run_items(engine, items, batch_dir, journal_path=None, **kwargs):
+        journals.append(journal_path)
+        return True
+
+    monkeypatch.setattr(skill, 'run_items', run_items)
+    queue_path = tmp_path / 'queue.sqlite'
+    for pid in (1001, 1002):
+        _enqueue_unit(queue_path, tmp_path / 'batch')
+        monkeypatch.setattr(cli.os, 'getpid', lambda: pid)
+        assert skill.run_queue_worker(queue_path, poll_seconds=0)
+        # 清空队列，让下一个进程重新处理同一单元
+        with WorkQueue(queue_path) as queue:
+            queue.conn.execute('DELETE FROM units')
+    assert len(journals) == 2 and journals[0] == journals[1]
+    assert '1001' not in journals[0].name
+
+    # 不同的队列或 worker 名称使用不同的任务日志
+    _enqueue_unit(tmp_path / 'other.sqlite', tmp_path / 'batch')
+    assert skill.run_queue_worker(tmp_path / 'other.sqlite', poll_seconds=0)
+    _enqueue_unit(queue_path, tmp_path / 'batch')
+    assert skill.run_queue_worker(queue_path, worker_name='node-b', poll_seconds=0)
+    assert len(set(journals)) == 3
+
+
+def test_worker_survives_heartbeat_start_failure(cli, skill, tmp_path, monkeypatch):
+    import tts_core.workqueue
+
+    class BrokenHeartbeat:
+        def __init__(self, *args, **kwargs):
+            raise RuntimeError('no thread')
+
+    monkeypatch.setattr(tts_core.workqueue, 'Heartbeat', BrokenHeartbeat)
+    queue_path = tmp_path / 'queue.sqlite'
+    _enqueue_unit(queue_path, tmp_path / 'batch')
+    assert not skill.run_queue_worker(queue_path, poll_seconds=0)
+
+    from tts_core.workqueue import WorkQueue
+    with WorkQueue(queue_path) as queue:
+        assert queue.failures() == [{'unit_id': 'unit-1', 'attempts': 3, 'error': 'no thread'}]
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""分层配置（tts_core/config.py）"""
+
+import pytest
+
+from tts_core import config
+from tts_core.config import ENGINES_DIR, ROOT_DIR, ConfigError, find_config_file, load_config
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in list(config.os.environ):
+        if name.startswith('TTS_'):
+            monkeypatch.delenv(name)
+
+
+def test_current_directory_comes_before_engines_dir(tmp_path):
+    assert find_config_file('qwen3-tts') == ENGINES_DIR / 'qwen3-tts.config'
+    local = tmp_path / 'qwen3-tts.config'
+    local.write_text('[Qwen3-TTS]\n', encoding='utf-8')
+    assert find_config_file('qwen3-tts') == local
+    # 显式指定的路径不存在时继续查找默认位置
+    assert find_config_file('qwen3-tts', tmp_path / 'missing.config') == local
+
+
+def test_layers_override_in_order(tmp_path, monkeypatch):
+    (tmp_path / 'tts-skill.config').write_text('[tts-skill]\nworkers = 3\nchunk_chars = 500\n', encoding='utf-8')
+    monkeypatch.setenv('TTS_CHUNK_CHARS', '400')
+    values = load_config('tts-skill', overrides={'unit_size': 5, 'gap_ms': None})
+    assert (values['workers'], values['chunk_chars'], values['unit_size'], values['gap_ms']) == (3, 400, 5, 0)
+
+
+def test_invalid_values_name_their_source(tmp_path, monkeypatch):
+    (tmp_path / 'tts-skill.config').write_text('[tts-skill]\nworkers = 0\n', encoding='utf-8')
+    with pytest.raises(ConfigError, match='tts-skill.config: workers must be >= 1'):
+        load_config('tts-skill')
+    monkeypatch.setenv('TTS_QWEN3_OUTPUT_FORMAT', 'ogg')
+    with pytest.raises(ConfigError, match='TTS_QWEN3_OUTPUT_FORMAT'):
+        load_config('qwen3-tts')
+
+
+def test_file_changes_are_picked_up(tmp_path):
+    path = tmp_path / 'tts-skill.config'
+    path.write_text('[tts-skill]\nworkers = 2\n', encoding='utf-8')
+    assert load_config('tts-skill')['workers'] == 2
+    path.write_text('[tts-skill]\nworkers = 4\n', encoding='utf-8')
+    assert load_config('tts-skill')['workers'] == 4
+
+
+def test_relative_paths_follow_the_config_file(tmp_path, monkeypatch):
+    # 未设置时按模式的基准目录
+    assert load_config('qwen3-tts', tmp_path / 'missing.config')['assets_dir'] == (ENGINES_DIR / '../assets').resolve()
+    site = tmp_path / 'site'
+    site.mkdir()
+    (site / 'qwen3.config').write_text('[Qwen3-TTS]\nassets_dir = voices\nmodel_dir = /opt/model\n', encoding='utf-8')
+    values = load_config('qwen3-tts', site / 'qwen3.config')
+    assert values['assets_dir'] == (site / 'voices').resolve()
+    assert str(values['model_dir']) == '/opt/model'
+    # 当前目录中的配置文件同样以文件所在目录为基准
+    (tmp_path / 'tts-skill.config').write_text('[tts-skill]\njob_store = jobs.sqlite\n', encoding='utf-8')
+    assert load_config('tts-skill')['job_store'] == (tmp_path / 'jobs.sqlite').resolve()
+    # 环境变量中的相对路径仍以模式的基准目录为基准
+    monkeypatch.setenv('TTS_JOB_STORE', 'other.sqlite')
+    assert load_config('tts-skill')['job_store'] == (ROOT_DIR / 'other.sqlite').resolve()
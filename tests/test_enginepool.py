@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""引擎进程池（tts_core/enginepool.py），以一个把文本写入输出文件的小脚本代替引擎"""
+
+import pytest
+
+from conftest import ROOT_DIR
+from tts_core.enginepool import EnginePool
+
+ENGINE = f'''
+import os, sys
+sys.path.insert(0, {str(ROOT_DIR)!r})
+from tts_core.enginepool import run_main
+
+def main():
+    args = sys.argv[1:]
+    text = sys.stdin.read()
+    # 引擎的输出不能混入协议管道
+    print('working')
+    if text == 'crash':
+        os._exit(9)
+    with open(args[args.index('--output') + 1], 'w', encoding='utf-8') as f:
+        f.write(f'{{os.getpid()}} {{text}} {{os.environ.get("TTS_TEST_VALUE", "-")}}')
+    if text == 'fail':
+        sys.exit(3)
+
+run_main(main)
+'''
+
+
+@pytest.fixture
+def engine(tmp_path):
+    script = tmp_path / 'fake-engine.py'
+    script.write_text(ENGINE, encoding='utf-8')
+    return script
+
+
+@pytest.fixture
+def pool():
+    pool = EnginePool(max_idle=1, max_jobs=3)
+    yield pool
+    pool.close()
+
+
+def _call(pool, engine, tmp_path, text, env=None):
+    output = tmp_path / 'out.txt'
+    code = pool.run(engine, tmp_path, ['--output', str(output)], text, env)
+    pid, body, value = output.read_text(encoding='utf-8').split(' ') if output.exists() else (None, None, None)
+    if output.exists():
+        output.unlink()
+    return code, pid, body, value
+
+
+def test_worker_is_reused_with_per_job_env(pool, engine, tmp_path):
+    code, first_pid, body, value = _call(pool, engine, tmp_path, '你好', {'TTS_TEST_VALUE': 'a'})
+    assert (code, body, value) == (0, '你好', 'a')
+    code, pid, body, value = _call(pool, engine, tmp_path, 'again')
+    # 同一个进程处理第二个作业，上一个作业的环境变量已恢复
+    assert (code, pid, value) == (0, first_pid, '-')
+    assert pool.started == 1
+
+
+def test_exit_codes_and_crashes(pool, engine, tmp_path):
+    assert _call(pool, engine, tmp_path, 'fail')[0] == 3
+    code, pid, _, _ = _call(pool, engine, tmp_path, 'crash')
+    assert code == 1 and pid is None
+    # 崩溃的 worker 不再复用
+    assert _call(pool, engine, tmp_path, 'ok')[0] == 0
+    assert pool.started == 2
+
+
+def test_workers_are_recycled_after_max_jobs(pool, engine, tmp_path):
+    pids = [_call(pool, engine, tmp_path, str(i))[1] for i in range(4)]
+    assert len(set(pids[:3])) == 1 and pids[3] != pids[0]
+    assert (pool.started, pool.recycled) == (2, 1)
+
+
+def test_closed_pool_does_not_keep_workers(pool, engine, tmp_path):
+    pool.close()
+    assert _call(pool, engine, tmp_path, 'ok')[0] == 0
+    assert not pool._idle
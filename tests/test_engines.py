@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""引擎脚本的命令行约定（不访问网络、不加载模型）"""
+
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR
+
+ENGINES = ('edge-tts-cli.py', 'openai-tts-cli.py', 'qwen3-tts-cli.py')
+
+
+def _run(script, args, stdin=''):
+    return subprocess.run([sys.executable, str(ROOT_DIR / 'engines' / script)] + args, input=stdin,
+                          capture_output=True, text=True, encoding='utf-8', timeout=60)
+
+
+@pytest.mark.parametrize('script', ENGINES)
+@pytest.mark.parametrize('args, stdin', [
+    (['--text-file', '-'], ''),
+    (['--text-file', '-'], ' \n '),
+    ([], ''),
+])
+def test_missing_or_empty_text_fails(script, args, stdin, tmp_path):
+    output = tmp_path / 'out.wav'
+    result = _run(script, args + ['--output', str(output)], stdin)
+    assert result.returncode != 0
+    assert not output.exists()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import os
+import socket
+import time
+
+import pytest
+
+from tts_core import jobs
+from tts_core.jobs import JobStore, check_callback
+from tts_core.scheduler import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+DEAD_PID = 2 ** 22 + 12345
+
+
+def _submit(store, job_id):
+    return store.submit(job_id, ['--text', 'hi'], '/tmp', f'/tmp/{job_id}.wav')
+
+
+def _add_runner(store, runner, pid, heartbeat_at=None):
+    store.conn.execute('INSERT INTO runners (runner, pid, heartbeat_at) VALUES (?, ?, ?)',
+                       (runner, pid, time.time() if heartbeat_at is None else heartbeat_at))
+
+
+def test_submit_claim_finish(tmp_path):
+    with JobStore(tmp_path / 'jobs.sqlite') as store:
+        _submit(store, 'j1')
+        _submit(store, 'j2')
+        runner = f'{socket.gethostname()}-{os.getpid()}'
+        assert store.register_runner(runner)
+        assert not store.register_runner('other-1')
+        job = store.claim(runner)
+        assert job['job_id'] == 'j1' and job['state'] == JOB_RUNNING and job['attempts'] == 1
+        assert store.finish('j1', runner, 0)['state'] == JOB_DONE
+        assert store.finish('j1', runner, 0) is None
+        assert not store.retire(runner)
+        store.claim(runner)
+        assert store.finish('j2', runner, 1, 'exit code 1')['state'] == JOB_FAILED
+        assert store.retire(runner)
+        assert store.summary() == {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 1, JOB_FAILED: 1}
+
+
+def test_needs_runner(tmp_path):
+    with JobStore(tmp_path / 'jobs.sqlite') as store:
+        assert not store.needs_runner()
+        _submit(store, 'j1')
+        assert store.needs_runner()
+        assert store.register_runner(f'{socket.gethostname()}-{os.getpid()}')
+        assert not store.needs_runner()
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='PID liveness is not probed on Windows')
+def test_dead_runner_jobs_are_requeued(tmp_path):
+    with JobStore(tmp_path / 'jobs.sqlite') as store:
+        _submit(store, 'j1')
+        runner = f'{socket.gethostname()}-{DEAD_PID}'
+        _add_runner(store, runner, os.getpid())
+        store.claim(runner)
+        # 心跳仍然新鲜，但进程已退出
+        store.conn.execute('UPDATE runners SET pid = ?', (DEAD_PID,))
+        assert store.needs_runner()
+        job = store.get('j1')
+        assert job['state'] == JOB_QUEUED and job['runner'] is None
+        assert store.finish('j1', runner, 0) is None
+
+
+def test_other_host_runner_relies_on_heartbeat(tmp_path):
+    with JobStore(tmp_path / 'jobs.sqlite') as store:
+        _submit(store, 'j1')
+        _add_runner(store, f'not-{socket.gethostname()}-{DEAD_PID}', DEAD_PID)
+        assert not store.needs_runner()
+        store.conn.execute('UPDATE runners SET heartbeat_at = ?', (time.time() - jobs.RUNNER_TIMEOUT - 1,))
+        assert store.needs_runner()
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    with JobStore(tmp_path / 'jobs.sqlite') as store:
+        _submit(store, 'j1')
+        for attempt in range(jobs.MAX_ATTEMPTS):
+            runner = f'stale-{attempt}'
+            _add_runner(store, runner, None)
+            assert store.claim(runner)['attempts'] == attempt + 1
+            store.conn.execute('UPDATE runners SET heartbeat_at = ?', (time.time() - jobs.RUNNER_TIMEOUT - 1,))
+        assert not store.needs_runner()
+        job = store.get('j1')
+        assert job['state'] == JOB_FAILED and job['error'] == 'runner exited'
+
+
+def test_check_callback():
+    assert check_callback('http://127.0.0.1:8000/done') == 'http://127.0.0.1:8000/done'
+    assert check_callback('https://localhost/hook')
+    for url in ('http://example.com/hook', 'file:///etc/passwd', 'http://127.0.0.1.example.com/'):
+        with pytest.raises(ValueError):
+            check_callback(url)
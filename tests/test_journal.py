@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from tts_core.journal import STATE_DONE, STATE_FAILED, JobJournal, content_hash
+
+
+def _done(journal, item_id, item_hash, output_path):
+    journal.mark_running(item_id, item_hash, str(output_path))
+    journal.mark_done(item_id)
+
+
+def test_content_hash_covers_all_inputs():
+    base = content_hash('edge-tts', '你好', 'v', ['--speed', '1.0'])
+    assert base == content_hash('edge-tts', '你好', 'v', ['--speed', '1.0'])
+    assert base != content_hash('qwen3-tts', '你好', 'v', ['--speed', '1.0'])
+    assert base != content_hash('edge-tts', '你好', 'w', ['--speed', '1.0'])
+    assert base != content_hash('edge-tts', '你好', 'v', ['--speed', '1.2'])
+
+
+def test_is_done(tmp_path):
+    output = tmp_path / 'a.wav'
+    output.write_bytes(b'RIFF')
+    with JobJournal(tmp_path / 'journal.sqlite') as journal:
+        _done(journal, 'a', 'h1', output)
+        assert journal.get('a')['state'] == STATE_DONE
+        assert journal.is_done('a', 'h1')
+        assert journal.is_done('a', 'h1', output_path=str(output))
+        # 内容变化
+        assert not journal.is_done('a', 'h2')
+        # 命名模板或输出目录变化
+        assert not journal.is_done('a', 'h1', output_path=str(tmp_path / 'a_1234.wav'))
+        # 输出被删除
+        output.unlink()
+        assert not journal.is_done('a', 'h1')
+
+
+def test_failed_items_are_retried(tmp_path):
+    output = tmp_path / 'b.wav'
+    output.write_bytes(b'RIFF')
+    with JobJournal(tmp_path / 'journal.sqlite') as journal:
+        journal.mark_running('b', 'h', str(output))
+        journal.mark_failed('b', 'boom')
+        row = journal.get('b')
+        assert row['state'] == STATE_FAILED and row['error'] == 'boom'
+        assert not journal.is_done('b', 'h')
+        journal.mark_running('b', 'h', str(output))
+        assert journal.get('b')['attempts'] == 2
+
+
+def test_journal_survives_reopen(tmp_path):
+    output = tmp_path / 'c.wav'
+    output.write_bytes(b'RIFF')
+    with JobJournal(tmp_path / 'journal.sqlite') as journal:
+        _done(journal, 'c', 'h', output)
+    with JobJournal(tmp_path / 'journal.sqlite') as journal:
+        assert journal.is_done('c', 'h', output_path=str(output))
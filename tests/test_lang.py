@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from tts_core.lang import LanguageSpan, detect_language, language_spans, script_counts
+
+
+def _pieces(text, **kwargs):
+    return [(text[span.start:span.end], span.lang) for span in language_spans(text, **kwargs)]
+
+
+def test_detect_language():
+    assert script_counts('Hi 你好!') == (2, 2)
+    assert detect_language('你好 world') == 'en'
+    assert detect_language('你好世界朋友们 world') == 'zh'
+
+
+def test_spans_cover_text():
+    text = 'iPhone 15 发布了，售价 999 dollars.'
+    spans = language_spans(text, min_chars=2)
+    assert spans[0].start == 0 and spans[-1].end == len(text)
+    assert all(a.end == b.start for a, b in zip(spans, spans[1:]))
+    assert [span.lang for span in spans] == ['en', 'zh', 'en']
+
+
+def test_neutral_text_and_empty_text():
+    assert language_spans('') == []
+    assert language_spans('123 ...', default='en') == [LanguageSpan(0, 7, 'en')]
+
+
+def test_short_runs_join_their_neighbours():
+    assert _pieces('A股市场 rose today', min_chars=2) == [('A股市场 ', 'zh'), ('rose today', 'en')]
+    assert _pieces('中文内容 很 a English', min_chars=2) == [('中文内容 很 ', 'zh'), ('a English', 'en')]
+
+
+@pytest.mark.parametrize('text, default, expected', [
+    # 没有足够长的片段时按字数多数决定，而不是取第一个片段的语言
+    ('Hi 你好 OK 世界', 'zh', 'zh'),
+    ('Hi 你好 OK 世界', 'en', 'en'),
+    ('Hi 你好吗 OK 世界吗', 'en', 'zh'),
+    ('Hi 你 OK', 'zh', 'en'),
+])
+def test_all_short_runs_use_majority(text, default, expected):
+    assert language_spans(text, default, min_chars=4) == [LanguageSpan(0, len(text), expected)]
+
+
+def test_short_prefix_does_not_decide_language():
+    assert _pieces('OK 你好世界', min_chars=3) == [('OK 你好世界', 'zh')]
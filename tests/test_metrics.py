@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""运行指标（tts_core/metrics.py）"""
+
+import json
+
+import pytest
+
+from tts_core import metrics
+from tts_core.metrics import METRICS_ENV, Registry, emit
+
+
+def test_counters_and_labels_render():
+    registry = Registry()
+    registry.inc('tts_requests_total', engine='edge-tts', result='ok')
+    registry.inc('tts_requests_total', 2, engine='edge-tts', result='ok')
+    registry.inc('tts_errors_total', engine='qwen3-tts', stage='say "hi"\n')
+    registry.set('tts_queue_depth', 4, priority='batch')
+    text = registry.render()
+    assert 'tts_requests_total{engine="edge-tts",result="ok"} 3' in text
+    assert 'tts_errors_total{engine="qwen3-tts",stage="say \\"hi\\" "} 1' in text
+    assert 'tts_queue_depth{priority="batch"} 4' in text
+    assert '# TYPE tts_synthesis_seconds histogram' in text
+    assert registry.total('tts_requests_total') == 3
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    for value in (0.07, 0.3, 700):
+        registry.observe('tts_synthesis_seconds', value, engine='edge-tts')
+    lines = registry.render().splitlines()
+    assert 'tts_synthesis_seconds_bucket{engine="edge-tts",le="0.05"} 0' in lines
+    assert 'tts_synthesis_seconds_bucket{engine="edge-tts",le="0.1"} 1' in lines
+    assert 'tts_synthesis_seconds_bucket{engine="edge-tts",le="0.5"} 2' in lines
+    assert 'tts_synthesis_seconds_bucket{engine="edge-tts",le="600"} 2' in lines
+    assert 'tts_synthesis_seconds_bucket{engine="edge-tts",le="+Inf"} 3' in lines
+    assert 'tts_synthesis_seconds_count{engine="edge-tts"} 3' in lines
+    assert registry.total('tts_synthesis_seconds') == pytest.approx(700.37)
+
+
+def test_engine_records_are_merged(tmp_path, monkeypatch):
+    path = tmp_path / 'metrics.jsonl'
+    emit('tts_inference_seconds', 1.5)
+    assert not path.exists()
+    monkeypatch.setenv(METRICS_ENV, str(path))
+    emit('tts_inference_seconds', 1.5, engine='qwen3-tts')
+    emit('tts_chars_total', 12, engine='qwen3-tts')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('not json\n' + json.dumps({'name': 'unknown_metric', 'value': 1}) + '\n')
+    registry = Registry()
+    registry.merge_file(path)
+    registry.merge_file(tmp_path / 'missing.jsonl')
+    assert registry.total('tts_inference_seconds') == 1.5
+    assert registry.total('tts_chars_total') == 12
+
+
+def test_collectors_run_before_render(tmp_path):
+    registry = Registry()
+    registry.add_collector(lambda r: r.set('tts_queue_depth', 7, priority='normal'))
+    assert 'tts_queue_depth{priority="normal"} 7' in registry.render()
+    registry.write(tmp_path / 'out.prom')
+    assert (tmp_path / 'out.prom').read_text(encoding='utf-8') == registry.render()
+
+
+def test_textnorm_cache_is_reported():
+    from tts_core import textnorm
+    textnorm.normalize_text('共3个', 'zh')
+    registry = Registry()
+    metrics.collect_textnorm(registry)
+    text = registry.render()
+    assert 'tts_cache_misses_total{cache="textnorm_memory"}' in text
+    assert 'tts_cache_hits_total{cache="textnorm_disk"}' in text
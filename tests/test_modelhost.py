@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""常驻模型进程（tts_core/modelhost.py），模型进程主循环在线程中运行"""
+
+import io
+import json
+import socket
+import sys
+import threading
+
+import pytest
+
+from tts_core import modelhost
+from tts_core.enginepool import POOL_ENV
+from tts_core.modelhost import DEFAULT_IDLE_UNLOAD, idle_unload_for
+
+
+def test_idle_unload_defaults_to_exit_for_direct_calls(monkeypatch):
+    monkeypatch.delenv(POOL_ENV, raising=False)
+    assert idle_unload_for(None) == 0
+    monkeypatch.setenv(POOL_ENV, '1')
+    assert idle_unload_for(None) == DEFAULT_IDLE_UNLOAD
+
+
+def test_configured_idle_unload_wins(monkeypatch):
+    monkeypatch.delenv(POOL_ENV, raising=False)
+    assert idle_unload_for(120.0) == 120.0
+    monkeypatch.setenv(POOL_ENV, '1')
+    assert idle_unload_for(0.0) == 0.0
+
+
+@pytest.fixture
+def host(tmp_path, monkeypatch):
+    """在线程中运行模型进程主循环，spawn() 记录启动次数"""
+    monkeypatch.setattr(modelhost, 'START_GRACE', 5.0)
+    state_file = tmp_path / 'host.json'
+    threads, jobs = [], []
+
+    def handler(job):
+        jobs.append(job)
+        print(f"speaking {job['text']}")
+        if job['text'] == 'exit':
+            sys.exit(4)
+        return 0
+
+    def start(idle_unload=0.0, max_rss_mb=0):
+        def spawn():
+            thread = threading.Thread(target=modelhost.serve, args=(state_file, handler, idle_unload, max_rss_mb))
+            thread.start()
+            threads.append(thread)
+        return spawn
+
+    yield state_file, start, threads, jobs
+    for thread in threads:
+        thread.join(10)
+        assert not thread.is_alive()
+
+
+def test_host_runs_jobs_and_forwards_output(host):
+    state_file, start, threads, jobs = host
+    spawn = start(idle_unload=0.5)
+    out = io.StringIO()
+    assert modelhost.call(state_file, {'text': '你好'}, spawn, out=out) == 0
+    assert modelhost.call(state_file, {'text': 'exit'}, spawn, out=out) == 4
+    # 第二个作业复用常驻的模型进程
+    assert len(threads) == 1 and [job['text'] for job in jobs] == ['你好', 'exit']
+    assert out.getvalue() == 'speaking 你好\nspeaking exit\n'
+    threads[0].join(10)
+    # 空闲卸载后撤下状态文件
+    assert not state_file.exists()
+
+
+def test_host_without_idle_unload_exits_after_one_job(host):
+    state_file, start, threads, _ = host
+    spawn = start(idle_unload=0)
+    for _ in range(2):
+        assert modelhost.call(state_file, {'text': 'a'}, spawn, out=io.StringIO()) == 0
+        threads[-1].join(10)
+        assert not state_file.exists()
+    assert len(threads) == 2
+
+
+def test_host_recycles_over_memory_cap(host):
+    state_file, start, threads, _ = host
+    spawn = start(idle_unload=60, max_rss_mb=0.001)
+    assert modelhost.call(state_file, {'text': 'a'}, spawn, out=io.StringIO()) == 0
+    threads[0].join(10)
+    assert not threads[0].is_alive() and not state_file.exists()
+
+
+def test_stale_state_file_is_replaced(host):
+    state_file, start, threads, _ = host
+    # 被强制结束的模型进程留下的状态文件：端口已无人监听
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+    state_file.write_text(json.dumps({'pid': 1, 'port': port, 'token': 'old'}), encoding='utf-8')
+    assert modelhost.call(state_file, {'text': 'a'}, start(idle_unload=0), out=io.StringIO()) == 0
+    assert len(threads) == 1
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from tts_core.outputs import new_output_path, render_name, sanitize_filename_part, text_hash
+
+
+def test_hash_covers_args_settings_and_extension(tmp_path):
+    base = new_output_path(tmp_path, '你好世界', 'wav', 'hash', 'edge-tts', 'xiaoxiao', extra_args=['--speed', '1.0'])
+    faster = new_output_path(tmp_path, '你好世界', 'wav', 'hash', 'edge-tts', 'xiaoxiao', extra_args=['--speed', '1.2'])
+    louder = new_output_path(tmp_path, '你好世界', 'wav', 'hash', 'edge-tts', 'xiaoxiao',
+                             extra_args=['--speed', '1.0', 'loudness=-16'])
+    mp3 = new_output_path(tmp_path, '你好世界', 'mp3', 'hash', 'edge-tts', 'xiaoxiao', extra_args=['--speed', '1.0'])
+    assert len({base.stem, faster.stem, louder.stem, mp3.stem}) == 4
+
+
+def test_hash_template_is_deterministic(tmp_path):
+    first = new_output_path(tmp_path, '你好', 'wav', 'hash', 'edge-tts', 'v', extra_args=['--pitch', '2'])
+    second = new_output_path(tmp_path, '你好', 'wav', 'hash', 'edge-tts', 'v', extra_args=['--pitch', '2'])
+    assert first == second
+
+
+def test_text_hash_matches_engine_voice_and_args():
+    assert text_hash('a', 'edge-tts', 'v') != text_hash('a', 'edge-tts', 'w')
+    assert text_hash('a', 'edge-tts', 'v', ['--speed', '2']) != text_hash('a', 'edge-tts', 'v')
+
+
+def test_timestamp_names_are_reserved(tmp_path):
+    first = new_output_path(tmp_path, '你好', 'wav')
+    second = new_output_path(tmp_path, '你好', 'wav')
+    assert first != second
+    assert first.exists() and second.exists()
+
+
+def test_id_template_without_item_id_is_reserved(tmp_path):
+    first = new_output_path(tmp_path, 'x', 'wav', '{id}')
+    second = new_output_path(tmp_path, 'x', 'wav', '{id}')
+    assert first != second
+
+
+def test_render_name_cannot_escape_output_dir():
+    name = render_name('../../{id}', 'x', 'wav', item_id='../etc/passwd')
+    assert '..' not in name.split('/')
+    assert not name.startswith('/')
+
+
+def test_sanitize_filename_part():
+    assert sanitize_filename_part('a/b\\c') == 'abc'
+    assert sanitize_filename_part('  hello  world ') == 'hello_world'
+    assert sanitize_filename_part('..', 'item') == 'item'
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import sys
+
+import pytest
+
+from tts_core import pack
+from tts_core.pack import PackReader, PackWriter
+
+
+def test_roundtrip_and_alias(tmp_path):
+    path = tmp_path / 'lines.pack'
+    with PackWriter(path) as writer:
+        writer.add('a', b'first', 'wav')
+        writer.add('b', b'second', 'mp3')
+        writer.add_alias('c', 'a')
+    with PackReader(path) as reader:
+        assert sorted(reader.ids()) == ['a', 'b', 'c']
+        assert bytes(reader.get('a')) == b'first'
+        assert bytes(reader.get('b')) == b'second'
+        assert reader.entry('c')['offset'] == reader.entry('a')['offset']
+
+
+def test_append_after_reopen(tmp_path):
+    path = tmp_path / 'lines.pack'
+    with PackWriter(path) as writer:
+        writer.add('a', b'first', 'wav')
+    with PackWriter(path) as writer:
+        assert 'a' in writer
+        writer.add('b', b'second', 'wav')
+    with PackReader(path) as reader:
+        assert bytes(reader.get('a')) == b'first'
+        assert bytes(reader.get('b')) == b'second'
+
+
+def test_truncated_index_line_is_ignored(tmp_path):
+    path = tmp_path / 'lines.pack'
+    with PackWriter(path) as writer:
+        writer.add('a', b'first', 'wav')
+    with open(str(path) + '.idx', 'a', encoding='utf-8') as f:
+        f.write('{"id": "b", "offs')
+    with PackReader(path) as reader:
+        assert list(reader.ids()) == ['a']
+
+
+def test_rejects_non_pack_files(tmp_path):
+    path = tmp_path / 'other.pack'
+    path.write_bytes(b'not a pack')
+    with pytest.raises(ValueError):
+        PackReader(path)
+
+
+def test_extract_stays_inside_target_dir(tmp_path, monkeypatch):
+    path = tmp_path / 'lines.pack'
+    with PackWriter(path) as writer:
+        writer.add('../../escape', b'data', '../wav')
+        writer.add('sub/dir', b'data', 'wav')
+    target = tmp_path / 'out' / 'nested'
+    monkeypatch.setattr(sys, 'argv', ['pack', str(path), '--extract', str(target)])
+    pack.main()
+    written = sorted(p.relative_to(target).as_posix() for p in target.rglob('*') if p.is_file())
+    assert written == ['escape.wav', 'subdir.wav']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['lines.pack', 'lines.pack.idx', 'out']
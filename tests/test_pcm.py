@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""共享内存 PCM 交接（tts_core/pcm.py）"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from tts_core import audio, pcm
+
+
+@pytest.fixture
+def shm(tmp_path, monkeypatch):
+    monkeypatch.setattr(pcm, 'shared_dir', lambda: tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize('shape', [(1600,), (1600, 2), (0,)])
+def test_roundtrip(shm, shape):
+    samples = np.random.default_rng(0).uniform(-1, 1, shape).astype(np.float32)
+    path = pcm.new_pcm_path('chunk')
+    assert path.parent == shm and pcm.is_pcm(path)
+    descriptor = pcm.write_pcm(path, samples, 24000)
+    assert descriptor['frames'] == shape[0]
+    data, rate = pcm.open_pcm(path)
+    assert rate == 24000 and data.shape == samples.shape and np.array_equal(data, samples)
+    assert pcm.pcm_duration(path) == shape[0] / 24000
+    del data
+    pcm.remove_pcm(path)
+    assert not list(shm.iterdir())
+
+
+def test_sweep_removes_leftovers_of_dead_or_old_processes(shm):
+    mine = shm / f'.tts-pcm-{os.getpid()}-aaaa-x.pcm'
+    old = shm / f'.tts-pcm-{os.getpid()}-bbbb-x.pcm'
+    # 进程号远超 pid_max，对应的进程一定不存在
+    dead = shm / '.tts-pcm-99999999-cccc-x.pcm.json'
+    for path in (mine, old, dead):
+        path.write_bytes(b'')
+    stale = time.time() - pcm.STALE_SECONDS - 60
+    os.utime(old, (stale, stale))
+    assert pcm.sweep_stale() == 2
+    assert [p.name for p in shm.iterdir()] == [mine.name]
+
+
+def test_audio_stage_reads_pcm_and_frees_it(shm, tmp_path):
+    t = np.arange(16000) / 16000
+    samples = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    first, second = pcm.new_pcm_path('a'), pcm.new_pcm_path('b')
+    pcm.write_pcm(first, samples, 16000)
+    pcm.write_pcm(second, samples, 16000)
+    out = tmp_path / 'out' / 'joined.flac'
+    audio.concat_files([first, second], out)
+    assert sf.info(str(out)).duration == pytest.approx(2.0)
+    # 交接文件及其描述文件在拼接后删除
+    assert not list(shm.glob('.tts-pcm-*'))
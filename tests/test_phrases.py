@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""短语库与模板拼接（tts_core/phrases.py）"""
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from tts_core.phrases import (DEFAULT_CROSSFADE_MS, PhraseBank, TemplatePart, fill_template, parse_template,
+                              render_text, splice_options)
+
+RATE = 16000
+
+
+def write_padded_tone(path, seconds=0.2, pad=0.2):
+    t = np.arange(int(RATE * seconds)) / RATE
+    silence = np.zeros(int(RATE * pad), dtype=np.float32)
+    samples = np.concatenate([silence, (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), silence])
+    sf.write(str(path), samples, RATE)
+    return path
+
+
+def test_parse_and_fill_template():
+    parts = parse_template('您的订单 {N} 已发货，{{包裹}} {eta}')
+    assert parts == [TemplatePart('您的订单'), TemplatePart('', 'N'), TemplatePart('已发货，{包裹}'),
+                     TemplatePart('', 'eta')]
+    filled = fill_template(parts, {'N': ' 12345 ', 'eta': ''})
+    # 值为空的槽位省略
+    assert filled == [TemplatePart('您的订单'), TemplatePart('12345', 'N'), TemplatePart('已发货，{包裹}')]
+    assert render_text(filled) == '您的订单 12345 已发货，{包裹}'
+
+
+@pytest.mark.parametrize('template, message', [
+    ('订单 {1x}', 'invalid slot name'),
+    ('订单 {N', 'expected'),
+    ('   ', 'template is empty'),
+])
+def test_invalid_templates(template, message):
+    with pytest.raises(ValueError, match=message):
+        parse_template(template)
+
+
+def test_missing_slots_are_reported():
+    with pytest.raises(ValueError, match='missing slot values: A, B'):
+        fill_template(parse_template('{B} 和 {A}'), {})
+
+
+def test_splice_options_default_to_trim_and_crossfade():
+    options = splice_options({'trim_db': None, 'gap_ms': 0, 'crossfade_ms': 0})
+    assert options['trim_db'] is not None and options['crossfade_ms'] == DEFAULT_CROSSFADE_MS
+    assert splice_options({'trim_db': -30.0, 'gap_ms': 100, 'crossfade_ms': 0}) == \
+        {'trim_db': -30.0, 'gap_ms': 100, 'crossfade_ms': 0}
+
+
+def test_bank_stores_trimmed_audio(tmp_path):
+    bank = PhraseBank(tmp_path / 'bank')
+    key = bank.key('edge-tts', '已发货', 'xiaoxiao')
+    assert key != bank.key('edge-tts', '已发货', 'yunxi') and bank.get(key) is None
+    source = write_padded_tone(tmp_path / 'raw.wav')
+    path = bank.store(key, source)
+    assert bank.get(key) == path and bank.contains(path) and not source.exists()
+    assert sf.info(str(path)).duration < 0.3
+    assert not bank.contains(tmp_path / 'raw.wav')
+
+
+def test_template_synthesizes_fixed_parts_once(cli, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    skill = cli.TTSSkill()
+    skill.phrase_dir = tmp_path / 'bank'
+    calls = []
+
+    def synthesize_chunk(engine, text, work_dir, index, voice=None, extra_args=None, lang='zh'):
+        calls.append(text)
+        return write_padded_tone(work_dir / f'{index}.wav')
+
+    monkeypatch.setattr(skill, 'synthesize_chunk', synthesize_chunk)
+    template = '您的订单 {N} 已发货'
+    for number in ('1', '2'):
+        output = tmp_path / f'order-{number}.wav'
+        assert skill.run_template('edge-tts', template, {'N': number}, output=output, fmt='wav', normalize=False)
+        assert output.exists()
+    # 固定片段只在第一次合成，之后取自短语库
+    assert calls == ['您的订单', '1', '已发货', '2']
+    assert len(list((tmp_path / 'bank').rglob('*.wav'))) == 2
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""引擎录制与回放（tts_core/replay.py），网络请求以假的 requests 模块代替"""
+
+import hashlib
+import json
+import sys
+import types
+
+import pytest
+
+from tts_core import replay
+from tts_core.replay import REPLAY_DIR_ENV, REPLAY_ENV, ReplayMissing
+
+URL = 'https://tts.example.com/v1/audio/speech'
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    monkeypatch.setenv(REPLAY_DIR_ENV, str(tmp_path / 'recordings'))
+    monkeypatch.delenv('TTS_REPLAY_SEED', raising=False)
+    return tmp_path / 'recordings'
+
+
+@pytest.fixture
+def network(monkeypatch):
+    """记录发出的请求并返回固定响应"""
+    sent = []
+
+    def post(url, headers=None, data=None, **kwargs):
+        sent.append((url, headers, json.loads(data)))
+        return types.SimpleNamespace(status_code=200, headers={'content-type': 'audio/mpeg'}, content=b'ID3audio')
+
+    fake = types.ModuleType('requests')
+    fake.post = post
+    fake.exceptions = types.SimpleNamespace(RequestException=OSError)
+    monkeypatch.setitem(sys.modules, 'requests', fake)
+    return sent
+
+
+def test_mode_and_seed(monkeypatch):
+    monkeypatch.delenv(REPLAY_ENV, raising=False)
+    assert replay.mode() is None and replay.seed() is None
+    monkeypatch.setenv(REPLAY_ENV, ' Record ')
+    assert replay.mode() == 'record' and replay.seed() == 0
+    monkeypatch.setenv('TTS_REPLAY_SEED', '7')
+    assert replay.seed() == 7
+    monkeypatch.setenv(REPLAY_ENV, 'replay')
+    assert replay.seed() is None
+    monkeypatch.setenv(REPLAY_ENV, 'sometimes')
+    assert replay.mode() is None
+
+
+def test_record_then_replay_offline(recordings, network, monkeypatch):
+    payload = {'input': '你好', 'voice': 'alloy'}
+    headers = {'Authorization': 'Bearer secret-key'}
+    monkeypatch.setenv(REPLAY_ENV, 'record')
+    recorded = replay.http_post('openai-tts', URL, payload, headers, timeout=5)
+    assert (recorded.status_code, recorded.content) == (200, b'ID3audio') and len(network) == 1
+    # 录制中不含请求头，API 密钥不会写入磁盘
+    [meta] = (recordings / 'openai-tts').glob('*.json')
+    assert 'secret-key' not in meta.read_text(encoding='utf-8')
+
+    monkeypatch.setenv(REPLAY_ENV, 'replay')
+    replayed = replay.http_post('openai-tts', URL, payload, headers)
+    assert len(network) == 1
+    assert replayed == recorded and replayed.headers == {'content-type': 'audio/mpeg'}
+    assert b''.join(replayed.iter_content(3)) == b'ID3audio'
+    assert replay.request_error() is replay._NotRaised
+
+    with pytest.raises(ReplayMissing):
+        replay.http_post('openai-tts', URL, dict(payload, input='没录过'), headers)
+
+
+def test_without_mode_requests_pass_through(recordings, network, monkeypatch):
+    monkeypatch.delenv(REPLAY_ENV, raising=False)
+    response = replay.http_post('edge-tts', URL, {'input': 'hi'}, {})
+    assert response.content == b'ID3audio' and len(network) == 1
+    assert not recordings.exists()
+    assert replay.request_error() is OSError
+
+
+def test_request_key_and_file_digest(tmp_path):
+    assert replay.request_key('edge-tts', URL, {'a': 1, 'b': 2}) == replay.request_key('edge-tts', URL, {'b': 2, 'a': 1})
+    assert replay.request_key('edge-tts', URL, {'a': 1}) != replay.request_key('openai-tts', URL, {'a': 1})
+    path = tmp_path / 'ref.wav'
+    path.write_bytes(b'x' * 10)
+    assert replay.file_digest(path) == hashlib.sha256(b'x' * 10).hexdigest()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from tts_core.scheduler import JOB_DONE, JOB_FAILED, PRIORITY_CLASSES, FairScheduler, Job, parse_priority
+
+
+def test_parse_priority():
+    assert parse_priority(None) == PRIORITY_CLASSES['normal']
+    assert parse_priority('') == PRIORITY_CLASSES['normal']
+    assert parse_priority(' Interactive ') == 0
+    assert parse_priority('7') == 7
+    assert parse_priority(3) == 3
+    with pytest.raises(ValueError):
+        parse_priority('urgent')
+
+
+class Recorder:
+    """记录执行顺序；第一个分块在 gate 打开前阻塞，便于在其后排入其他作业"""
+
+    def __init__(self):
+        self.order = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, job, index, text):
+        self.order.append(text)
+        if not self.started.is_set():
+            self.started.set()
+            assert self.gate.wait(5)
+        return text.upper()
+
+
+def _run(recorder, submit_later, **kwargs):
+    scheduler = FairScheduler(recorder, workers=1, **kwargs)
+    try:
+        first = scheduler.submit(Job(chunks=['b0', 'b1', 'b2'], priority=PRIORITY_CLASSES['batch']))
+        assert recorder.started.wait(5)
+        later = [scheduler.submit(job) for job in submit_later]
+        recorder.gate.set()
+        for job in [first] + later:
+            assert job.wait(5)
+    finally:
+        scheduler.shutdown()
+    return first, later
+
+
+def test_interactive_job_preempts_at_chunk_boundary():
+    recorder = Recorder()
+    first, (urgent,) = _run(recorder, [Job(chunks=['i0', 'i1'], priority=PRIORITY_CLASSES['interactive'])])
+    assert recorder.order == ['b0', 'i0', 'i1', 'b1', 'b2']
+    assert first.state == JOB_DONE and first.results == ['B0', 'B1', 'B2']
+    assert urgent.results == ['I0', 'I1']
+
+
+def test_tenants_share_a_priority_class_by_weight():
+    recorder = Recorder()
+    _run(recorder, [Job(chunks=['x0', 'x1', 'x2'], tenant='x', priority=PRIORITY_CLASSES['batch'])],
+         weights={'default': 1.0, 'x': 1.0})
+    # 两个租户交替执行，而不是先把一个作业跑完
+    assert recorder.order[:4] in (['b0', 'x0', 'b1', 'x1'], ['b0', 'b1', 'x0', 'b2'])
+    assert recorder.order.index('x0') < recorder.order.index('b2')
+
+
+def test_near_deadline_job_runs_first():
+    recorder = Recorder()
+    late = Job(chunks=['n0'], priority=PRIORITY_CLASSES['prefetch'], deadline=time.monotonic() + 1)
+    _run(recorder, [Job(chunks=['i0'], priority=PRIORITY_CLASSES['interactive']), late])
+    assert recorder.order[:3] == ['b0', 'n0', 'i0']
+
+
+def test_cancel_queued_job():
+    recorder = Recorder()
+    scheduler = FairScheduler(recorder, workers=1)
+    try:
+        running = scheduler.submit(Job(chunks=['a0', 'a1']))
+        assert recorder.started.wait(5)
+        queued = scheduler.submit(Job(chunks=['c0']))
+        assert scheduler.cancel(queued)
+        assert queued.finished and queued.state == JOB_FAILED and queued.error == 'cancelled'
+        assert not scheduler.cancel(queued)
+        recorder.gate.set()
+        assert running.wait(5)
+    finally:
+        scheduler.shutdown()
+    assert 'c0' not in recorder.order
+
+
+def test_failing_chunk_fails_job():
+    def run_chunk(job, index, text):
+        raise RuntimeError('engine crashed')
+
+    scheduler = FairScheduler(run_chunk, workers=1)
+    try:
+        job = scheduler.submit(Job(chunks=['a', 'b']))
+        assert job.wait(5)
+    finally:
+        scheduler.shutdown()
+    assert job.state == JOB_FAILED and job.error == 'engine crashed'
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""增量重合成的分块存档（tts_core/segments.py）"""
+
+import numpy as np
+import soundfile as sf
+
+from tts_core import pcm
+from tts_core.segments import SegmentStore, segments_dir
+
+RATE = 16000
+
+
+def write_tone(path, seconds=0.1):
+    t = np.arange(int(RATE * seconds)) / RATE
+    sf.write(str(path), (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), RATE)
+    return path
+
+
+def test_store_commit_and_reload(tmp_path):
+    output = tmp_path / 'book.mp3'
+    store = SegmentStore(output)
+    assert store.root == segments_dir(output) == tmp_path / '.book.mp3.segments'
+    first, second = store.key('edge-tts', '第一段'), store.key('edge-tts', '第二段')
+    assert store.key('edge-tts', '第一段', 'yunxi') != first
+    path = store.store(first, write_tone(tmp_path / 'a.wav'))
+    store.store(second, write_tone(tmp_path / 'b.wav'))
+    assert store.get(first) == path and not (tmp_path / 'a.wav').exists()
+    store.commit([first, second])
+
+    reloaded = SegmentStore(output)
+    assert reloaded.order == [first, second] and reloaded.get(second) is not None
+    # 不再引用的块在提交时删除
+    reloaded.commit([second])
+    assert reloaded.get(first) is None and not path.exists()
+    assert SegmentStore(output).segments.keys() == {second}
+
+
+def test_pcm_segments_are_saved_as_wav(tmp_path, monkeypatch):
+    monkeypatch.setattr(pcm, 'shared_dir', lambda: tmp_path)
+    source = pcm.new_pcm_path('chunk')
+    pcm.write_pcm(source, np.zeros(1600, dtype=np.float32), RATE)
+    store = SegmentStore(tmp_path / 'out.wav')
+    path = store.store('abc', source)
+    assert path.name == 'abc.wav' and sf.info(str(path)).frames == 1600
+    assert not source.exists() and not pcm.descriptor_path(source).exists()
+
+
+def test_corrupt_manifest_is_ignored(tmp_path):
+    root = segments_dir(tmp_path / 'out.wav')
+    root.mkdir()
+    (root / 'manifest.json').write_text('{not json', encoding='utf-8')
+    assert SegmentStore(tmp_path / 'out.wav').segments == {}
+
+
+def test_incremental_run_only_synthesizes_edited_chunks(cli, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    skill = cli.TTSSkill()
+    calls = []
+
+    def synthesize_chunk(engine, text, work_dir, index, voice=None, extra_args=None, lang='zh'):
+        calls.append(text)
+        return write_tone(work_dir / f'{index}.wav')
+
+    monkeypatch.setattr(skill, 'synthesize_chunk', synthesize_chunk)
+    output = tmp_path / 'book.wav'
+    chunks = ['第一段。', '第二段。', '第三段。']
+    assert skill.run_long_text('edge-tts', chunks, output=output, fmt='wav', normalize=False, incremental=True)
+    assert calls == chunks and sf.info(str(output)).duration == 0.3
+
+    calls.clear()
+    chunks[1] = '改过的第二段。'
+    assert skill.run_long_text('edge-tts', chunks, output=output, fmt='wav', normalize=False, incremental=True)
+    assert calls == ['改过的第二段。']
+    assert len(SegmentStore(output).segments) == 3
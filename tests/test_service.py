@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""服务层（tts_core/service.py），引擎调用以写入正弦波的假实现代替"""
+
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from tts_core.service import RequestError, SynthesisService, _Handler
+
+RATE = 16000
+
+
+def write_tone(path, seconds=0.1, freq=440.0):
+    t = np.arange(int(RATE * seconds)) / RATE
+    sf.write(str(path), (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32), RATE)
+    return path
+
+
+@pytest.fixture
+def skill(cli, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    skill = cli.TTSSkill()
+    skill.output_dir = tmp_path / 'output'
+    calls = []
+
+    def synthesize_chunk(engine, text, work_dir, index, voice=None, extra_args=None, lang='zh'):
+        calls.append(text)
+        return write_tone(work_dir / f'{index:06d}.wav')
+
+    monkeypatch.setattr(skill, 'synthesize_chunk', synthesize_chunk)
+    skill.calls = calls
+    return skill
+
+
+@pytest.fixture
+def make_service(skill):
+    services = []
+
+    def make(**kwargs):
+        kwargs.setdefault('chunk_chars', 20)
+        service = SynthesisService(skill, **kwargs)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.scheduler.shutdown()
+
+
+@pytest.fixture
+def http(make_service):
+    """在随机端口上运行服务，返回 (service, 发送请求的函数)"""
+    service = make_service()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), type('Handler', (_Handler,), {'service': service}))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    def call(method, path, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(base + path, data=data, method=method, headers=headers or {})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), e.read()
+
+    yield service, call
+    server.shutdown()
+    server.server_close()
+
+
+def test_chunks_are_synthesized_and_joined(make_service, skill):
+    service = make_service(chunk_chars=6)
+    job = service.submit({'text': '第一句话。第二句话。第三句话。', 'engine': 'edge-tts', 'format': 'wav'})
+    assert job.wait(5) and not job.error
+    assert skill.calls == ['第一句话。', '第二句话。', '第三句话。']
+    output = job.payload['output']
+    assert sf.info(str(output)).duration == pytest.approx(0.3, abs=0.01)
+    # 分块目录在拼接后删除，同步请求的输出发送后删除
+    assert not job.payload['work_dir'].exists()
+    service.release(job)
+    assert not output.exists()
+
+
+@pytest.mark.parametrize('request_body, message', [
+    ({'text': '  '}, 'text is required'),
+    ({'text': '你好', 'engine': 'nope'}, 'unsupported engine'),
+    ({'text': '你好', 'format': 'aac'}, 'unsupported format'),
+    ({'text': '你好', 'priority': 'urgent'}, 'unknown priority'),
+])
+def test_invalid_requests(make_service, request_body, message):
+    with pytest.raises(RequestError, match=message):
+        make_service().submit(request_body)
+
+
+def test_http_synthesize_returns_audio(http):
+    service, call = http
+    status, headers, body = call('POST', '/synthesize', {'text': '你好，世界。', 'format': 'wav'},
+                                 {'X-Tenant': 'team-a', 'X-Priority': 'interactive'})
+    assert status == 200 and headers['Content-Type'] == 'audio/wav'
+    assert sf.info(io.BytesIO(body)).duration == pytest.approx(0.1, abs=0.01)
+    assert not [p for p in service.output_dir.iterdir() if p.is_file()]
+
+    status, _, body = call('POST', '/synthesize', {'text': '你好', 'engine': 'nope'})
+    assert status == 400 and 'unsupported engine' in json.loads(body)['error']
+    assert call('GET', '/health')[0] == 200
+    assert call('GET', '/nothing')[0] == 404
+
+
+def test_http_async_job_roundtrip(http):
+    service, call = http
+    status, _, body = call('POST', '/jobs', {'text': '你好。', 'format': 'wav', 'marker': 'done.json'})
+    assert status == 202
+    job_id = json.loads(body)['job_id']
+    service._async[job_id].wait(5)
+    status, _, body = call('GET', f'/jobs/{job_id}/result')
+    assert status == 200 and body[:4] == b'RIFF'
+    assert json.loads(call('GET', f'/jobs/{job_id}')[2])['state'] == 'done'
+    assert call('GET', '/jobs/unknown')[0] == 404
+    # 完成标记只能写在 markers/ 下
+    status, _, body = call('POST', '/jobs', {'text': '你好。', 'marker': '../escape.json'})
+    assert status == 400
+
+
+def _async_request(text='你好，世界。'):
+    return {'text': text, 'engine': 'edge-tts', 'format': 'wav'}
+
+
+def test_async_jobs_follow_configured_retention(make_service):
+    service = make_service(output_retention=5.0)
+    first = service.submit_async(_async_request('第一句。'))
+    assert first.wait(5)
+    assert service.job_status(first.job_id)['state'] == 'done'
+    # 结束超过保留时长后，下一次提交时从内存中移除
+    first.finished_at -= 10
+    second = service.submit_async(_async_request('第二句。'))
+    assert second.wait(5)
+    assert service.job_status(first.job_id) is None
+    assert service.job_status(second.job_id)['state'] == 'done'
+
+
+def test_zero_retention_keeps_async_jobs(make_service):
+    service = make_service(output_retention=0)
+    first = service.submit_async(_async_request('第一句。'))
+    assert first.wait(5)
+    first.finished_at -= 10 ** 6
+    service.submit_async(_async_request('第二句。')).wait(5)
+    assert service.job_status(first.job_id)['state'] == 'done'
+
+
+def test_default_format_follows_engine_config(make_service, tmp_path):
+    service = make_service()
+    assert service._build_job({'text': '你好。', 'engine': 'edge-tts'}, None, None).payload['format'] == 'mp3'
+    (tmp_path / 'openai-tts.config').write_text('[OpenAI]\noutput_format = flac\n', encoding='utf-8')
+    job = service._build_job({'text': '你好。', 'engine': 'openai-tts'}, None, None)
+    assert job.payload['format'] == 'flac'
+    # 请求中显式指定的格式优先
+    job = service._build_job({'text': '你好。', 'engine': 'openai-tts', 'format': 'wav'}, None, None)
+    assert job.payload['format'] == 'wav'
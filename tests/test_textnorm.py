@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from tts_core.textnorm import en_year, normalize_text, zh_integer
+
+
+@pytest.mark.parametrize('text, expected', [
+    # 时长按整数读，年份（四位数字或后跟月份）逐位读
+    ('我工作了10年', '我工作了十年'),
+    ('他活了100年', '他活了一百年'),
+    ('1999年', '一九九九年'),
+    ('98年3月', '九八年三月'),
+    ('2024年5月1日', '二零二四年五月一日'),
+    # 量词前读“两”
+    ('2个苹果', '两个苹果'),
+    ('学了2年', '学了两年'),
+    ('2000个人', '两千个人'),
+    ('22个', '二十二个'),
+    ('2年级', '二年级'),
+    # 范围
+    ('1999-2005年', '一九九九到二零零五年'),
+    ('第3-5页', '第三到五页'),
+    ('比分是3-1', '比分是三-一'),
+    ('百分之50', '百分之五十'),
+    ('15%的人', '百分之十五的人'),
+    ('版本v1.2.3发布', '版本一点二点三发布'),
+    ('支持5G网络', '支持5G网络'),
+    ('温度 -5度', '温度 负五度'),
+    ('气温-3.5℃', '气温负三点五摄氏度'),
+    # 数字按所在的语言片段读，单个字母不改变读法；紧跟汉字时按后面的片段读
+    ('型号X-3', '型号X-三'),
+    ('A股涨了3%', 'A股涨了百分之三'),
+    ('Hello，5个苹果', 'Hello，五个苹果'),
+    ('iPhone 15 发布了', 'iPhone fifteen 发布了'),
+])
+def test_chinese(text, expected):
+    assert normalize_text(text, 'zh') == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('From 1999-2005 he worked.', 'From nineteen ninety-nine to two thousand five he worked.'),
+    ('pages 10-20', 'pages ten to twenty'),
+    ('It costs 3~5 dollars', 'It costs three to five dollars'),
+    ('It is 25% off', 'It is twenty-five percent off'),
+    ('Dr. Smith', 'Doctor Smith'),
+    # 连字符不是负号
+    ('GPT-4 is here', 'GPT-four is here'),
+    ('COVID-19', 'COVID-nineteen'),
+    ('-5 degrees', 'minus five degrees'),
+    ('(-5)', '(minus five)'),
+    ('It costs $-5', 'It costs minus five dollars'),
+    # 与拉丁字母相连的数字保持原样
+    ('5G and MP3', '5G and MP3'),
+    ('H2O, K8s, 3D and Q3', 'H2O, K8s, 3D and Q3'),
+    # 四位整数按年份读
+    ('In 1990.', 'In nineteen ninety.'),
+    ('In 2005 and 2024', 'In two thousand five and twenty twenty-four'),
+    ('About 1,990 people', 'About one thousand nine hundred ninety people'),
+    ('version 2.0.1.', 'version two point zero point one.'),
+])
+def test_english(text, expected):
+    assert normalize_text(text, 'en') == expected
+
+
+def test_number_readings():
+    assert zh_integer(10010) == '一万零一十'
+    assert zh_integer(15) == '十五'
+    assert en_year(2024) == 'twenty twenty-four'
+    assert en_year(1905) == 'nineteen oh-five'
+    assert en_year(2005) == 'two thousand five'
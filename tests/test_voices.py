@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""音色目录（tts_core/voices.py）"""
+
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from tts_core import voices
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    monkeypatch.setattr(voices, 'CACHE_FILE', tmp_path / 'cache' / 'voices.json')
+    monkeypatch.setattr(voices, '_memo', {})
+    assets_dir = tmp_path / 'assets'
+    assets_dir.mkdir()
+    sf.write(str(assets_dir / '小明.wav'), np.zeros(8000, dtype=np.float32), 16000)
+    (assets_dir / '小明.txt').write_text('大家好，我是小明。', encoding='utf-8')
+    # 没有转写文本的音频不能作为参考音色
+    sf.write(str(assets_dir / 'orphan.wav'), np.zeros(800, dtype=np.float32), 16000)
+    return assets_dir
+
+
+def _touch_later(path, stamp):
+    os.utime(path, ns=(stamp + 10 ** 9, stamp + 10 ** 9))
+
+
+def test_local_voices_need_a_transcript(assets):
+    [voice] = voices.local_voices(assets)
+    assert (voice['voice'], voice['language'], voice['sample_seconds']) == ('小明', 'zh', 0.5)
+    assert voices.CACHE_FILE.exists()
+
+
+def test_rewritten_transcript_invalidates_cache(assets):
+    assert voices.local_voices(assets)[0]['language'] == 'zh'
+    dir_mtime = assets.stat().st_mtime_ns
+    transcript = assets / '小明.txt'
+    transcript.write_text('Hello, this is Ming.', encoding='utf-8')
+    _touch_later(transcript, transcript.stat().st_mtime_ns)
+    # 原地改写不改变目录的 mtime
+    os.utime(assets, ns=(dir_mtime, dir_mtime))
+    assert voices.local_voices(assets)[0]['language'] == 'en'
+    # 新进程（只有磁盘缓存）同样看到改写后的内容
+    voices._memo.clear()
+    assert voices.local_voices(assets)[0]['language'] == 'en'
+
+
+def test_rewritten_audio_invalidates_cache(assets):
+    assert voices.local_voices(assets)[0]['sample_seconds'] == 0.5
+    dir_mtime = assets.stat().st_mtime_ns
+    audio = assets / '小明.wav'
+    sf.write(str(audio), np.zeros(16000, dtype=np.float32), 16000)
+    _touch_later(audio, audio.stat().st_mtime_ns)
+    os.utime(assets, ns=(dir_mtime, dir_mtime))
+    assert voices.local_voices(assets)[0]['sample_seconds'] == 1.0
+
+
+def test_query_filters(assets):
+    catalog = voices.build_catalog(assets)
+    assert {v['engine'] for v in voices.query(catalog, lang='zh')} == {'edge-tts', 'openai-tts', 'qwen3-tts'}
+    assert all(v['engine'] == 'openai-tts' for v in voices.query(catalog, lang='en'))
+    assert [v['voice'] for v in voices.query(catalog, engine='qwen3-tts')] == ['小明']
+    assert all(v['gender'] == 'female' for v in voices.query(catalog, gender='FEMALE'))
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import time
+
+from tts_core.workqueue import UNIT_DONE, UNIT_FAILED, UNIT_LEASED, UNIT_QUEUED, WorkQueue
+
+
+def test_enqueue_is_idempotent(tmp_path):
+    with WorkQueue(tmp_path / 'queue.sqlite') as queue:
+        assert queue.enqueue('u1', {'items': [1, 2]})
+        assert not queue.enqueue('u1', {'items': [1, 2]})
+        # 内容变化时重新入队
+        assert queue.enqueue('u1', {'items': [1, 2, 3]})
+        assert queue.summary()[UNIT_QUEUED] == 1
+
+
+def test_lease_complete(tmp_path):
+    with WorkQueue(tmp_path / 'queue.sqlite') as queue:
+        queue.enqueue('u1', {'n': 1})
+        unit = queue.lease('w1')
+        assert unit['unit_id'] == 'u1' and unit['payload'] == {'n': 1} and unit['attempts'] == 1
+        assert queue.lease('w2') is None
+        assert queue.heartbeat('u1', 'w1')
+        assert queue.complete('u1', 'w1')
+        assert queue.summary()[UNIT_DONE] == 1
+        # 已完成的单元再次入队时保持完成
+        assert not queue.enqueue('u1', {'n': 1})
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    with WorkQueue(tmp_path / 'queue.sqlite', lease_seconds=0.05) as queue:
+        queue.enqueue('u1', {})
+        assert queue.lease('w1')['worker'] == 'w1'
+        time.sleep(0.1)
+        unit = queue.lease('w2')
+        assert unit['worker'] == 'w2' and unit['attempts'] == 2
+        # 原 worker 已失去租约
+        assert not queue.heartbeat('u1', 'w1')
+        assert not queue.complete('u1', 'w1')
+        assert queue.complete('u1', 'w2')
+
+
+def test_repeated_expiry_fails_unit(tmp_path):
+    with WorkQueue(tmp_path / 'queue.sqlite', lease_seconds=0.05, max_attempts=2) as queue:
+        queue.enqueue('u1', {})
+        for worker in ('w1', 'w2'):
+            assert queue.lease(worker)
+            time.sleep(0.1)
+        assert queue.lease('w3') is None
+        assert queue.failures() == [{'unit_id': 'u1', 'attempts': 2, 'error': 'lease expired'}]
+        # 失败的单元可以重新入队
+        assert queue.enqueue('u1', {})
+        assert queue.summary()[UNIT_QUEUED] == 1
+
+
+def test_fail_requeues_until_max_attempts(tmp_path):
+    with WorkQueue(tmp_path / 'queue.sqlite', max_attempts=2) as queue:
+        queue.enqueue('u1', {})
+        queue.lease('w1')
+        queue.fail('u1', 'w1', 'boom')
+        assert queue.summary()[UNIT_QUEUED] == 1
+        queue.lease('w1')
+        assert queue.summary()[UNIT_LEASED] == 1
+        queue.fail('u1', 'w1', 'boom again')
+        assert queue.summary()[UNIT_FAILED] == 1
+        assert queue.failures()[0]['error'] == 'boom again'
@@ -7,29 +7,44 @@ TTS-Skill 主入口
 
 import os
 import sys
-import argparse
-import subprocess
 from pathlib import Path
 import time
-import re
 
-# Set UTF-8 encoding for console output
-if sys.stdout.encoding != 'utf-8':
-    sys.stdout.reconfigure(encoding='utf-8')
-if sys.stderr.encoding != 'utf-8':
-    sys.stderr.reconfigure(encoding='utf-8')
+# 启动耗时敏感：argparse、subprocess 及 tts_core 模块均在用到时才导入
 
-def detect_language(text: str) -> str:
-    chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
-    english_pattern = re.compile(r'[a-zA-Z]')
-    chinese_count = len(chinese_pattern.findall(text))
-    english_count = len(english_pattern.findall(text))
-    return 'zh' if chinese_count > english_count else 'en'
+# 无需参数解析即可直接执行的工具命令
+FAST_TOOL_COMMANDS = ('--list-engines', '--list-voices', '--help', '-h')
+
+
+def configure_stdio():
+    """Set UTF-8 encoding for console output"""
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    if sys.stderr.encoding != 'utf-8':
+        sys.stderr.reconfigure(encoding='utf-8')
 
 
 def t(lang: str, zh: str, en: str) -> str:
     return zh if lang == 'zh' else en
 
+
+def strip_options(argv, flags=(), valued=()):
+    """从命令行中去掉指定选项（valued 中的选项连同其值），--submit 据此把其余参数原样交给后台作业"""
+    result = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        if arg in flags:
+            continue
+        if name in valued:
+            skip = '=' not in arg
+            continue
+        result.append(arg)
+    return result
+
 class TTSSkill:
     def __init__(self):
         self.engines_dir = Path(__file__).parent / 'engines'
@@ -40,23 +55,106 @@ class TTSSkill:
             'edge-tts': 'edge-tts-cli.py',
             'openai-tts': 'openai-tts-cli.py'
         }
+        # 各引擎未配置 output_format 时写出的音频格式，实际默认格式见 default_format()
+        self.default_extensions = {
+            'qwen3-tts': 'wav',
+            'edge-tts': 'mp3',
+            'openai-tts': 'mp3'
+        }
+        # 引擎可直接输出的格式（多于一种时引擎支持 --format 参数），其余格式由后处理转换
+        self.native_formats = {
+            'qwen3-tts': ('wav', 'flac', 'opus', 'mp3'),
+            'edge-tts': ('mp3',),
+            'openai-tts': ('mp3', 'opus', 'flac', 'wav')
+        }
+        # 可在引擎进程内完成重采样的引擎
+        self.native_resample = {'qwen3-tts'}
+        # 可经共享内存交出原始采样 (--format pcm) 的引擎，需要后处理或拼接时不再经过 WAV 编解码
+        self.pcm_engines = {'qwen3-tts'}
+        # 运行指标 (tts_core.metrics.Registry)；为 None 时不采集
+        self.metrics = None
+        # 下一次引擎调用的 cProfile 输出路径（性能剖析用）；为 None 时不剖析
+        self.profile_dump = None
+        # 静音裁剪阈值 (dBFS，None 为不裁剪) 与拼接片段间的间隔/交叉淡化，见 tts_core/audio.py
+        self.join_options = {'trim_db': None, 'gap_ms': 0, 'crossfade_ms': 0}
+        # 模板请求的固定片段库目录，见 tts_core/phrases.py
+        self.phrase_dir = None
+        # 常驻引擎进程池 (tts_core.enginepool.EnginePool)；为 None 时每次调用启动新进程
+        self.pool = None
+        # 记录引擎调用耗时的计时库路径，供自适应分块使用（见 tts_core/chunksize.py）；为 None 时不记录
+        self.timing_store = None
 
         # 创建输出目录
         self.output_dir.mkdir(exist_ok=True)
 
-    def generate_output_filename(self, text, extension='wav'):
-        """生成输出文件名：日期+文本前6个字"""
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
+    def generate_output_filename(self, text, extension='wav', template=None, engine=None, voice=None):
+        """生成输出文件名：默认为日期+文本前6个字，可用命名模板替换（见 tts_core/outputs.py）"""
+        from tts_core.outputs import render_name
+        return render_name(template, text, extension, engine=engine, voice=voice)
+
+    def output_settings(self, fmt=None, sample_rate=None, loudness=None):
+        """影响输出内容的设置，与引擎额外参数一起计入内容哈希（任务日志与 {hash} 命名）"""
+        settings = [f"format={fmt}", f"sample_rate={sample_rate}", f"loudness={loudness}"] if (fmt or sample_rate or loudness is not None) else []
+        if self.join_options['trim_db'] is not None:
+            settings.append(f"trim_db={self.join_options['trim_db']}")
+        return settings
+
+    def default_format(self, engine, extra_args=None):
+        """引擎的默认输出格式：引擎配置文件 (extra_args 中的 --config 或默认位置) 的 output_format，
+        引擎不能直接输出该格式时为 default_extensions 中的格式"""
+        fallback = self.default_extensions.get(engine, 'wav')
+        native = self.native_formats.get(engine, (fallback,))
+        if len(native) == 1:
+            return fallback
+        from tts_core.config import SCHEMAS, ConfigError, load_config
+
+        if engine not in SCHEMAS:
+            return fallback
+        config_path = None
+        args = list(extra_args or [])
+        for index, arg in enumerate(args):
+            if arg == '--config' and index + 1 < len(args):
+                config_path = args[index + 1]
+            elif arg.startswith('--config='):
+                config_path = arg.split('=', 1)[1]
+        try:
+            configured = load_config(engine, config_path).get('output_format')
+        except ConfigError:
+            # 配置错误由引擎自身报告
+            return fallback
+        return configured if configured in native else fallback
+
+    def plan_output(self, engine, output_path, fmt=None, sample_rate=None, loudness=None):
+        """确定引擎直接写出的文件与所需的后处理
 
-        # 获取输入文本的前6个字
-        prefix = text[:6] if len(text) >= 6 else text
-        prefix = prefix.strip().replace("\n", " ").replace("\r", " ")
-        prefix = "_".join(prefix.split())
-        invalid_chars = '<>:"/\\|?*'
-        prefix = "".join(c for c in prefix if c not in invalid_chars)
-        prefix = prefix.strip(" ._") or "tts"
+        返回 (引擎输出路径, 追加的引擎参数, 后处理参数或 None)
+        """
+        output_path = Path(output_path)
+        default_format = self.default_format(engine)
+        native = self.native_formats.get(engine, (default_format,))
+        if not fmt:
+            suffix = output_path.suffix.lower().lstrip('.')
+            fmt = suffix if suffix in native else default_format
 
-        return f"{timestamp}_{prefix}.{extension}"
+        resample_native = not sample_rate or engine in self.native_resample
+        trim_db = self.join_options['trim_db']
+        if fmt in native and resample_native and loudness is None and trim_db is None:
+            engine_args = ['--format', fmt] if len(native) > 1 else []
+            if sample_rate:
+                engine_args.extend(['--sample-rate', str(sample_rate)])
+            return output_path, engine_args, None
+
+        # 引擎先输出中间结果，再由后处理编码到最终路径：支持时经共享内存交接原始采样，否则为原生格式的文件
+        if engine in self.pcm_engines:
+            from tts_core.pcm import PCM_FORMAT, new_pcm_path
+            raw_path = new_pcm_path(output_path.stem)
+            engine_args = ['--format', PCM_FORMAT]
+        else:
+            raw_path = output_path.with_name(f".{output_path.stem}.raw.{default_format}")
+            engine_args = ['--format', default_format] if len(native) > 1 else []
+        post = {'src': raw_path, 'dst': output_path, 'fmt': fmt, 'sample_rate': sample_rate, 'loudness': loudness,
+                'trim_db': trim_db}
+        return raw_path, engine_args, post
 
     def show_help(self):
         """显示帮助信息"""
@@ -87,8 +185,12 @@ TTS-Skill - 多引擎文本转语音技能
 
 工具命令:
     --list-engines     列出所有引擎
-    --list-voices      列出所有音色
+    --list-voices      列出所有音色 (可加引擎名、--gender、--lang、--json)
     --install          安装Qwen3-TTS环境
+    --batch 清单       批量生成 (可中断续跑)
+    --profile          性能剖析 (RTF、每秒字数、冷/热延迟)
+    --template 模板    模板合成，如 --template "您的订单 {N} 已发货" --slot N=12345
+    --submit           异步提交，立即返回作业 ID (--status / --result 查询，--callback / --marker 通知)
     --help             显示此帮助信息
 
 详细文档: 查看 SKILL.md 文件
@@ -103,52 +205,40 @@ TTS-Skill - 多引擎文本转语音技能
             status = "可用" if engine_path.exists() else "缺失"
             print(f"  {engine} -> {filename} {status}")
 
-    def list_voices(self):
-        """列出所有可用的音色"""
-        print("可用音色列表:")
+    def list_voices(self, engine=None, lang=None, gender=None, as_json=False):
+        """列出可用音色；数据来自音色目录 (tts_core/voices.py)，本地音色的扫描结果有磁盘缓存"""
+        from tts_core.voices import build_catalog, query
 
-        # 列出assets目录下的音色
-        print("\n本地音色 (Qwen3-TTS):")
-        if self.assets_dir.exists():
-            for audio_file in self.assets_dir.rglob('*.mp3'):
-                relative_path = audio_file.relative_to(self.assets_dir)
-                print(f"  - {audio_file.stem} ({relative_path})")
-
-            for audio_file in self.assets_dir.rglob('*.wav'):
-                if not audio_file.name.endswith('.mp3'):
-                    relative_path = audio_file.relative_to(self.assets_dir)
-                    print(f"  - {audio_file.stem} ({relative_path})")
-        else:
-            print("  assets目录不存在")
-
-        # 列出在线音色
-        print("\n在线音色 (VoiceCraft):")
-        online_voices = {
-            'xiaoxiao': '晓晓 (温柔女声)',
-            'xiaoyi': '晓伊 (甜美女声)',
-            'xiaochen': '晓辰 (知性女声)',
-            'yunxi': '云希 (清朗男声)',
-            'yunyang': '云扬 (阳光男声)',
-            'yunjian': '云健 (稳重男声)'
-        }
-        for voice, description in online_voices.items():
-            print(f"  - {voice} -> {description}")
-
-        # 列出OpenAI音色
-        print("\nOpenAI音色:")
-        openai_voices = {
-            'alloy': '中性平衡',
-            'echo': '深沉磁性',
-            'fable': '轻快活泼',
-            'onyx': '严肃有力',
-            'nova': '温暖女性',
-            'shimmer': '清晰悦耳'
+        voices = query(build_catalog(self.assets_dir), engine=engine, lang=lang, gender=gender)
+        if as_json:
+            import json
+            print(json.dumps(voices, ensure_ascii=False, indent=2))
+            return
+
+        titles = {
+            'qwen3-tts': '本地音色 (Qwen3-TTS)',
+            'edge-tts': '在线音色 (VoiceCraft)',
+            'openai-tts': 'OpenAI音色',
         }
-        for voice, description in openai_voices.items():
-            print(f"  - {voice} -> {description}")
+        genders = {'female': '女声', 'male': '男声', 'neutral': '中性'}
+        print("可用音色列表:")
+        for name, title in titles.items():
+            if engine and engine != name:
+                continue
+            print(f"\n{title}:")
+            entries = [voice for voice in voices if voice['engine'] == name]
+            if not entries:
+                print("  (无)")
+            for voice in entries:
+                details = [genders.get(voice['gender'], ''), voice['description']]
+                if voice['sample_seconds']:
+                    details.append(f"{voice['sample_seconds']:.1f}s")
+                if voice['language'] and name == 'qwen3-tts':
+                    details.insert(0, voice['language'])
+                print(f"  - {voice['voice']} -> {', '.join(d for d in details if d)}")
 
-    def run_engine(self, engine, args, lang='zh'):
-        """运行指定的TTS引擎"""
+    def run_engine(self, engine, args, lang='zh', input_text=None):
+        """运行指定的TTS引擎；input_text 通过标准输入传给引擎（参数中需带 --text-file -）"""
         if engine not in self.supported_engines:
             print(t(lang, f"ERROR: 不支持的引擎: {engine}", f"ERROR: Unsupported engine: {engine}"))
             print(t(lang, "可用引擎:", "Available engines:"), ", ".join(self.supported_engines.keys()))
@@ -159,16 +249,45 @@ TTS-Skill - 多引擎文本转语音技能
             print(t(lang, f"ERROR: 引擎脚本不存在: {engine_script}", f"ERROR: Engine script not found: {engine_script}"))
             return False
 
+        import subprocess
+
         try:
             # 构建命令
             cmd = [sys.executable, str(engine_script)] + args
 
+            env = {**os.environ, 'PYTHONIOENCODING': 'utf-8', 'PYTHONUTF8': '1'}
+            if self.profile_dump:
+                # 引擎进程整体做 cProfile；Qwen3 推理在独立进程中，另写一份只含推理的剖析文件
+                dump = Path(self.profile_dump)
+                dump.parent.mkdir(parents=True, exist_ok=True)
+                cmd = [sys.executable, '-m', 'cProfile', '-o', str(dump), str(engine_script)] + args
+                env['TTS_PROFILE_FILE'] = str(dump.with_name(f'{dump.stem}.inference.prof'))
+            metrics_file = None
+            if self.metrics is not None:
+                # 引擎子进程把 HTTP 往返、推理耗时等写入该文件，结束后合并
+                import tempfile
+                from tts_core.metrics import METRICS_ENV
+                fd, metrics_file = tempfile.mkstemp(prefix='tts-metrics-', suffix='.jsonl')
+                os.close(fd)
+                env[METRICS_ENV] = metrics_file
+
             print(t(lang, f"启动 {engine} 引擎...", f"Starting engine: {engine} ..."))
-            result = subprocess.run(cmd, cwd=str(self.engines_dir),
-                                  encoding='utf-8', errors='replace',
-                                  env={**os.environ, 'PYTHONIOENCODING': 'utf-8', 'PYTHONUTF8': '1'})
+            start_time = time.perf_counter()
+            if self.pool is not None and not self.profile_dump:
+                # 常驻进程继承启动时的环境，每个作业只需传入本次调用的指标文件
+                job_env = {METRICS_ENV: metrics_file} if metrics_file is not None else None
+                returncode = self.pool.run(engine_script, self.engines_dir, args, input_text, job_env)
+            else:
+                returncode = subprocess.run(cmd, cwd=str(self.engines_dir), input=input_text,
+                                            encoding='utf-8', errors='replace', env=env).returncode
+            success = returncode == 0
+            if success and input_text and self.timing_store and not self.profile_dump:
+                self.record_timing(engine, args, len(input_text), time.perf_counter() - start_time)
 
-            return result.returncode == 0
+            if metrics_file is not None:
+                self.record_engine_metrics(engine, args, success, time.perf_counter() - start_time,
+                                           input_text, metrics_file)
+            return success
 
         except subprocess.CalledProcessError as e:
             print(t(lang, f"ERROR: 引擎执行失败: {e}", f"ERROR: Engine execution failed: {e}"))
@@ -177,6 +296,720 @@ TTS-Skill - 多引擎文本转语音技能
             print(t(lang, f"ERROR: 执行错误: {e}", f"ERROR: Execution error: {e}"))
             return False
 
+    def record_timing(self, engine, args, chars, seconds):
+        """把一次成功调用的 (字数, 耗时) 写入计时库；计时库不可用时不影响合成"""
+        import sqlite3
+        from tts_core.chunksize import record
+
+        voice = args[args.index('--voice') + 1] if '--voice' in args[:-1] else None
+        try:
+            record(self.timing_store, engine, voice, chars, seconds)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def chunk_size_for(self, engine, voice, chunk_chars, total_chars=None, lang='zh'):
+        """按计时库中 引擎/音色 的耗时曲线选择分块大小；没有足够的记录时返回 chunk_chars"""
+        from tts_core.chunksize import plan_chunk_chars
+
+        size, curve = plan_chunk_chars(self.timing_store, engine, voice, chunk_chars, total_chars)
+        if curve is not None:
+            print(t(lang, f"📐 自适应分块: 每块 {size} 字 (开销 {curve.overhead:.2f} 秒/次，{curve.samples} 条记录)",
+                    f"📐 Adaptive chunks: {size} chars per chunk (overhead {curve.overhead:.2f} s/call, "
+                    f"{curve.samples} timings)"))
+        return size
+
+    def record_engine_metrics(self, engine, args, success, seconds, input_text, metrics_file):
+        """记录一次引擎调用的指标：调用次数、耗时、字数、音频时长与实时率"""
+        metrics = self.metrics
+        try:
+            metrics.merge_file(metrics_file)
+        finally:
+            os.remove(metrics_file)
+
+        voice = args[args.index('--voice') + 1] if '--voice' in args[:-1] else 'default'
+        metrics.inc('tts_requests_total', engine=engine, result='ok' if success else 'error')
+        metrics.observe('tts_synthesis_seconds', seconds, engine=engine)
+        if not success:
+            metrics.inc('tts_errors_total', engine=engine, stage='engine')
+            return
+        if input_text:
+            metrics.inc('tts_chars_total', len(input_text), engine=engine)
+
+        output = Path(args[args.index('--output') + 1]) if '--output' in args[:-1] else None
+        if output is None or not output.exists():
+            return
+        try:
+            from tts_core.audio import audio_duration
+            duration = audio_duration(output)
+        except Exception:
+            # 缺少 soundfile 或格式不受支持时只记录耗时
+            return
+        if duration > 0:
+            metrics.inc('tts_audio_seconds_total', duration, engine=engine, voice=voice)
+            metrics.observe('tts_realtime_factor', seconds / duration, engine=engine, voice=voice)
+
+    def batch_dir_for(self, manifest_path):
+        """批处理输出目录: output/<清单名>"""
+        manifest_path = Path(manifest_path)
+        return self.output_dir / (manifest_path.stem if manifest_path.is_file() else manifest_path.name)
+
+    def load_batch_items(self, manifest_path, normalize=True):
+        """读取批处理清单；normalize 为 True 时条目文本先经过规范化"""
+        from tts_core.batch import load_manifest
+
+        items = load_manifest(manifest_path)
+        if normalize:
+            from tts_core.textnorm import normalize_cached
+            for item in items:
+                item.text = normalize_cached(item.text)
+        return items
+
+    def run_batch(self, engine, manifest_path, voice=None, extra_args=None, journal_path=None,
+                  fmt=None, sample_rate=None, loudness=None, pack_path=None, naming=None,
+                  normalize=True, lang='zh'):
+        """批量生成：按清单逐条调用引擎，通过任务日志跳过已完成条目
+
+        指定 pack_path 时所有条目追加写入同一个打包文件，而不是每条一个文件；
+        normalize 为 True 时条目文本先经过规范化，内容哈希与引擎输入均使用规范化结果。
+        """
+        manifest_path = Path(manifest_path)
+        items = self.load_batch_items(manifest_path, normalize)
+        return self.run_items(engine, items, self.batch_dir_for(manifest_path), label=str(manifest_path),
+                              voice=voice, extra_args=extra_args, journal_path=journal_path, fmt=fmt,
+                              sample_rate=sample_rate, loudness=loudness, pack_path=pack_path,
+                              naming=naming, lang=lang)
+
+    def run_items(self, engine, items, batch_dir, label=None, voice=None, extra_args=None, journal_path=None,
+                  fmt=None, sample_rate=None, loudness=None, pack_path=None, naming=None, lang='zh'):
+        """生成一组批处理条目，输出写入 batch_dir；run_batch 与分布式 worker 共用
+
+        内容哈希相同（规范化文本 + 音色 + 参数）的条目只合成一次，其余条目复制该结果。
+        """
+        import hashlib
+        import shutil
+        from tts_core.journal import JobJournal, content_hash
+        from tts_core.outputs import render_name, sanitize_filename_part
+
+        batch_dir = Path(batch_dir)
+        journal_path = Path(journal_path) if journal_path else batch_dir / '.journal.sqlite'
+        extension = fmt or self.default_format(engine, extra_args)
+        extra_args = list(extra_args or [])
+        # 输出设置变化时条目需要重新生成
+        settings = self.output_settings(fmt, sample_rate, loudness)
+
+        # 按内容哈希分组（保持首次出现的顺序），每组只合成一次
+        groups = {}
+        for item in items:
+            item_hash = content_hash(engine, item.text, item.voice or voice, extra_args + settings)
+            groups.setdefault(item_hash, []).append(item)
+
+        done = skipped = failed = reused = 0
+        postprocessor = None
+        pending = {}
+        pack = None
+        if pack_path:
+            from tts_core.pack import PackWriter
+            pack_path = Path(pack_path)
+            pack = PackWriter(pack_path)
+            # 打包模式下单条音频只在暂存目录中短暂存在
+            staging_dir = batch_dir / '.staging'
+
+        def output_for(item):
+            """返回 (输出文件路径, 任务日志中记录的输出引用)"""
+            if pack is not None:
+                # ID 可能含路径分隔符等字符：暂存文件名经过清理并附加 ID 的短哈希以免重名，包内仍以原 ID 为键
+                digest = hashlib.sha1(item.item_id.encode('utf-8')).hexdigest()[:8]
+                staged = f"{sanitize_filename_part(item.item_id, 'item')}-{digest}.{extension}"
+                return staging_dir / staged, f"{pack_path}#{item.item_id}"
+            if item.output:
+                output_path = Path(item.output)
+            else:
+                output_path = batch_dir / render_name(naming or '{id}', item.text, extension, engine=engine,
+                                                      voice=item.voice or voice, item_id=item.item_id,
+                                                      extra_args=extra_args + settings)
+            return output_path, str(output_path)
+
+        def materialize(source_id, source_path, item_hash, copies):
+            # 同内容条目直接复用已生成的音频：打包模式只追加索引项，文件模式复制文件
+            nonlocal done, reused
+            for item in copies:
+                output_path, output_ref = output_for(item)
+                journal.mark_running(item.item_id, item_hash, output_ref)
+                if pack is not None:
+                    pack.add_alias(item.item_id, source_id)
+                elif Path(source_path).resolve() != output_path.resolve():
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(source_path, output_path)
+                journal.mark_done(item.item_id)
+                done += 1
+                reused += 1
+
+        def finish(item_id, output_path, item_hash, copies):
+            nonlocal done
+            if pack is not None:
+                pack.add_file(item_id, output_path)
+            journal.mark_done(item_id)
+            done += 1
+            materialize(item_id, output_path, item_hash, copies)
+
+        def fail(leader, item_hash, copies, error):
+            nonlocal failed
+            journal.mark_failed(leader.item_id, error)
+            for item in copies:
+                journal.mark_running(item.item_id, item_hash, output_for(item)[1])
+                journal.mark_failed(item.item_id, t(lang, f"与 {leader.item_id} 内容相同: {error}",
+                                                     f"same content as {leader.item_id}: {error}"))
+            failed += 1 + len(copies)
+
+        def collect(block=False):
+            # 后处理在后台线程进行，完成后在主线程更新任务日志
+            for future in list(pending):
+                if not block and not future.done():
+                    continue
+                leader, output_path, item_hash, copies = pending.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    fail(leader, item_hash, copies, t(lang, f"后处理失败: {e}", f"post-processing failed: {e}"))
+                    continue
+                finish(leader.item_id, output_path, item_hash, copies)
+
+        with JobJournal(journal_path) as journal:
+            print(t(lang, f"📋 批处理清单: {label or batch_dir} ({len(items)} 条，{len(groups)} 条不重复)",
+                    f"📋 Batch manifest: {label or batch_dir} ({len(items)} items, {len(groups)} unique)"))
+            print(t(lang, f"📒 任务日志: {journal_path}", f"📒 Job journal: {journal_path}"))
+            if pack is not None:
+                print(t(lang, f"📦 打包输出: {pack_path}", f"📦 Pack output: {pack_path}"))
+
+            # 打包模式下输出引用为 "<pack>#<id>"，以包内是否有该条目判断输出是否存在
+            exists = (lambda ref: ref.rsplit('#', 1)[-1] in pack) if pack is not None else None
+            try:
+                for index, (item_hash, members) in enumerate(groups.items(), start=1):
+                    todo = [item for item in members
+                            if not journal.is_done(item.item_id, item_hash, exists=exists, output_path=output_for(item)[1])]
+                    skipped += len(members) - len(todo)
+                    if not todo:
+                        continue
+
+                    # 此前已有同内容条目完成时直接复用，无需再次合成
+                    if len(todo) < len(members):
+                        source = next(item for item in members if item not in todo)
+                        source_path = None if pack is not None else journal.get(source.item_id)['output_path']
+                        materialize(source.item_id, source_path, item_hash, todo)
+                        continue
+
+                    leader, copies = todo[0], todo[1:]
+                    item_voice = leader.voice or voice
+                    output_path, output_ref = output_for(leader)
+                    output_path.parent.mkdir(parents=True, exist_ok=True)
+                    engine_output, format_args, post = self.plan_output(engine, output_path, fmt, sample_rate, loudness)
+                    # 清理上次中断遗留的不完整输出
+                    for stale in {output_path, engine_output}:
+                        if stale.exists():
+                            stale.unlink()
+
+                    label = leader.item_id if not copies else f"{leader.item_id} (+{len(copies)})"
+                    print(t(lang, f"\n[{index}/{len(groups)}] {label}", f"\n[{index}/{len(groups)}] {label}"))
+                    journal.mark_running(leader.item_id, item_hash, output_ref)
+
+                    engine_args = ['--text-file', '-', '--output', str(engine_output)] + format_args
+                    if item_voice:
+                        engine_args.extend(['--voice', item_voice])
+                    engine_args.extend(extra_args)
+
+                    ok = False
+                    try:
+                        ok = self.run_engine(engine, engine_args, lang=lang, input_text=leader.text) and engine_output.exists()
+                    finally:
+                        # 失败或被中断时释放引擎的中间输出（共享内存中的交接文件占用内存）
+                        if not ok and post and engine_output.exists():
+                            from tts_core.audio import remove_audio
+                            remove_audio(engine_output)
+                    if not ok:
+                        fail(leader, item_hash, copies, t(lang, "引擎执行失败或未生成输出文件", "engine failed or produced no output"))
+                    elif post:
+                        if postprocessor is None:
+                            from tts_core.audio import PostProcessor
+                            postprocessor = PostProcessor()
+                        pending[postprocessor.submit(**post)] = (leader, output_path, item_hash, copies)
+                    else:
+                        finish(leader.item_id, output_path, item_hash, copies)
+                    collect()
+            finally:
+                if postprocessor is not None:
+                    postprocessor.shutdown(wait=True)
+                    collect(block=True)
+                if pack is not None:
+                    pack.close()
+
+        synthesized = done - reused
+        if self.metrics is not None:
+            self.metrics.inc('tts_cache_hits_total', skipped, cache='journal')
+            self.metrics.inc('tts_cache_hits_total', reused, cache='dedup')
+            self.metrics.inc('tts_cache_misses_total', synthesized + failed, cache='dedup')
+        print(t(lang, "\n📊 批处理统计:", "\n📊 Batch stats:"))
+        print(t(lang, f"   本次完成: {done} (合成 {synthesized}，复用 {reused})",
+                f"   Completed: {done} ({synthesized} synthesized, {reused} reused)"))
+        print(t(lang, f"   已跳过 (此前完成): {skipped}", f"   Skipped (already done): {skipped}"))
+        print(t(lang, f"   失败: {failed}", f"   Failed: {failed}"))
+        if items:
+            ratio = 1 - len(groups) / len(items)
+            print(t(lang, f"   去重率: {ratio:.1%} ({len(items)} 条 -> {len(groups)} 条不重复)",
+                    f"   Dedup ratio: {ratio:.1%} ({len(items)} items -> {len(groups)} unique)"))
+        return failed == 0
+
+    def chunk_output(self, engine, work_dir, index, extra_args=None):
+        """单个分块的引擎输出路径与格式参数；支持共享内存交接的引擎不经过文件编解码"""
+        if engine in self.pcm_engines:
+            from tts_core.pcm import PCM_FORMAT, new_pcm_path
+            return new_pcm_path(f'chunk{index:06d}'), ['--format', PCM_FORMAT]
+        fmt = self.default_format(engine, extra_args)
+        format_args = ['--format', fmt] if len(self.native_formats.get(engine, ())) > 1 else []
+        return Path(work_dir) / f"{index:06d}.{fmt}", format_args
+
+    def synthesize_chunk(self, engine, text, work_dir, index, voice=None, extra_args=None, lang='zh'):
+        """合成一个片段到临时输出（见 chunk_output），返回路径；失败时清理残留并返回 None"""
+        chunk_path, format_args = self.chunk_output(engine, work_dir, index, extra_args)
+        engine_args = ['--text-file', '-', '--output', str(chunk_path)] + format_args
+        if voice:
+            engine_args.extend(['--voice', voice])
+        engine_args.extend(extra_args or [])
+        success = False
+        try:
+            success = self.run_engine(engine, engine_args, lang=lang, input_text=text) and chunk_path.exists()
+        finally:
+            # 失败或被中断时清理残留（共享内存中的交接文件占用内存）
+            if not success and chunk_path.exists():
+                from tts_core.audio import remove_audio
+                remove_audio(chunk_path)
+        return chunk_path if success else None
+
+    def phrase_audio(self, bank, engine, text, work_dir, index, voice=None, extra_args=None, lang='zh'):
+        """固定片段：库中已有时直接返回，否则合成后存入库中；返回 (库中路径或 None, 是否命中)"""
+        key = bank.key(engine, text, voice, extra_args)
+        cached = bank.get(key)
+        if self.metrics is not None:
+            self.metrics.inc('tts_cache_hits_total' if cached else 'tts_cache_misses_total', cache='phrase')
+        if cached:
+            return cached, True
+        chunk_path = self.synthesize_chunk(engine, text, work_dir, index, voice, extra_args, lang)
+        if chunk_path is None:
+            return None, False
+        return bank.store(key, chunk_path), False
+
+    def run_long_text(self, engine, chunks, output=None, voice=None, extra_args=None, fmt=None,
+                      sample_rate=None, loudness=None, naming=None, normalize=True, incremental=False):
+        """长文本合成：逐块调用引擎生成片段，每块完成后立即追加到输出文件并删除
+
+        chunks 为文本块迭代器，只在轮到时读取，任意时刻内存中只有一块文本与一个音频片段。
+        incremental 为 True 时片段按内容哈希保存在输出文件旁（见 tts_core/segments.py），
+        再次运行只合成内容改动过的块，其余直接复用后重新拼接
+        """
+        import itertools
+        from tts_core.audio import ConcatWriter, remove_audio
+        from tts_core.lang import detect_language
+        from tts_core.outputs import new_output_path
+        from tts_core.segments import SegmentStore
+
+        chunks = iter(chunks)
+        first_chunk = next(chunks, '')
+        lang = detect_language(first_chunk)
+        extension = fmt or self.default_format(engine, extra_args)
+        reserved_path = None
+
+        if output:
+            output_path = Path(output)
+        else:
+            try:
+                # 拼接方式也影响输出内容，一并计入命名哈希
+                join = [f"{key}={value}" for key, value in sorted(self.join_options.items()) if value]
+                output_path = new_output_path(self.output_dir, first_chunk, extension, template=naming,
+                                              engine=engine, voice=voice,
+                                              extra_args=list(extra_args or []) + self.output_settings(fmt, sample_rate, loudness) + join)
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                return False
+            reserved_path = output_path
+            print(t(lang, f"📁 默认输出路径: {output_path}", f"📁 Default output path: {output_path}"))
+
+        staging_dir = output_path.parent / f".{output_path.stem}.chunks"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        if normalize:
+            from tts_core.textnorm import normalize_cached
+
+        writer = ConcatWriter(output_path, fmt, sample_rate, loudness, **self.join_options)
+        store = SegmentStore(output_path) if incremental else None
+        order = []
+        reused = 0
+        chunk_path = None
+        total_chars = 0
+        success = True
+        start_time = time.perf_counter()
+        try:
+            for index, chunk in enumerate(itertools.chain([first_chunk], chunks), start=1):
+                total_chars += len(chunk)
+                if normalize:
+                    chunk = normalize_cached(chunk, lang)
+                if store is not None:
+                    key = store.key(engine, chunk, voice, extra_args)
+                    order.append(key)
+                    segment = store.get(key)
+                    if self.metrics is not None:
+                        self.metrics.inc('tts_cache_hits_total' if segment else 'tts_cache_misses_total',
+                                         cache='segment')
+                    if segment is not None:
+                        reused += 1
+                        writer.add(segment)
+                        continue
+                print(t(lang, f"\n[第 {index} 块] {len(chunk)} 字", f"\n[chunk {index}] {len(chunk)} chars"))
+                chunk_path = self.synthesize_chunk(engine, chunk, staging_dir, index, voice, extra_args, lang)
+                if chunk_path is None:
+                    print(t(lang, f"ERROR: 第 {index} 块生成失败", f"ERROR: Chunk {index} failed"))
+                    success = False
+                    break
+                if store is not None:
+                    # 片段移入存档，下次运行复用
+                    segment, chunk_path = store.store(key, chunk_path), None
+                    writer.add(segment)
+                    continue
+                # 立即追加并删除片段，暂存的音频始终只有一块
+                writer.add(chunk_path, remove=True)
+                chunk_path = None
+
+            if success:
+                writer.close()
+                if store is not None:
+                    store.commit(order)
+        except Exception as e:
+            print(t(lang, f"ERROR: 长文本合成失败: {e}", f"ERROR: Long text synthesis failed: {e}"))
+            success = False
+        finally:
+            writer.abort()
+            if store is not None and not success:
+                store.save()
+            if chunk_path is not None and chunk_path.exists():
+                remove_audio(chunk_path)
+            for stale in staging_dir.glob('*'):
+                stale.unlink()
+            staging_dir.rmdir()
+
+        if not success:
+            if reserved_path and reserved_path.exists() and reserved_path.stat().st_size == 0:
+                reserved_path.unlink()
+            print(t(lang, f"❌ {engine} 引擎执行失败", f"❌ Engine failed: {engine}"))
+            return False
+
+        total_seconds = time.perf_counter() - start_time
+        print(t(lang, "\n📊 运行统计:", "\n📊 Stats:"))
+        print(t(lang, f"   总用时: {total_seconds:.2f} 秒", f"   Total time: {total_seconds:.2f} s"))
+        print(t(lang, f"   分块数: {writer.count}", f"   Chunks: {writer.count}"))
+        if store is not None:
+            print(t(lang, f"   复用/合成: {reused}/{writer.count - reused}",
+                    f"   Reused/synthesized: {reused}/{writer.count - reused}"))
+        print(t(lang, f"   字符数: {total_chars}", f"   Total chars: {total_chars}"))
+        print(t(lang, f"\n✅ {engine} 引擎执行成功！", f"\n✅ Engine succeeded: {engine}"))
+        print(t(lang, f"📂 输出文件: {output_path}", f"📂 Output file: {output_path}"))
+        return True
+
+    def run_template(self, engine, template, slots, output=None, voice=None, extra_args=None, fmt=None,
+                     sample_rate=None, loudness=None, naming=None, normalize=True):
+        """模板合成：固定片段取自短语库（缺失时合成并入库），只合成槽位，再按顺序拼接"""
+        from tts_core.audio import ConcatWriter, remove_audio
+        from tts_core.lang import detect_language
+        from tts_core.outputs import new_output_path
+        from tts_core.phrases import (DEFAULT_BANK_DIR, PhraseBank, fill_template, parse_template, render_text,
+                                      splice_options)
+
+        try:
+            parts = fill_template(parse_template(template), slots)
+        except ValueError as e:
+            print(f"ERROR: 模板无效: {e}")
+            return False
+        text = render_text(parts)
+        # 语言按固定片段判断，与 warm_phrases 一致，保证固定片段的规范化结果与库中的键相同
+        lang = detect_language(render_text([part for part in parts if part.slot is None]) or text)
+        if normalize:
+            from tts_core.textnorm import normalize_cached
+        extension = fmt or self.default_format(engine, extra_args)
+        reserved_path = None
+
+        if output:
+            output_path = Path(output)
+        else:
+            try:
+                output_path = new_output_path(self.output_dir, text, extension, template=naming,
+                                              engine=engine, voice=voice,
+                                              extra_args=list(extra_args or []) + self.output_settings(fmt, sample_rate, loudness))
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                return False
+            reserved_path = output_path
+            print(t(lang, f"📁 默认输出路径: {output_path}", f"📁 Default output path: {output_path}"))
+
+        bank = PhraseBank(self.phrase_dir or DEFAULT_BANK_DIR)
+        staging_dir = output_path.parent / f".{output_path.stem}.chunks"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        writer = ConcatWriter(output_path, fmt, sample_rate, loudness, **splice_options(self.join_options))
+        hits = synthesized = 0
+        success = True
+        start_time = time.perf_counter()
+        try:
+            for index, part in enumerate(parts, start=1):
+                part_text = normalize_cached(part.text, lang) if normalize else part.text
+                if part.slot is None:
+                    path, hit = self.phrase_audio(bank, engine, part_text, staging_dir, index, voice, extra_args, lang)
+                    hits += hit
+                else:
+                    path = self.synthesize_chunk(engine, part_text, staging_dir, index, voice, extra_args, lang)
+                    hit = False
+                if path is None:
+                    print(t(lang, f"ERROR: 片段生成失败: {part.text}", f"ERROR: Failed to synthesize: {part.text}"))
+                    success = False
+                    break
+                synthesized += not hit
+                # 库中片段保留，槽位片段追加后删除
+                writer.add(path, remove=part.slot is not None)
+            if success:
+                writer.close()
+        except Exception as e:
+            print(t(lang, f"ERROR: 模板合成失败: {e}", f"ERROR: Template synthesis failed: {e}"))
+            success = False
+        finally:
+            writer.abort()
+            for stale in staging_dir.glob('*'):
+                remove_audio(stale)
+            staging_dir.rmdir()
+
+        if not success:
+            if reserved_path and reserved_path.exists() and reserved_path.stat().st_size == 0:
+                reserved_path.unlink()
+            print(t(lang, f"❌ {engine} 引擎执行失败", f"❌ Engine failed: {engine}"))
+            return False
+
+        total_seconds = time.perf_counter() - start_time
+        print(t(lang, "\n📊 运行统计:", "\n📊 Stats:"))
+        print(t(lang, f"   总用时: {total_seconds:.2f} 秒", f"   Total time: {total_seconds:.2f} s"))
+        print(t(lang, f"   片段数: {len(parts)} (短语库命中 {hits}，本次合成 {synthesized})",
+                f"   Parts: {len(parts)} ({hits} from phrase bank, {synthesized} synthesized)"))
+        print(t(lang, f"\n✅ {engine} 引擎执行成功！", f"\n✅ Engine succeeded: {engine}"))
+        print(t(lang, f"📂 输出文件: {output_path}", f"📂 Output file: {output_path}"))
+        return True
+
+    def warm_phrases(self, engine, templates, voice=None, extra_args=None, normalize=True):
+        """预先合成模板中的固定片段并存入短语库，之后的模板请求只需合成槽位"""
+        import tempfile
+        from tts_core.lang import detect_language
+        from tts_core.phrases import DEFAULT_BANK_DIR, PhraseBank, parse_template, render_text
+
+        bank = PhraseBank(self.phrase_dir or DEFAULT_BANK_DIR)
+        if normalize:
+            from tts_core.textnorm import normalize_cached
+        added = cached = failed = 0
+        with tempfile.TemporaryDirectory(prefix='tts-phrases-') as work_dir:
+            for template in templates:
+                parts = [part for part in parse_template(template) if part.slot is None]
+                lang = detect_language(render_text(parts))
+                for index, part in enumerate(parts, start=1):
+                    part_text = normalize_cached(part.text, lang) if normalize else part.text
+                    path, hit = self.phrase_audio(bank, engine, part_text, work_dir, index, voice, extra_args, lang)
+                    if path is None:
+                        failed += 1
+                    elif hit:
+                        cached += 1
+                    else:
+                        added += 1
+        print(f"📚 短语库 {bank.root}: 新增 {added}，已有 {cached}，失败 {failed}")
+        return failed == 0
+
+    def enqueue_batch(self, engine, manifest_path, queue_path, unit_size=20, voice=None, extra_args=None,
+                      fmt=None, sample_rate=None, loudness=None, naming=None, normalize=True, lang='zh'):
+        """分布式批处理协调者：把清单切分为工作单元放入共享队列，由各节点的 worker 处理
+
+        输出目录以绝对路径写入单元，worker 需要以相同路径挂载共享存储
+        """
+        from tts_core.workqueue import WorkQueue
+
+        manifest_path = Path(manifest_path)
+        items = self.load_batch_items(manifest_path, normalize)
+        batch_dir = self.batch_dir_for(manifest_path).resolve()
+        unit_size = max(1, unit_size)
+        added = 0
+        with WorkQueue(queue_path) as queue:
+            for start in range(0, len(items), unit_size):
+                payload = {
+                    'engine': engine,
+                    'batch_dir': str(batch_dir),
+                    'voice': voice,
+                    'extra_args': list(extra_args or []),
+                    'format': fmt,
+                    'sample_rate': sample_rate,
+                    'loudness': loudness,
+                    'naming': naming,
+                    'items': [{'id': item.item_id, 'text': item.text, 'voice': item.voice, 'output': item.output}
+                              for item in items[start:start + unit_size]],
+                }
+                added += queue.enqueue(f"{batch_dir.name}-{start // unit_size + 1:05d}", payload)
+            summary = queue.summary()
+
+        units = (len(items) + unit_size - 1) // unit_size
+        print(t(lang, f"📤 已入队: {manifest_path} ({len(items)} 条 -> {units} 个工作单元，新增 {added})",
+                f"📤 Enqueued: {manifest_path} ({len(items)} items -> {units} units, {added} new)"))
+        print(t(lang, f"📒 队列: {queue_path}  {summary}", f"📒 Queue: {queue_path}  {summary}"))
+        print(t(lang, f"在各节点运行: python tts-skill.py --worker --queue {queue_path}",
+                f"Run on each node: python tts-skill.py --worker --queue {queue_path}"))
+        return True
+
+    def run_queue_worker(self, queue_path, worker_name=None, poll_seconds=10.0, lang='zh'):
+        """分布式批处理 worker：循环租用工作单元并生成，队列中没有待处理或处理中的单元时退出"""
+        import hashlib
+        import socket
+        from tts_core.batch import BatchItem
+        from tts_core.outputs import sanitize_filename_part
+        from tts_core.workqueue import Heartbeat, WorkQueue
+
+        # 每个 worker 使用自己的任务日志，避免多个节点同时写同一个 SQLite 文件；
+        # 日志按 队列 + 稳定的 worker 名称（未指定时为主机名，不含进程号）命名，重启后的 worker 可以续跑
+        queue_key = hashlib.sha1(str(Path(queue_path).resolve()).encode('utf-8')).hexdigest()[:8]
+        journal_name = f".journal-{sanitize_filename_part(worker_name or socket.gethostname(), 'worker')}-{queue_key}.sqlite"
+        # 租约持有者按进程区分，同一主机上的多个 worker 不会互相续租或完成对方的单元
+        worker_name = worker_name or f"{socket.gethostname()}-{os.getpid()}"
+        processed = failed = 0
+        print(t(lang, f"👷 Worker {worker_name} 已启动，队列: {queue_path}", f"👷 Worker {worker_name} started, queue: {queue_path}"))
+
+        with WorkQueue(queue_path) as queue:
+            while True:
+                unit = queue.lease(worker_name)
+                if unit is None:
+                    summary = queue.summary()
+                    if not summary['queued'] and not summary['leased']:
+                        break
+                    # 其他 worker 仍在处理，它们失败或租约过期后单元会重新入队
+                    time.sleep(poll_seconds)
+                    continue
+
+                payload = unit['payload']
+                items = [BatchItem(item_id=item['id'], text=item['text'], voice=item.get('voice'),
+                                   output=item.get('output'))
+                         for item in payload['items']]
+                batch_dir = Path(payload['batch_dir'])
+                print(t(lang, f"\n📦 工作单元 {unit['unit_id']} (第 {unit['attempts']} 次尝试)",
+                        f"\n📦 Work unit {unit['unit_id']} (attempt {unit['attempts']})"))
+                heartbeat = None
+                try:
+                    with Heartbeat(queue_path, unit['unit_id'], worker_name, queue.lease_seconds) as heartbeat:
+                        success = self.run_items(
+                            payload['engine'], items, batch_dir, label=unit['unit_id'],
+                            voice=payload.get('voice'), extra_args=payload.get('extra_args'),
+                            journal_path=batch_dir / journal_name,
+                            fmt=payload.get('format'), sample_rate=payload.get('sample_rate'),
+                            loudness=payload.get('loudness'), naming=payload.get('naming'), lang=lang)
+                    error = '' if success else 'some items failed'
+                except Exception as e:
+                    success, error = False, str(e)
+
+                if heartbeat is not None and heartbeat.lost.is_set():
+                    print(t(lang, f"WARNING: 工作单元 {unit['unit_id']} 的租约已被接管",
+                            f"WARNING: lease on {unit['unit_id']} was taken over"))
+                elif success:
+                    queue.complete(unit['unit_id'], worker_name)
+                    processed += 1
+                else:
+                    queue.fail(unit['unit_id'], worker_name, error)
+                    failed += 1
+
+            summary = queue.summary()
+
+        print(t(lang, f"\n👷 Worker {worker_name} 结束: 完成 {processed} 个单元，失败 {failed} 个",
+                f"\n👷 Worker {worker_name} finished: {processed} units done, {failed} failed"))
+        print(t(lang, f"📒 队列状态: {summary}", f"📒 Queue: {summary}"))
+        return summary['failed'] == 0
+
+    def submit_job(self, argv, engine, output=None, fmt=None, callback=None, marker=None, store_path=None,
+                   workers=2, as_json=False, lang='zh'):
+        """异步提交：登记作业并确保后台 runner 在运行，立即返回作业 ID（见 tts_core/jobs.py）"""
+        from tts_core.jobs import JobStore, describe, new_job_id, start_runner
+
+        job_id = new_job_id()
+        cwd = Path.cwd()
+        if output:
+            output_path = (cwd / Path(output).expanduser()).resolve()
+        else:
+            # 未指定输出时按作业 ID 命名，提交时即可确定结果路径
+            extension = fmt or self.default_format(engine, argv)
+            output_path = (self.output_dir / 'jobs' / f'{job_id}.{extension}').resolve()
+            argv = argv + ['--output', str(output_path)]
+
+        with JobStore(store_path) as store:
+            store.prune()
+            job = store.submit(job_id, argv, str(cwd), str(output_path), callback=callback, marker=marker)
+            if store.needs_runner():
+                start_runner(store.path, Path(__file__).resolve(), workers)
+            log_path = store.log_path(job_id)
+
+        if as_json:
+            import json
+            print(json.dumps(describe(job), ensure_ascii=False))
+            return job_id
+        print(t(lang, f"📨 已提交作业: {job_id}", f"📨 Job submitted: {job_id}"))
+        print(t(lang, f"📁 输出文件: {output_path}", f"📁 Output file: {output_path}"))
+        print(t(lang, f"📄 作业日志: {log_path}", f"📄 Job log: {log_path}"))
+        print(t(lang, f"查询: python tts-skill.py --status {job_id}  /  --result {job_id}",
+                f"Check: python tts-skill.py --status {job_id}  /  --result {job_id}"))
+        return job_id
+
+    def show_job(self, store_path, job_id=None, result=False, as_json=False, workers=2):
+        """--status / --result：打印作业状态，返回退出码
+
+        --result 在作业成功时只打印输出路径 (退出码 0)，失败为 1，尚未结束为 3；
+        查询时回收已退出 runner 的作业，仍有排队的作业时重新启动 runner
+        """
+        import json
+        from tts_core.jobs import JobStore, describe, start_runner
+        from tts_core.scheduler import JOB_DONE, JOB_FAILED
+
+        def when(ts):
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) if ts else '-'
+
+        with JobStore(store_path) as store:
+            if store.needs_runner():
+                start_runner(store.path, Path(__file__).resolve(), workers)
+            if not job_id:
+                summary, jobs = store.summary(), store.recent()
+                if as_json:
+                    print(json.dumps({'summary': summary, 'jobs': [describe(job) for job in jobs]},
+                                     ensure_ascii=False, indent=2))
+                    return 0
+                print(f"📒 作业库: {store.path}  {summary}")
+                for job in jobs:
+                    print(f"  {job['job_id']}  {job['state']:<8} {job['output']}")
+                return 0
+
+            job = store.get(job_id)
+            log_path = store.log_path(job_id)
+        if job is None:
+            print(f"ERROR: 找不到作业: {job_id}")
+            return 1
+
+        code = 0
+        if result:
+            code = 0 if job['state'] == JOB_DONE else 1 if job['state'] == JOB_FAILED else 3
+        if as_json:
+            print(json.dumps(describe(job), ensure_ascii=False, indent=2))
+            return code
+        if result and code == 0:
+            print(job['output'])
+        elif result and code == 3:
+            print(f"⏳ 作业 {job_id} 尚未完成 ({job['state']})")
+        else:
+            print(f"🆔 作业 {job_id}: {job['state']}")
+            print(f"   输出: {job['output']}")
+            print(f"   日志: {log_path}")
+            if job['error']:
+                print(f"   错误: {job['error']}")
+            print(f"   提交: {when(job['created_at'])}  开始: {when(job['started_at'])}  "
+                  f"结束: {when(job['finished_at'])}  尝试: {job['attempts']}")
+        return code
+
     def install_qwen3_environment(self):
         """安装Qwen3-TTS环境"""
         qwen_script = self.engines_dir / 'qwen3-tts-cli.py'
@@ -184,6 +1017,8 @@ TTS-Skill - 多引擎文本转语音技能
             print("ERROR: Qwen3-TTS脚本不存在")
             return False
 
+        import subprocess
+
         try:
             cmd = [sys.executable, str(qwen_script), '--install']
             result = subprocess.run(cmd, cwd=str(self.engines_dir))
@@ -193,21 +1028,132 @@ TTS-Skill - 多引擎文本转语音技能
             return False
 
 def main():
+    configure_stdio()
+
+    # 工具命令快速路径：不构建参数解析器，也不加载引擎相关模块
+    argv = sys.argv[1:]
+    if len(argv) <= 1 and (not argv or argv[0] in FAST_TOOL_COMMANDS):
+        skill = TTSSkill()
+        if argv and argv[0] == '--list-engines':
+            skill.list_engines()
+        elif argv and argv[0] == '--list-voices':
+            skill.list_voices()
+        else:
+            skill.show_help()
+        return
+
+    import argparse
+
     parser = argparse.ArgumentParser(description='TTS-Skill - 多引擎文本转语音技能', add_help=False)
     parser.add_argument('engine', nargs='?', help='TTS引擎 (qwen3-tts, edge-tts, openai-tts)')
     parser.add_argument('text', nargs='*', help='要转换的文本内容')
     parser.add_argument('--text-file', '-f', help='从文本文件读取内容')
     parser.add_argument('--voice', '-v', help='音色选择')
     parser.add_argument('--output', '-o', help='输出文件路径')
+    parser.add_argument('--batch', '-b', help='批处理清单 (.txt 每行一条 / .jsonl / 文本文件目录)')
+    parser.add_argument('--journal', help='批处理任务日志路径 (默认 output/<清单名>/.journal.sqlite)')
+    parser.add_argument('--pack', help='批处理打包输出文件 (.pack)，所有条目写入同一文件')
+    parser.add_argument('--naming', help='输出命名: timestamp (默认) / hash / 自定义模板，如 "{date}/{voice}_{hash}"')
+    parser.add_argument('--format', choices=['wav', 'flac', 'opus', 'mp3'], help='输出音频格式 (默认为引擎原生格式)')
+    parser.add_argument('--sample-rate', type=int, help='输出采样率')
+    parser.add_argument('--loudness', type=float, help='响度归一化目标 (LUFS，如 -16)')
+    parser.add_argument('--chunk-chars', type=int, help='长文本文件分块合成时每块的最大字数 (默认 1000)')
+    parser.add_argument('--adaptive-chunks', action='store_true',
+                        help='按记录的引擎耗时曲线选择分块大小 (未指定 --chunk-chars 时生效)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量重合成：按段落分块并保存每块音频，再次运行只合成改动过的块 (需要 --output)')
+    parser.add_argument('--no-normalize', action='store_true', help='不做文本规范化，原样发送给引擎')
+    parser.add_argument('--trim-silence', action='store_true', help='裁剪输出音频（及拼接的每个片段）首尾的静音')
+    parser.add_argument('--silence-db', type=float, help='静音判定阈值 (dBFS，默认 -45)')
+    parser.add_argument('--gap-ms', type=int, help='拼接片段之间插入的静音 (毫秒)')
+    parser.add_argument('--crossfade-ms', type=int, help='拼接片段之间的交叉淡化时长 (毫秒，--gap-ms 为 0 时生效)')
+    parser.add_argument('--template', help='模板文本，如 "您的订单 {N} 已发货"：固定片段取自短语库，只合成槽位')
+    parser.add_argument('--slot', action='append', default=[], metavar='NAME=VALUE', help='模板槽位的值 (可重复)')
+    parser.add_argument('--warm-phrases', metavar='FILE', help='预先合成模板文件（每行一个模板）中的固定片段并存入短语库')
+    parser.add_argument('--queue', help='分布式批处理共享队列 (SQLite 文件，放在共享存储上)；与 --batch 一起使用时入队')
+    parser.add_argument('--unit-size', type=int, help='分布式批处理每个工作单元的条目数 (默认 20)')
+    parser.add_argument('--worker', action='store_true', help='作为分布式批处理 worker 处理 --queue 中的工作单元')
+    parser.add_argument('--worker-name', help='worker 名称 (默认 主机名-进程号；任务日志按该名称或主机名命名)')
+    parser.add_argument('--profile', action='store_true',
+                        help='性能剖析：用标准语料（或给定文本/文本文件的每一行）多次合成，报告 RTF、每秒字数与冷/热延迟')
+    parser.add_argument('--runs', type=int, default=3, help='性能剖析时每条语料的合成次数')
+    parser.add_argument('--profile-dump', metavar='DIR', help='性能剖析时为每次引擎调用保存 cProfile 文件')
+    parser.add_argument('--profile-out', metavar='FILE', help='性能剖析报告 (JSON) 输出路径')
+    parser.add_argument('--metrics-out', help='运行结束时把指标以 Prometheus 文本格式写入该文件')
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument('--record', metavar='DIR', help='录制引擎的 API 响应 / 模型输出到该目录 (Qwen3 固定随机种子)')
+    replay_group.add_argument('--replay', metavar='DIR', help='回放该目录中的录制，不访问网络也不加载模型')
+    parser.add_argument('--serve', metavar='[HOST:]PORT', help='以 HTTP 服务方式运行，请求按优先级与租户公平调度')
+    parser.add_argument('--workers', type=int, help='服务模式下并行合成的工作线程数 (默认 1)')
+    parser.add_argument('--pool-size', type=int, help='每种引擎保留的常驻进程数 (默认 2，0 为每次调用启动新进程)')
+    parser.add_argument('--tenant-weight', action='append', default=[], metavar='TENANT=WEIGHT',
+                        help='服务模式下租户的公平队列权重 (可重复)，默认 1')
+    parser.add_argument('--submit', action='store_true',
+                        help='异步提交：登记作业后立即返回作业 ID，由后台进程合成 (见 --status / --result)')
+    parser.add_argument('--callback', metavar='URL', help='--submit 作业结束时 POST 作业状态 (JSON) 到该本机地址')
+    parser.add_argument('--marker', metavar='FILE', help='--submit 作业结束时把作业状态 (JSON) 写入该文件')
+    parser.add_argument('--status', nargs='?', const='', metavar='JOB_ID', help='查看异步作业状态 (省略 ID 时列出最近的作业)')
+    parser.add_argument('--result', metavar='JOB_ID', help='异步作业成功时打印输出路径；失败退出码为 1，未结束为 3')
+    parser.add_argument('--job-store', help='异步作业库路径 (默认 cache/jobs.sqlite)')
+    parser.add_argument('--job-workers', type=int, help='后台 runner 同时执行的作业数 (默认 2)')
+    parser.add_argument('--run-jobs', action='store_true', help=argparse.SUPPRESS)
     parser.add_argument('--list-engines', action='store_true', help='列出所有引擎')
-    parser.add_argument('--list-voices', action='store_true', help='列出所有音色')
+    parser.add_argument('--list-voices', action='store_true', help='列出所有音色 (可跟引擎名筛选)')
+    parser.add_argument('--json', action='store_true', help='--list-voices 以 JSON 输出 (含语言、性别、参考音频时长、风格)；--submit / --status / --result 同样输出 JSON')
+    parser.add_argument('--gender', choices=['female', 'male', 'neutral'], help='--list-voices 按性别筛选')
+    parser.add_argument('--lang', help='--list-voices 按语言筛选 (如 zh、en；多语言音色总会列出)')
     parser.add_argument('--install', action='store_true', help='安装Qwen3-TTS环境')
     parser.add_argument('--help', '-h', action='store_true', help='显示帮助信息')
 
     # 捕获所有参数传递给引擎
     args, unknown = parser.parse_known_args()
 
+    # 并发与分块设置：命令行 > 环境变量 (TTS_WORKERS 等) > tts-skill.config > 默认值
+    from tts_core.config import ConfigError, load_config
+    cli_settings = {
+        'workers': args.workers,
+        'chunk_chars': args.chunk_chars,
+        'unit_size': args.unit_size,
+        'normalize': False if args.no_normalize else None,
+        'trim_silence': True if args.trim_silence else None,
+        'silence_db': args.silence_db,
+        'gap_ms': args.gap_ms,
+        'crossfade_ms': args.crossfade_ms,
+        'pool_size': args.pool_size,
+        # 命令行中的相对路径以当前目录为基准
+        'job_store': str(Path(args.job_store).expanduser().resolve()) if args.job_store else None,
+        'job_workers': args.job_workers,
+        'adaptive_chunks': True if args.adaptive_chunks else None,
+    }
+    try:
+        settings = load_config('tts-skill', overrides=cli_settings)
+    except ConfigError as e:
+        print(f"ERROR: 配置无效: {e}")
+        sys.exit(1)
+    normalize = settings['normalize']
+
+    if args.record or args.replay:
+        # 经环境变量传给引擎进程（包括之后启动的常驻进程），见 tts_core/replay.py
+        from tts_core.replay import RECORD, REPLAY, REPLAY_DIR_ENV, REPLAY_ENV
+        os.environ[REPLAY_ENV] = RECORD if args.record else REPLAY
+        os.environ[REPLAY_DIR_ENV] = str(Path(args.record or args.replay).expanduser().resolve())
+
     skill = TTSSkill()
+    skill.join_options = {
+        'trim_db': settings['silence_db'] if settings['trim_silence'] else None,
+        'gap_ms': settings['gap_ms'],
+        'crossfade_ms': settings['crossfade_ms'],
+    }
+    skill.phrase_dir = settings['phrase_dir']
+    if not args.replay:
+        # 回放的耗时不代表引擎的真实表现，不记录
+        skill.timing_store = settings['timing_store']
+    if args.metrics_out:
+        import atexit
+        from tts_core.metrics import Registry
+        skill.metrics = Registry()
+        # 任何退出路径（包括 sys.exit）都导出指标
+        atexit.register(skill.metrics.write, args.metrics_out)
 
     # 处理帮助命令
     if args.help or (not args.engine and len(sys.argv) == 1):
@@ -220,7 +1166,10 @@ def main():
         return
 
     if args.list_voices:
-        skill.list_voices()
+        if args.engine and args.engine not in skill.supported_engines:
+            print(f"ERROR: 不支持的引擎: {args.engine}")
+            sys.exit(1)
+        skill.list_voices(engine=args.engine, lang=args.lang, gender=args.gender, as_json=args.json)
         return
 
     if args.install:
@@ -231,6 +1180,95 @@ def main():
             print("ERROR: 安装失败")
         return
 
+    if args.run_jobs:
+        from tts_core.jobs import run_runner
+        run_runner(settings['job_store'], Path(__file__).resolve(), settings['job_workers'])
+        return
+
+    if args.status is not None or args.result:
+        sys.exit(skill.show_job(settings['job_store'], args.result or args.status, result=bool(args.result),
+                                as_json=args.json, workers=settings['job_workers']))
+
+    if (args.callback or args.marker) and not args.submit:
+        print("ERROR: --callback / --marker 需要与 --submit 一起使用")
+        sys.exit(1)
+
+    if args.submit:
+        if args.engine not in skill.supported_engines:
+            print(f"ERROR: 不支持的引擎: {args.engine}")
+            print("可用引擎:", ", ".join(skill.supported_engines.keys()))
+            sys.exit(1)
+        if args.batch or args.queue or args.worker or args.serve or args.profile or args.warm_phrases:
+            print("ERROR: --submit 只用于单次合成（文本、--text-file 或 --template），批处理请使用 --queue")
+            sys.exit(1)
+        if not (args.text or args.text_file or args.template):
+            print("ERROR: --submit 需要文本、--text-file 或 --template")
+            sys.exit(1)
+        if args.text_file and not Path(args.text_file).expanduser().exists():
+            print("ERROR: 找不到输入文本文件")
+            print(f"  传入路径: {args.text_file}")
+            sys.exit(1)
+        if args.incremental and not args.output:
+            print("ERROR: --incremental 需要 --output 指定固定的输出文件")
+            sys.exit(1)
+        callback = None
+        if args.callback:
+            from tts_core.jobs import check_callback
+            try:
+                callback = check_callback(args.callback)
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                sys.exit(1)
+        marker = str(Path(args.marker).expanduser().resolve()) if args.marker else None
+        job_argv = strip_options(sys.argv[1:], flags=('--submit', '--json'),
+                                 valued=('--callback', '--marker', '--job-store', '--job-workers'))
+        skill.submit_job(job_argv, args.engine, output=args.output, fmt=args.format, callback=callback,
+                         marker=marker, store_path=settings['job_store'], workers=settings['job_workers'],
+                         as_json=args.json)
+        return
+
+    if settings['pool_size'] > 0:
+        import atexit
+        from tts_core.enginepool import EnginePool
+        skill.pool = EnginePool(max_idle=settings['pool_size'], max_jobs=settings['pool_max_jobs'],
+                                max_rss_mb=settings['pool_max_rss_mb'],
+                                env={**os.environ, 'PYTHONIOENCODING': 'utf-8', 'PYTHONUTF8': '1'})
+        atexit.register(skill.pool.close)
+
+    if args.worker or (args.queue and not args.batch):
+        if not args.queue:
+            print("ERROR: --worker 需要 --queue 指定共享队列")
+            sys.exit(1)
+        if args.worker:
+            if not skill.run_queue_worker(args.queue, worker_name=args.worker_name):
+                sys.exit(1)
+        else:
+            from tts_core.workqueue import WorkQueue
+            with WorkQueue(args.queue) as queue:
+                print(queue.summary())
+                for failure in queue.failures():
+                    print(f"  failed: {failure['unit_id']} (attempts={failure['attempts']}): {failure['error']}")
+        return
+
+    if args.serve:
+        host, _, port = args.serve.rpartition(':')
+        weights = {}
+        try:
+            port = int(port)
+            for spec in args.tenant_weight:
+                tenant, _, weight = spec.partition('=')
+                weights[tenant.strip()] = float(weight)
+        except ValueError:
+            print("ERROR: --serve 需要 [HOST:]PORT，--tenant-weight 需要 TENANT=WEIGHT")
+            sys.exit(1)
+
+        from tts_core.service import serve
+        # 未在命令行指定分块大小时，服务按请求读取配置，修改配置文件无需重启
+        serve(skill, host or '127.0.0.1', port, workers=settings['workers'], weights=weights,
+              chunk_chars=args.chunk_chars, normalize=normalize, job_store=settings['job_store'],
+              adaptive_chunks=settings['adaptive_chunks'], output_retention=settings['service_retention'])
+        return
+
     # 处理引擎调用
     if not args.engine:
         print("ERROR: 请指定TTS引擎")
@@ -238,6 +1276,89 @@ def main():
         print("\n使用 --help 查看帮助信息")
         return
 
+    if args.profile:
+        from tts_core import profiler
+        corpus = None
+        if args.text_file:
+            corpus = profiler.load_corpus(Path(args.text_file).expanduser())
+        elif args.text:
+            from tts_core.lang import detect_language
+            text = ' '.join(args.text).strip()
+            corpus = [('custom', detect_language(text), text)]
+        report = profiler.profile_engine(skill, args.engine, voice=args.voice, runs=args.runs,
+                                         extra_args=unknown, corpus=corpus,
+                                         normalize=normalize, dump_dir=args.profile_dump)
+        profiler.print_report(report)
+        if args.profile_out:
+            profiler.write_report(report, args.profile_out)
+            print(f"📄 {args.profile_out}")
+        if args.profile_dump:
+            print(f"🔬 cProfile: {args.profile_dump} (python -m pstats / snakeviz)")
+        if report['total']['failed']:
+            sys.exit(1)
+        return
+
+    if args.warm_phrases:
+        try:
+            with open(Path(args.warm_phrases).expanduser(), 'r', encoding='utf-8-sig') as f:
+                templates = [line.strip() for line in f if line.strip()]
+            success = skill.warm_phrases(args.engine, templates, voice=args.voice, extra_args=unknown,
+                                         normalize=normalize)
+        except (ValueError, OSError) as e:
+            print(f"ERROR: 模板文件无效: {e}")
+            sys.exit(1)
+        if not success:
+            sys.exit(1)
+        return
+
+    if args.template:
+        slots = {}
+        for spec in args.slot:
+            name, sep, value = spec.partition('=')
+            if not sep:
+                print("ERROR: --slot 需要 NAME=VALUE")
+                sys.exit(1)
+            slots[name.strip()] = value
+        success = skill.run_template(args.engine, args.template, slots, output=args.output, voice=args.voice,
+                                     extra_args=unknown, fmt=args.format, sample_rate=args.sample_rate,
+                                     loudness=args.loudness, naming=args.naming, normalize=normalize)
+        if not success:
+            sys.exit(1)
+        return
+
+    if args.batch:
+        batch_path = Path(args.batch).expanduser()
+        if not batch_path.exists():
+            print("ERROR: 找不到批处理清单")
+            print(f"  传入路径: {args.batch}")
+            return
+
+        if args.queue:
+            if args.pack:
+                print("ERROR: 分布式批处理不支持 --pack，多个节点不能同时追加同一个打包文件")
+                sys.exit(1)
+            try:
+                skill.enqueue_batch(args.engine, batch_path, args.queue, unit_size=settings['unit_size'], voice=args.voice,
+                                    extra_args=unknown, fmt=args.format, sample_rate=args.sample_rate,
+                                    loudness=args.loudness, naming=args.naming, normalize=normalize)
+            except (ValueError, OSError) as e:
+                print(f"ERROR: 批处理清单无效: {e}")
+                sys.exit(1)
+            return
+
+        try:
+            success = skill.run_batch(args.engine, batch_path, voice=args.voice, extra_args=unknown,
+                                      journal_path=args.journal, fmt=args.format,
+                                      sample_rate=args.sample_rate, loudness=args.loudness,
+                                      pack_path=args.pack, naming=args.naming,
+                                      normalize=normalize)
+        except (ValueError, OSError) as e:
+            print(f"ERROR: 批处理清单无效: {e}")
+            sys.exit(1)
+        if not success:
+            sys.exit(1)
+        return
+
     input_text = None
     if args.text_file:
         text_path = Path(args.text_file).expanduser()
@@ -251,30 +1372,76 @@ def main():
             print('示例: python tts-skill.py qwen3-tts --text-file "F:\\Code\\MySkills\\tts-skill\\input\\text.txt" --voice 寒冰射手')
             return
 
-        try:
-            input_text = text_path.read_text(encoding='utf-8-sig').strip()
-        except UnicodeDecodeError:
-            input_text = text_path.read_text(encoding='gbk', errors='replace').strip()
+        # 流式分块读取：只有一块时按普通文本处理，否则逐块合成后拼接，内存占用与文件大小无关
+        # 增量模式下分块在段落边界断开，且只有一块时同样保存分块存档
+        from tts_core.chunking import iter_chunks
+        if args.incremental and not args.output:
+            print("ERROR: --incremental 需要 --output 指定固定的输出文件")
+            sys.exit(1)
+        chunk_chars = settings['chunk_chars']
+        if settings['adaptive_chunks'] and not args.chunk_chars and not args.incremental:
+            # 增量模式需要稳定的分块，块大小随耗时记录变化会让已保存的块全部失效
+            chunk_chars = skill.chunk_size_for(args.engine, args.voice, chunk_chars)
+        chunks = iter_chunks(text_path, chunk_chars, paragraphs=args.incremental)
+        input_text = next(chunks, '')
+        second_chunk = next(chunks, None)
+        if second_chunk is not None or args.incremental:
+            import itertools
+            head = [input_text] if second_chunk is None else [input_text, second_chunk]
+            success = skill.run_long_text(args.engine, itertools.chain(head, chunks),
+                                          output=args.output, voice=args.voice, extra_args=unknown,
+                                          fmt=args.format, sample_rate=args.sample_rate, loudness=args.loudness,
+                                          naming=args.naming, normalize=normalize, incremental=args.incremental)
+            if not success:
+                sys.exit(1)
+            return
     elif args.text:
         input_text = ' '.join(args.text).strip()
 
-    lang = detect_language(input_text) if input_text else 'zh'
+    from tts_core.lang import script_counts
+
+    # 汉字/字母统计只扫描一遍，语言判断与运行统计共用（统计按用户输入的原文）
+    chinese_chars, latin_chars = script_counts(input_text) if input_text else (0, 0)
+    total_chars = len(input_text) if input_text else 0
+    lang = 'zh' if not input_text or chinese_chars > latin_chars else 'en'
+
+    # 文本规范化只在此处做一次，命名哈希与引擎输入都使用规范化后的文本
+    if input_text and normalize:
+        from tts_core.textnorm import normalize_cached
+        input_text = normalize_cached(input_text, lang)
 
     # 构建引擎参数
     engine_args = []
+    post = None
+    reserved_path = None
 
     # 添加文本内容
     if input_text:
-        engine_args.append(input_text)
+        engine_args.extend(['--text-file', '-'])
 
         # 如果没有指定输出文件，生成默认文件名
         if not args.output:
-            default_filename = skill.generate_output_filename(input_text)
-            default_output_path = skill.output_dir / default_filename
-            engine_args.extend(['--output', str(default_output_path)])
-            print(t(lang, f"📁 默认输出路径: {default_output_path}", f"📁 Default output path: {default_output_path}"))
+            extension = args.format or skill.default_format(args.engine, unknown)
+            from tts_core.outputs import new_output_path
+
+            try:
+                # 原子占位，并发运行时不会覆盖其他请求的输出
+                output_path = new_output_path(skill.output_dir, input_text, extension, template=args.naming,
+                                              engine=args.engine, voice=args.voice,
+                                              extra_args=unknown + skill.output_settings(args.format, args.sample_rate,
+                                                                                         args.loudness))
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                sys.exit(1)
+            reserved_path = output_path
+            print(t(lang, f"📁 默认输出路径: {output_path}", f"📁 Default output path: {output_path}"))
         else:
-            engine_args.extend(['--output', args.output])
+            output_path = Path(args.output)
+
+        engine_output, format_args, post = skill.plan_output(args.engine, output_path, args.format,
+                                                             args.sample_rate, args.loudness)
+        engine_args.extend(['--output', str(engine_output)])
+        engine_args.extend(format_args)
     else:
         # 如果没有文本但有输出参数，直接传递
         if args.output:
@@ -287,14 +1454,30 @@ def main():
     # 添加未知参数
     engine_args.extend(unknown)
 
-    # 运行引擎
+    # 运行引擎：单次调用用不上常驻进程，直接启动引擎，输出照常打印到标准输出
+    skill.pool = None
     start_time = time.perf_counter()
-    success = skill.run_engine(args.engine, engine_args, lang=lang)
-    total_seconds = time.perf_counter() - start_time
+    success = False
+    try:
+        success = skill.run_engine(args.engine, engine_args, lang=lang, input_text=input_text or None)
+        total_seconds = time.perf_counter() - start_time
+
+        if success and post:
+            try:
+                from tts_core.audio import process_file
+                process_file(**post)
+            except Exception as e:
+                print(t(lang, f"ERROR: 后处理失败: {e}", f"ERROR: Post-processing failed: {e}"))
+                success = False
+    finally:
+        # 失败或被中断 (Ctrl+C) 时释放占位的空文件与未处理的中间结果（共享内存中的交接文件占用内存）
+        if not success and reserved_path and reserved_path.exists() and reserved_path.stat().st_size == 0:
+            reserved_path.unlink()
+        if not success and post and post['src'].exists():
+            from tts_core.audio import remove_audio
+            remove_audio(post['src'])
 
     if args.engine == 'qwen3-tts' and input_text:
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', input_text))
-        total_chars = len(input_text)
         basis = chinese_chars if chinese_chars > 0 else total_chars
         basis_label = t(lang, "汉字", "Chinese characters") if chinese_chars > 0 else t(lang, "字符", "characters")
         per_unit = (total_seconds / basis) if basis > 0 else 0.0
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+TTS-Skill 公共模块
+主入口 tts-skill.py 与 engines/ 下各引擎脚本共用的基础设施
+"""
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""
+音频后处理
+格式编码 (WAV/FLAC/Opus/MP3)、重采样、响度归一化、静音裁剪与片段拼接（间隔/交叉淡化），
+供各引擎与主入口共用；均在内存中的采样数组上完成，不产生中间文件
+
+.pcm 路径表示引擎经共享内存交出的原始采样（见 tts_core/pcm.py），读取时直接映射，不做解码。
+
+依赖 numpy 与 soundfile（MP3 读写需要 libsndfile >= 1.1）；
+scipy 与 pyloudnorm 为可选依赖，存在时用于更高质量的重采样与 LUFS 测量。
+"""
+
+import io
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from fractions import Fraction
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from tts_core.outputs import temp_path_for
+from tts_core.pcm import PCM_FORMAT, is_pcm, open_pcm, pcm_duration, remove_pcm, write_pcm
+
+SUPPORTED_FORMATS = ('wav', 'flac', 'opus', 'mp3')
+
+# 格式 -> (soundfile format, subtype)
+_SF_FORMATS = {
+    'wav': ('WAV', 'PCM_16'),
+    'flac': ('FLAC', 'PCM_16'),
+    'opus': ('OGG', 'OPUS'),
+    'mp3': ('MP3', 'MPEG_LAYER_III'),
+}
+
+# Opus 仅支持以下采样率
+_OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# 峰值上限 (-1 dBFS)，响度归一化后防止削波
+_PEAK_LIMIT = 10 ** (-1.0 / 20)
+
+# 静音裁剪：帧能量低于该阈值 (dBFS) 视为静音；裁剪后两端各保留一小段，避免切掉辅音起音与尾音
+DEFAULT_SILENCE_DB = -45.0
+_SILENCE_FRAME_MS = 10
+_SILENCE_PAD_MS = 20
+
+
+def format_from_path(path, default: Optional[str] = None) -> Optional[str]:
+    """根据文件扩展名推断输出格式"""
+    suffix = Path(path).suffix.lower().lstrip('.')
+    if suffix == 'ogg':
+        suffix = 'opus'
+    return suffix if suffix in SUPPORTED_FORMATS else default
+
+
+def read_audio(source) -> Tuple[np.ndarray, int]:
+    """读取音频文件或内存中的音频字节，返回 float32 采样与采样率；.pcm 交接文件直接映射"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source, (str, Path)) and is_pcm(source):
+        return open_pcm(source)
+    samples, sample_rate = sf.read(source, dtype='float32', always_2d=False)
+    return samples, sample_rate
+
+
+def audio_duration(path) -> float:
+    """音频时长（秒），只读文件头"""
+    if is_pcm(path):
+        return pcm_duration(path)
+    return sf.info(str(path)).duration
+
+
+def remove_audio(path):
+    """删除音频文件；.pcm 交接文件连同描述文件一起删除"""
+    if is_pcm(path):
+        remove_pcm(path)
+    else:
+        Path(path).unlink()
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """重采样；有 scipy 时使用多相滤波，否则退化为线性插值"""
+    if not target_rate or target_rate == sample_rate or len(samples) == 0:
+        return samples
+
+    try:
+        from scipy.signal import resample_poly
+    except ImportError:
+        resample_poly = None
+
+    if resample_poly is not None:
+        ratio = Fraction(int(target_rate), int(sample_rate))
+        return resample_poly(samples, ratio.numerator, ratio.denominator, axis=0).astype(np.float32)
+
+    length = len(samples)
+    target_length = int(round(length * target_rate / sample_rate))
+    src_positions = np.arange(length, dtype=np.float64)
+    dst_positions = np.linspace(0, length - 1, target_length)
+    if samples.ndim == 1:
+        return np.interp(dst_positions, src_positions, samples).astype(np.float32)
+    channels = [np.interp(dst_positions, src_positions, samples[:, ch]) for ch in range(samples.shape[1])]
+    return np.stack(channels, axis=1).astype(np.float32)
+
+
+def measure_loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """测量积分响度 (LUFS)；无 pyloudnorm 时以 RMS 近似"""
+    try:
+        import pyloudnorm
+    except ImportError:
+        pyloudnorm = None
+
+    if pyloudnorm is not None:
+        try:
+            return float(pyloudnorm.Meter(sample_rate).integrated_loudness(samples))
+        except ValueError:
+            # 音频过短（不足一个测量块）时退回 RMS 近似
+            pass
+
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64)))) if len(samples) else 0.0
+    if rms <= 0:
+        return float('-inf')
+    return 20 * np.log10(rms) - 0.691
+
+
+def normalize_loudness(samples: np.ndarray, sample_rate: int, target_lufs: float) -> np.ndarray:
+    """将音频归一化到目标响度，并限制峰值不超过 -1 dBFS"""
+    loudness = measure_loudness(samples, sample_rate)
+    if not np.isfinite(loudness):
+        return samples
+
+    gain = 10 ** ((target_lufs - loudness) / 20)
+    output = samples * gain
+    peak = float(np.max(np.abs(output))) if len(output) else 0.0
+    if peak > _PEAK_LIMIT:
+        output = output * (_PEAK_LIMIT / peak)
+    return output.astype(np.float32)
+
+
+def write_audio(path, samples: np.ndarray, sample_rate: int, fmt: Optional[str] = None):
+    """按指定格式编码写出；先写临时文件再原子替换，避免留下半截文件"""
+    path = Path(path)
+    fmt = fmt or format_from_path(path, 'wav')
+    if fmt == PCM_FORMAT:
+        write_pcm(path, samples, sample_rate)
+        return
+    if fmt not in _SF_FORMATS:
+        raise ValueError(f'unsupported output format: {fmt}')
+
+    sf_format, subtype = _SF_FORMATS[fmt]
+    if sf_format not in sf.available_formats():
+        raise RuntimeError(f'libsndfile does not support {fmt} on this system (libsndfile >= 1.1 required for mp3)')
+
+    if fmt == 'opus' and sample_rate not in _OPUS_SAMPLE_RATES:
+        samples = resample(samples, sample_rate, 48000)
+        sample_rate = 48000
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temp_path_for(path)
+    try:
+        sf.write(str(tmp_path), samples, sample_rate, format=sf_format, subtype=subtype)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, threshold_db: float = DEFAULT_SILENCE_DB,
+                 pad_ms: float = _SILENCE_PAD_MS) -> np.ndarray:
+    """按帧能量裁掉首尾静音；整段都低于阈值时原样返回"""
+    frame = max(1, int(sample_rate * _SILENCE_FRAME_MS / 1000))
+    frames = len(samples) // frame
+    if frames == 0:
+        return samples
+
+    power = np.square(samples[:frames * frame], dtype=np.float32)
+    if power.ndim > 1:
+        power = power.mean(axis=1)
+    energy = power.reshape(frames, frame).mean(axis=1)
+    loud = np.flatnonzero(energy > 10 ** (threshold_db / 10))
+    if loud.size == 0:
+        return samples
+
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, loud[0] * frame - pad)
+    # 最后一帧之后不足一帧的尾部不参与判断，最后一帧有声时整段保留
+    end = len(samples) if loud[-1] == frames - 1 else min(len(samples), (loud[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+class SegmentJoiner:
+    """按顺序拼接音频片段并交给 write 回调，片段之间插入静音间隔或交叉淡化
+
+    流式处理：只保留上一片段末尾用于交叉淡化的一小段，内存占用与总时长无关。
+    gap_ms 大于 0 时插入静音，此时不做交叉淡化。
+    """
+
+    def __init__(self, write, sample_rate: int, gap_ms: float = 0, crossfade_ms: float = 0):
+        self.write = write
+        self.gap = int(sample_rate * gap_ms / 1000) if gap_ms else 0
+        self.fade = 0 if self.gap else int(sample_rate * crossfade_ms / 1000)
+        self._tail: Optional[np.ndarray] = None
+        self._started = False
+
+    def add(self, samples: np.ndarray):
+        if len(samples) == 0:
+            return
+        samples = samples.astype(np.float32, copy=False)
+        if self._started and self.gap:
+            self.write(np.zeros((self.gap,) + samples.shape[1:], dtype=np.float32))
+
+        if self._tail is not None and len(self._tail):
+            # 等功率交叉淡化：上一片段尾部淡出，当前片段开头淡入
+            n = min(len(self._tail), len(samples))
+            if len(self._tail) > n:
+                self.write(self._tail[:len(self._tail) - n])
+            angle = np.linspace(0, np.pi / 2, n, endpoint=False, dtype=np.float32)
+            fade_in, fade_out = np.sin(angle), np.cos(angle)
+            if samples.ndim > 1:
+                fade_in, fade_out = fade_in[:, None], fade_out[:, None]
+            self.write(self._tail[-n:] * fade_out + samples[:n] * fade_in)
+            samples = samples[n:]
+
+        if self.fade:
+            keep = min(self.fade, len(samples))
+            if len(samples) > keep:
+                self.write(samples[:len(samples) - keep])
+            self._tail = samples[len(samples) - keep:].copy()
+        elif len(samples):
+            self.write(samples)
+        self._started = True
+
+    def close(self):
+        if self._tail is not None and len(self._tail):
+            self.write(self._tail)
+        self._tail = None
+
+
+def process_audio(samples: np.ndarray, sample_rate: int, target_rate: Optional[int] = None,
+                  loudness: Optional[float] = None, trim_db: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    """内存中完成静音裁剪、重采样与响度归一化（先裁剪，静音不参与响度测量）"""
+    if trim_db is not None:
+        samples = trim_silence(samples, sample_rate, trim_db)
+    if target_rate and target_rate != sample_rate:
+        samples = resample(samples, sample_rate, target_rate)
+        sample_rate = target_rate
+    if loudness is not None:
+        samples = normalize_loudness(samples, sample_rate, loudness)
+    return samples, sample_rate
+
+
+def process_file(src, dst, fmt: Optional[str] = None, sample_rate: Optional[int] = None,
+                 loudness: Optional[float] = None, trim_db: Optional[float] = None) -> str:
+    """读取 src，后处理后编码到 dst；src 与 dst 不同时删除 src"""
+    src, dst = Path(src), Path(dst)
+    try:
+        samples, rate = read_audio(str(src))
+        samples, rate = process_audio(samples, rate, sample_rate, loudness, trim_db)
+        write_audio(dst, samples, rate, fmt or format_from_path(dst, 'wav'))
+        # 先释放可能仍映射着 src 的缓冲区（Windows 上映射中的文件无法删除）
+        del samples
+    except Exception:
+        # 共享内存中的交接文件占用内存，失败时同样释放
+        if is_pcm(src):
+            remove_pcm(src)
+        raise
+    if src.resolve() != dst.resolve():
+        remove_audio(src)
+    return str(dst)
+
+
+def _match_channels(samples: np.ndarray, channels: int) -> np.ndarray:
+    current = 1 if samples.ndim == 1 else samples.shape[1]
+    if current == channels:
+        return samples
+    if channels == 1:
+        return samples.mean(axis=1).astype(np.float32)
+    mono = samples if samples.ndim == 1 else samples.mean(axis=1)
+    return np.repeat(mono[:, None], channels, axis=1).astype(np.float32)
+
+
+class ConcatWriter:
+    """逐个追加音频片段并编码到 dst，内存只占用单个片段
+
+    每个片段单独裁剪静音并重采样到统一采样率，片段之间按 gap_ms / crossfade_ms 插入间隔或交叉淡化。
+    响度归一化作用于拼接后的整段输出（各片段增益相同，拼接处没有音量跳变）：
+    指定 loudness 时先把拼接结果写入 float32 临时文件，同时累计各片段的响度，close() 时按整体增益编码。
+    close() 后原子替换到 dst；出错时调用 abort() 丢弃临时文件。
+    """
+
+    # close() 时每次从临时文件读取并编码的帧数
+    _BLOCK_FRAMES = 1 << 16
+
+    def __init__(self, dst, fmt: Optional[str] = None, sample_rate: Optional[int] = None,
+                 loudness: Optional[float] = None, trim_db: Optional[float] = None,
+                 gap_ms: float = 0, crossfade_ms: float = 0):
+        self.dst = Path(dst)
+        self.fmt = fmt or format_from_path(self.dst, 'wav')
+        if self.fmt not in _SF_FORMATS:
+            raise ValueError(f'unsupported output format: {self.fmt}')
+        self._sf_format, self._subtype = _SF_FORMATS[self.fmt]
+        if self._sf_format not in sf.available_formats():
+            raise RuntimeError(f'libsndfile does not support {self.fmt} on this system (libsndfile >= 1.1 required for mp3)')
+        self.sample_rate = sample_rate
+        self.loudness = loudness
+        self.trim_db = trim_db
+        self.gap_ms = gap_ms
+        self.crossfade_ms = crossfade_ms
+        self.count = 0
+        self._tmp_path = temp_path_for(self.dst)
+        self._writer = None
+        self._joiner = None
+        self._channels = 1
+        # 响度归一化用：未归一化的拼接结果、各片段按时长加权的能量与输出峰值
+        self._raw_path = self._tmp_path.with_name(self._tmp_path.name + '.f32')
+        self._raw = None
+        self._energy = 0.0
+        self._measured = 0
+        self._peak = 0.0
+
+    def _open_writer(self):
+        self._writer = sf.SoundFile(str(self._tmp_path), 'w', samplerate=self.sample_rate, channels=self._channels,
+                                    format=self._sf_format, subtype=self._subtype)
+
+    def _write_raw(self, samples: np.ndarray):
+        if len(samples):
+            self._peak = max(self._peak, float(np.max(np.abs(samples))))
+            self._raw.write(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+
+    def add(self, source, remove: bool = False):
+        """追加一个片段（文件路径、.pcm 交接文件或音频字节）；remove 为 True 时追加后删除源文件"""
+        samples, rate = read_audio(str(source) if isinstance(source, Path) else source)
+        if self._joiner is None:
+            out_rate = self.sample_rate or rate
+            if self.fmt == 'opus' and out_rate not in _OPUS_SAMPLE_RATES:
+                out_rate = 48000
+            self.sample_rate = out_rate
+            self._channels = 1 if samples.ndim == 1 else samples.shape[1]
+            self.dst.parent.mkdir(parents=True, exist_ok=True)
+            if self.loudness is None:
+                self._open_writer()
+                write = self._writer.write
+            else:
+                self._raw = open(self._raw_path, 'wb')
+                write = self._write_raw
+            self._joiner = SegmentJoiner(write, out_rate, self.gap_ms, self.crossfade_ms)
+        samples, _ = process_audio(samples, rate, self.sample_rate, None, self.trim_db)
+        samples = _match_channels(samples, self._channels)
+        if self.loudness is not None:
+            # 整段响度 ≈ 各片段响度按时长加权的能量平均
+            loudness = measure_loudness(samples, self.sample_rate)
+            if np.isfinite(loudness):
+                self._energy += len(samples) * 10 ** (loudness / 10)
+                self._measured += len(samples)
+        self._joiner.add(samples)
+        self.count += 1
+        del samples
+        if remove and isinstance(source, (str, Path)) and Path(source).resolve() != self.dst.resolve():
+            remove_audio(source)
+
+    def _encode_raw(self):
+        """按整体增益把未归一化的拼接结果编码到临时输出文件"""
+        gain = 1.0
+        if self._measured:
+            current = 10 * np.log10(self._energy / self._measured)
+            gain = 10 ** ((self.loudness - current) / 20)
+            if self._peak * gain > _PEAK_LIMIT:
+                gain = _PEAK_LIMIT / self._peak
+        self._open_writer()
+        if self._raw_path.stat().st_size == 0:
+            return
+        raw = np.memmap(str(self._raw_path), dtype=np.float32, mode='r').reshape(-1, self._channels)
+        try:
+            for start in range(0, len(raw), self._BLOCK_FRAMES):
+                block = raw[start:start + self._BLOCK_FRAMES] * np.float32(gain)
+                self._writer.write(block[:, 0] if self._channels == 1 else block)
+        finally:
+            # 先释放映射再删除文件（Windows 上映射中的文件无法删除）
+            del raw
+
+    def close(self) -> str:
+        if self._joiner is None:
+            raise ValueError('no audio to concatenate')
+        self._joiner.close()
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+            self._encode_raw()
+            self._raw_path.unlink()
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.dst)
+        return str(self.dst)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        for path in (self._tmp_path, self._raw_path):
+            if path.exists():
+                path.unlink()
+
+
+def concat_files(sources, dst, fmt: Optional[str] = None, sample_rate: Optional[int] = None,
+                 loudness: Optional[float] = None, remove: bool = True, trim_db: Optional[float] = None,
+                 gap_ms: float = 0, crossfade_ms: float = 0) -> str:
+    """按顺序拼接多个音频文件（见 ConcatWriter）；remove 为 True 时拼接完成后删除源文件"""
+    sources = [Path(src) for src in sources]
+    if not sources:
+        raise ValueError('no audio to concatenate')
+
+    writer = ConcatWriter(dst, fmt, sample_rate, loudness, trim_db, gap_ms, crossfade_ms)
+    try:
+        for src in sources:
+            writer.add(src)
+        writer.close()
+    finally:
+        writer.abort()
+
+    if remove:
+        for src in sources:
+            if src.resolve() != writer.dst.resolve():
+                remove_audio(src)
+    return str(writer.dst)
+
+
+class PostProcessor:
+    """后处理线程池：编码在后台线程完成，不占用合成的关键路径"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1),
+                                           thread_name_prefix='tts-postprocess')
+
+    def submit(self, src, dst, fmt: Optional[str] = None, sample_rate: Optional[int] = None,
+               loudness: Optional[float] = None, trim_db: Optional[float] = None) -> Future:
+        return self.executor.submit(process_file, src, dst, fmt, sample_rate, loudness, trim_db)
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=True)
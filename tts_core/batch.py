@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+批处理清单 (Batch Manifest)
+支持三种清单格式：
+  - .txt   每个非空行一个条目
+  - .jsonl 每行一个 JSON 对象: {"id": ..., "text": ..., "voice": ..., "output": ...}
+  - 目录   目录下每个 .txt 文件为一个条目
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+
+@dataclass
+class BatchItem:
+    item_id: str
+    text: str
+    voice: Optional[str] = None
+    output: Optional[str] = None
+
+
+def _read_text(path: Path) -> str:
+    try:
+        return path.read_text(encoding='utf-8-sig')
+    except UnicodeDecodeError:
+        return path.read_text(encoding='gbk', errors='replace')
+
+
+def load_manifest(path) -> List[BatchItem]:
+    """读取批处理清单，返回条目列表（保持清单顺序）"""
+    path = Path(path)
+    items = []
+
+    if path.is_dir():
+        for text_file in sorted(path.glob('*.txt')):
+            text = _read_text(text_file).strip()
+            if text:
+                items.append(BatchItem(item_id=text_file.stem, text=text))
+        return items
+
+    content = _read_text(path)
+    if path.suffix.lower() == '.jsonl':
+        for line_no, line in enumerate(content.splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            text = str(record.get('text', '')).strip()
+            if not text:
+                continue
+            items.append(BatchItem(
+                item_id=str(record.get('id') or f'{line_no:06d}'),
+                text=text,
+                voice=record.get('voice'),
+                output=record.get('output'),
+            ))
+    else:
+        for line_no, line in enumerate(content.splitlines(), start=1):
+            text = line.strip()
+            if text:
+                items.append(BatchItem(item_id=f'{line_no:06d}', text=text))
+
+    seen = set()
+    for item in items:
+        if item.item_id in seen:
+            raise ValueError(f'duplicate item id in manifest: {item.item_id}')
+        seen.add(item.item_id)
+    return items
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+长文本流式分块
+按段落/句子边界逐块读取文本文件，内存占用只与块大小有关，与文件大小无关
+
+每块不超过 max_chars 个字符：相邻的短段落合并为一块，过长的段落在句末切分，
+没有句末标点的超长句子按长度硬切。
+
+paragraphs=True 时块在空行（段落边界）处断开（已积累不足 max_chars / 4 时继续合并下一段），
+修改一个段落只会改变它附近的块，增量重合成（见 segments.py）据此只合成改动过的部分。
+"""
+
+import codecs
+import io
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+DEFAULT_CHUNK_CHARS = 1000
+
+# 编码探测读取的字节数
+_PROBE_BYTES = 64 * 1024
+
+# 句末标点（含紧随其后的引号/括号）；换行同样视为句子边界
+_SENTENCE_END = re.compile(r'[。！？；!?;…]+[”’」』）)"\']*|\.(?=\s)|\n')
+
+
+def detect_encoding(path) -> str:
+    """探测文本文件编码：UTF-8（含 BOM）优先，否则按 GBK 读取"""
+    with open(path, 'rb') as f:
+        head = f.read(_PROBE_BYTES)
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        # final=False：探测块末尾被截断的多字节字符不算错误
+        decoder.decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gbk'
+
+
+def split_sentences(text: str) -> List[str]:
+    """按句末标点切分，每句保留自身的标点与换行"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+def _hard_split(sentence: str, max_chars: int) -> Iterator[str]:
+    for start in range(0, len(sentence), max_chars):
+        yield sentence[start:start + max_chars]
+
+
+def iter_sentences(f, max_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[str]:
+    """从文本流中逐句读取，单句不超过 max_chars"""
+    carry = ''
+    while True:
+        # readline 限长：整本书只有一行时也不会一次读入内存
+        line = f.readline(max_chars * 4)
+        if not line:
+            break
+        sentences = split_sentences(carry + line)
+        carry = ''
+        # 被 readline 截断的行，末尾的半句留到下一次拼接
+        if not line.endswith('\n') and not _SENTENCE_END.fullmatch(sentences[-1][-1:]):
+            carry = sentences.pop()
+            if len(carry) > max_chars:
+                keep = len(carry) % max_chars or max_chars
+                sentences.append(carry[:-keep])
+                carry = carry[-keep:]
+        for sentence in sentences:
+            yield from _hard_split(sentence, max_chars)
+    if carry:
+        yield from _hard_split(carry, max_chars)
+
+
+def pack_sentences(sentences, max_chars: int = DEFAULT_CHUNK_CHARS, paragraphs: bool = False) -> Iterator[str]:
+    """把相邻的句子合并为不超过 max_chars 的块；空白块被跳过"""
+    buffer: List[str] = []
+    size = 0
+    previous = ''
+    for sentence in sentences:
+        # 空行：上一句以换行结尾，这一句只有空白
+        paragraph_end = (paragraphs and previous.endswith('\n') and not sentence.strip()
+                         and size >= max_chars // 4)
+        previous = sentence
+        if (size + len(sentence) > max_chars or paragraph_end) and buffer:
+            chunk = ''.join(buffer).strip()
+            if chunk:
+                yield chunk
+            buffer, size = [], 0
+        buffer.append(sentence)
+        size += len(sentence)
+
+    chunk = ''.join(buffer).strip()
+    if chunk:
+        yield chunk
+
+
+def iter_chunks(path, max_chars: int = DEFAULT_CHUNK_CHARS, encoding: Optional[str] = None,
+                paragraphs: bool = False) -> Iterator[str]:
+    """逐块产出文本文件内容；paragraphs 为 True 时块在段落边界断开"""
+    max_chars = max(1, int(max_chars))
+    encoding = encoding or detect_encoding(path)
+    with open(Path(path), 'r', encoding=encoding, errors='replace') as f:
+        yield from pack_sentences(iter_sentences(f, max_chars), max_chars, paragraphs)
+
+
+def chunk_text(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """内存中的文本按同样的规则分块"""
+    max_chars = max(1, int(max_chars))
+    return list(pack_sentences(iter_sentences(io.StringIO(text), max_chars), max_chars))
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+自适应分块大小
+每次引擎调用的 (字数, 耗时) 记录在本地计时库 (SQLite)，按 引擎 + 音色 拟合耗时曲线
+    耗时 ≈ a + b·字数 + c·字数²
+a 是每次请求的固定开销（Edge 等在线接口较大），c 反映长输入的超线性开销（Qwen3 的注意力计算）。
+一篇文档的各块依次合成，总耗时 ≈ 块数 × 单块耗时，据此在候选块大小中选总耗时最小的：
+开销大的引擎用大块减少请求数，超线性的引擎用较小的块。
+
+选出的大小限制在 chunk_chars 的 1/4 到 4 倍之间（不超过 MAX_CHUNK_CHARS），且不超过已记录的最长输入的两倍，
+曲线只在观测过的范围附近外推；样本不足或字数跨度太小时不拟合，沿用 chunk_chars。
+
+    python -m tts_core.chunksize            # 查看各引擎/音色的曲线与推荐块大小
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# 每个 引擎/音色 保留的最近样本数
+MAX_SAMPLES = 200
+# 拟合所需的最少样本数，以及最长与最短输入之比的下限
+MIN_SAMPLES = 8
+MIN_SPREAD = 2.0
+# 耗时超过拟合值该倍数的样本（模型加载、冷启动、网络抖动）视为离群值，剔除后重新拟合
+OUTLIER_RATIO = 3.0
+# 块大小上限（OpenAI 接口单次输入最多 4096 字）与下限
+MAX_CHUNK_CHARS = 4000
+MIN_CHUNK_CHARS = 50
+# 候选块大小的数量（在上下限之间按等比取值）
+CANDIDATES = 48
+# 进程内缓存拟合结果的时长 (秒)，服务模式不必每个请求都读取计时库
+CURVE_TTL = 60.0
+
+DEFAULT_VOICE = 'default'
+
+
+class Curve(NamedTuple):
+    """耗时曲线 seconds(n) = overhead + per_char·n + quadratic·n²"""
+    overhead: float
+    per_char: float
+    quadratic: float
+    samples: int
+    max_chars: int
+
+    def seconds(self, chars: float) -> float:
+        return self.overhead + self.per_char * chars + self.quadratic * chars * chars
+
+
+def _connect(path) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute(
+        '''CREATE TABLE IF NOT EXISTS timings (
+            engine TEXT NOT NULL,
+            voice TEXT NOT NULL,
+            chars INTEGER NOT NULL,
+            seconds REAL NOT NULL,
+            recorded_at REAL NOT NULL
+        )'''
+    )
+    conn.execute('CREATE INDEX IF NOT EXISTS timings_key ON timings (engine, voice)')
+    return conn
+
+
+def record(path, engine: str, voice: Optional[str], chars: int, seconds: float):
+    """记录一次成功的引擎调用，只保留最近 MAX_SAMPLES 条"""
+    voice = voice or DEFAULT_VOICE
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute('INSERT INTO timings (engine, voice, chars, seconds, recorded_at) VALUES (?, ?, ?, ?, ?)',
+                         (engine, voice, chars, seconds, time.time()))
+            conn.execute(
+                '''DELETE FROM timings WHERE engine = ? AND voice = ? AND rowid NOT IN (
+                       SELECT rowid FROM timings WHERE engine = ? AND voice = ? ORDER BY rowid DESC LIMIT ?)''',
+                (engine, voice, engine, voice, MAX_SAMPLES)
+            )
+    finally:
+        conn.close()
+
+
+def load_samples(path, engine: Optional[str] = None, voice: Optional[str] = None) -> Dict[Tuple[str, str], List]:
+    """{(引擎, 音色): [(字数, 耗时), ...]}；计时库不存在时为空"""
+    if not Path(path).exists():
+        return {}
+    conn = _connect(path)
+    try:
+        query, params = 'SELECT engine, voice, chars, seconds FROM timings', []
+        if engine is not None:
+            query, params = query + ' WHERE engine = ? AND voice = ?', [engine, voice or DEFAULT_VOICE]
+        samples: Dict[Tuple[str, str], List] = {}
+        for row_engine, row_voice, chars, seconds in conn.execute(query + ' ORDER BY rowid', params):
+            samples.setdefault((row_engine, row_voice), []).append((chars, seconds))
+        return samples
+    finally:
+        conn.close()
+
+
+def _solve(rows: List[List[float]], values: List[float]) -> Optional[List[float]]:
+    """最小二乘：解正规方程 (XᵀX)β = Xᵀy，列数很少，直接高斯消元"""
+    size = len(rows[0])
+    matrix = [[sum(row[i] * row[j] for row in rows) for j in range(size)]
+              + [sum(row[i] * y for row, y in zip(rows, values))] for i in range(size)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(matrix[r][col]))
+        if abs(matrix[pivot][col]) < 1e-12:
+            return None
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        for r in range(size):
+            if r != col:
+                factor = matrix[r][col] / matrix[col][col]
+                matrix[r] = [a - factor * b for a, b in zip(matrix[r], matrix[col])]
+    return [matrix[i][size] / matrix[i][i] for i in range(size)]
+
+
+def _fit_terms(samples: Sequence[Tuple[float, float]]) -> Optional[Tuple[float, float, float]]:
+    """拟合 (a, b, c)，要求 a、c 非负：出现负值时去掉该项重新拟合"""
+    # 字数以千字为单位，避免平方项数值过大
+    for terms in ((0, 1, 2), (0, 1), (1, 2), (1,)):
+        rows = [[(chars / 1000.0) ** power for power in terms] for chars, _ in samples]
+        solution = _solve(rows, [seconds for _, seconds in samples])
+        if solution is None:
+            continue
+        coefficients = dict(zip(terms, solution))
+        a, b, c = coefficients.get(0, 0.0), coefficients.get(1, 0.0), coefficients.get(2, 0.0)
+        if a < 0 or c < 0 or (b < 0 and c == 0):
+            continue
+        return a, b / 1000.0, c / 1e6
+    return None
+
+
+def fit_curve(samples: Sequence[Tuple[int, float]]) -> Optional[Curve]:
+    """由 (字数, 耗时) 样本拟合耗时曲线；样本不足或字数跨度太小时返回 None"""
+    samples = [(chars, seconds) for chars, seconds in samples if chars > 0 and seconds > 0]
+    if len(samples) < MIN_SAMPLES:
+        return None
+    lengths = [chars for chars, _ in samples]
+    if max(lengths) < MIN_SPREAD * min(lengths):
+        return None
+    terms = _fit_terms(samples)
+    if terms is None:
+        return None
+    # 剔除离群值后重新拟合一次
+    kept = [(chars, seconds) for chars, seconds in samples
+            if seconds <= OUTLIER_RATIO * max(terms[0] + terms[1] * chars + terms[2] * chars * chars, 1e-3)]
+    if MIN_SAMPLES <= len(kept) < len(samples):
+        terms = _fit_terms(kept) or terms
+        samples = kept
+    return Curve(*terms, samples=len(samples), max_chars=max(chars for chars, _ in samples))
+
+
+def chunk_bounds(curve: Curve, chunk_chars: int) -> Tuple[int, int]:
+    low = max(MIN_CHUNK_CHARS, chunk_chars // 4)
+    high = min(MAX_CHUNK_CHARS, chunk_chars * 4, max(chunk_chars, 2 * curve.max_chars))
+    return low, max(low, high)
+
+
+def best_chunk_chars(curve: Curve, chunk_chars: int, total_chars: Optional[int] = None) -> int:
+    """总耗时最小的块大小；total_chars 已知时按实际块数计算（最后一块可能不满），否则按每字平均耗时"""
+    low, high = chunk_bounds(curve, chunk_chars)
+    candidates = {low, high, chunk_chars if low <= chunk_chars <= high else low}
+    ratio = (high / low) ** (1.0 / (CANDIDATES - 1)) if high > low else 1.0
+    candidates.update(int(round(low * ratio ** step)) for step in range(CANDIDATES))
+    if total_chars and low <= total_chars <= high:
+        candidates.add(total_chars)
+
+    def cost(size):
+        if total_chars:
+            chunks, last = divmod(total_chars, size)
+            return chunks * curve.seconds(size) + (curve.seconds(last) if last else 0.0)
+        return curve.seconds(size) / size
+
+    # 耗时相同时取较大的块，减少拼接处
+    return min(sorted(candidates, reverse=True), key=cost)
+
+
+_curve_cache: Dict[Tuple[str, str, str], Tuple[float, Optional[Curve]]] = {}
+_cache_lock = threading.Lock()
+
+
+def load_curve(path, engine: str, voice: Optional[str] = None) -> Optional[Curve]:
+    """读取并拟合 引擎/音色 的曲线，结果在进程内缓存 CURVE_TTL 秒"""
+    key = (str(path), engine, voice or DEFAULT_VOICE)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _curve_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+    samples = load_samples(path, engine, voice).get((engine, voice or DEFAULT_VOICE), [])
+    curve = fit_curve(samples)
+    with _cache_lock:
+        _curve_cache[key] = (now + CURVE_TTL, curve)
+    return curve
+
+
+def plan_chunk_chars(path, engine: str, voice: Optional[str], chunk_chars: int,
+                     total_chars: Optional[int] = None) -> Tuple[int, Optional[Curve]]:
+    """返回 (块大小, 使用的曲线)；没有可用曲线时为 (chunk_chars, None)"""
+    try:
+        curve = load_curve(path, engine, voice)
+    except sqlite3.Error:
+        curve = None
+    if curve is None:
+        return chunk_chars, None
+    return best_chunk_chars(curve, chunk_chars, total_chars), curve
+
+
+def main():
+    import argparse
+
+    from tts_core.config import load_config
+
+    parser = argparse.ArgumentParser(description='自适应分块：查看各引擎/音色的耗时曲线与推荐块大小')
+    parser.add_argument('--timings', help='计时库路径 (默认取 tts-skill.config 的 timing_store)')
+    parser.add_argument('--chunk-chars', type=int, help='基准块大小 (默认取 tts-skill.config 的 chunk_chars)')
+    args = parser.parse_args()
+
+    settings = load_config('tts-skill')
+    path = Path(args.timings).expanduser() if args.timings else settings['timing_store']
+    chunk_chars = args.chunk_chars or settings['chunk_chars']
+    samples = load_samples(path)
+    if not samples:
+        print(f'no timings recorded in {path}')
+        return
+    print(f"{'engine':<12} {'voice':<24} {'samples':>7} {'overhead':>9} {'ms/char':>8} {'ms/kchar²':>10} {'chunk':>6}")
+    for (engine, voice), rows in sorted(samples.items()):
+        curve = fit_curve(rows)
+        if curve is None:
+            # 样本不足或字数跨度太小，沿用 chunk_chars
+            print(f"{engine:<12} {voice:<24} {len(rows):>7} {'-':>9} {'-':>8} {'-':>10} {chunk_chars:>6}")
+            continue
+        print(f"{engine:<12} {voice:<24} {curve.samples:>7} {curve.overhead:>8.2f}s {curve.per_char * 1000:>8.2f} "
+              f"{curve.quadratic * 1e9:>10.2f} {best_chunk_chars(curve, chunk_chars):>6}")
+
+
+if __name__ == '__main__':
+    main()
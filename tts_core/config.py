@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+统一配置
+各引擎与主入口共用的分层配置：默认值 < 配置文件 < 环境变量 < 命令行参数
+
+配置文件按以下顺序查找第一个存在的文件：显式指定的路径、当前目录/<名称>.config、
+engines/<名称>.config、仓库根目录/<名称>.config（当前目录优先，与原先 OpenAI 引擎的查找顺序一致）。环境变量名为 <前缀><选项名大写>，
+如 TTS_OPENAI_API_KEY、TTS_QWEN3_SAMPLE_RATE、TTS_WORKERS。
+
+解析结果按文件缓存，长驻进程（服务模式、worker）每次 load_config() 只检查文件的修改时间，
+文件未变时不重新解析。配置文件中未在模式里声明的选项会被忽略。
+配置文件中的相对路径以该文件所在目录为基准；默认值、环境变量与命令行参数中的相对路径以模式的 base_dir 为基准。
+"""
+
+import configparser
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+ENGINES_DIR = ROOT_DIR / 'engines'
+
+
+class ConfigError(ValueError):
+    """配置值不合法"""
+
+
+class Option(NamedTuple):
+    name: str
+    type: Callable[[str], Any]
+    default: Any
+    choices: Optional[Tuple] = None
+    minimum: Optional[float] = None
+
+
+class Schema(NamedTuple):
+    section: str  # 配置文件中的节名；不存在时读取 [DEFAULT]
+    env_prefix: str
+    options: Tuple[Option, ...]
+    base_dir: Path = ENGINES_DIR  # 相对路径选项的基准目录
+
+
+def _bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in ('1', 'true', 'yes', 'on'):
+        return True
+    if lowered in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f'not a boolean: {value}')
+
+
+def _path(value: str) -> Path:
+    return Path(value).expanduser()
+
+
+def _optional_float(value: str) -> Optional[float]:
+    # 空值表示"未设置"，由使用方决定默认行为
+    return float(value) if value.strip() else None
+
+
+def _optional_int(value: str) -> Optional[int]:
+    # 0 或空值表示"不设置"
+    return int(value) or None if value.strip() else None
+
+
+AUDIO_FORMATS = ('wav', 'flac', 'opus', 'mp3')
+
+SCHEMAS: Dict[str, Schema] = {
+    'edge-tts': Schema('DEFAULT', 'TTS_EDGE_', (
+        Option('api_url', str, 'https://tts.wangwangit.com/v1/audio/speech'),
+        Option('voice', str, 'zh-CN-XiaoxiaoNeural'),
+        Option('speed', float, 1.0, minimum=0.1),
+        Option('pitch', str, '0'),
+        Option('style', str, 'general'),
+    )),
+    'openai-tts': Schema('OpenAI', 'TTS_OPENAI_', (
+        Option('api_key', str, ''),
+        Option('base_url', str, 'https://api.openai.com/v1'),
+        Option('voice', str, 'alloy'),
+        Option('model', str, 'tts-1'),
+        Option('speed', float, 1.0, minimum=0.25),
+        Option('output_format', str, 'mp3', choices=('mp3', 'opus', 'aac', 'flac', 'wav', 'pcm')),
+        Option('timeout', float, 30.0, minimum=0),
+    )),
+    'qwen3-tts': Schema('Qwen3-TTS', 'TTS_QWEN3_', (
+        Option('model_dir', _path, './Qwen3-TTS-12Hz-0.6B-Base'),
+        Option('assets_dir', _path, '../assets'),
+        Option('default_voice', str, '赵信'),
+        # pcm 为主入口使用的共享内存交接格式，见 tts_core/pcm.py
+        Option('output_format', str, 'wav', choices=AUDIO_FORMATS + ('pcm',)),
+        Option('sample_rate', _optional_int, None, minimum=1),
+        # 常驻模型进程空闲多少秒后退出并释放内存 (0 为每次调用后退出；未设置时见 modelhost.idle_unload_for)，
+        # 内存上限 (MB，0 为不限)
+        Option('idle_unload', _optional_float, None, minimum=0),
+        Option('max_rss_mb', int, 0, minimum=0),
+    )),
+    # 主入口：服务、分块与分布式批处理的并发设置
+    'tts-skill': Schema('tts-skill', 'TTS_', (
+        Option('workers', int, 1, minimum=1),
+        Option('chunk_chars', int, 1000, minimum=1),
+        Option('unit_size', int, 20, minimum=1),
+        Option('normalize', _bool, True),
+        Option('trim_silence', _bool, False),
+        Option('silence_db', float, -45.0),
+        Option('gap_ms', int, 0, minimum=0),
+        Option('crossfade_ms', int, 0, minimum=0),
+        Option('phrase_dir', _path, 'cache/phrases'),
+        Option('pool_size', int, 2, minimum=0),
+        Option('pool_max_jobs', int, 100, minimum=1),
+        Option('pool_max_rss_mb', int, 1024, minimum=0),
+        # 异步作业 (--submit) 的作业库与 runner 同时执行的作业数，见 tts_core/jobs.py
+        Option('job_store', _path, 'cache/jobs.sqlite'),
+        Option('job_workers', int, 2, minimum=1),
+        # 服务模式异步作业的输出与完成标记保留的秒数 (0 为不清理)，同步请求的输出发送后即删除
+        Option('service_retention', float, 3600.0, minimum=0),
+        # 每次引擎调用的耗时记录在计时库中；adaptive_chunks 为 true 时据此选择长文本分块大小，见 tts_core/chunksize.py
+        Option('adaptive_chunks', _bool, False),
+        Option('timing_store', _path, 'cache/timings.sqlite'),
+    ), base_dir=ROOT_DIR),
+}
+
+# (名称, 文件路径) -> (mtime_ns, size, 文件中的原始值)
+_file_cache: Dict[Tuple[str, str], Tuple[int, int, Dict[str, str]]] = {}
+_cache_lock = threading.Lock()
+
+
+def find_config_file(name: str, path=None) -> Optional[Path]:
+    """返回第一个存在的配置文件；显式指定的路径不存在时同样继续查找默认位置"""
+    candidates = [Path(path).expanduser()] if path else []
+    candidates += [Path.cwd() / f'{name}.config', ENGINES_DIR / f'{name}.config', ROOT_DIR / f'{name}.config']
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def _read_file(name: str, schema: Schema, path: Path) -> Dict[str, str]:
+    """读取配置文件的原始值，文件未修改时直接返回缓存"""
+    stat = path.stat()
+    key = (name, str(path.resolve()))
+    with _cache_lock:
+        cached = _file_cache.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+    parser = configparser.ConfigParser(inline_comment_prefixes=('#', ';'), interpolation=None)
+    try:
+        parser.read(path, encoding='utf-8')
+    except configparser.Error as e:
+        raise ConfigError(f'{path}: {e}')
+    values = dict(parser.defaults())
+    if parser.has_section(schema.section):
+        values.update(parser.items(schema.section))
+
+    with _cache_lock:
+        _file_cache[key] = (stat.st_mtime_ns, stat.st_size, values)
+    return values
+
+
+def _convert(option: Option, raw: Any, source: str, base_dir: Path) -> Any:
+    if raw is None or not isinstance(raw, str):
+        value = raw
+    else:
+        try:
+            value = option.type(raw)
+        except (TypeError, ValueError):
+            raise ConfigError(f'{source}: invalid value for {option.name}: {raw!r}')
+    if option.choices and value not in option.choices:
+        raise ConfigError(f'{source}: {option.name} must be one of {", ".join(option.choices)}, got {value!r}')
+    if option.minimum is not None and value is not None and value < option.minimum:
+        raise ConfigError(f'{source}: {option.name} must be >= {option.minimum}, got {value!r}')
+    if isinstance(value, Path) and not value.is_absolute():
+        value = (base_dir / value).resolve()
+    return value
+
+
+def load_config(name: str, path=None, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """按模式合并各层配置并校验，返回 {选项名: 值}；overrides 中为 None 的项视为未指定"""
+    schema = SCHEMAS[name]
+    config_file = find_config_file(name, path)
+    file_values = _read_file(name, schema, config_file) if config_file else {}
+    file_source = str(config_file) if config_file else 'defaults'
+    # 当前目录或 --config 指定的配置文件中的相对路径应指向该文件旁边，而不是 engines/
+    file_base = config_file.resolve().parent if config_file else schema.base_dir
+
+    result: Dict[str, Any] = {}
+    for option in schema.options:
+        env_name = schema.env_prefix + option.name.upper()
+        base_dir = schema.base_dir
+        if overrides and overrides.get(option.name) is not None:
+            raw, source = overrides[option.name], 'command line'
+        elif os.environ.get(env_name):
+            raw, source = os.environ[env_name], env_name
+        elif option.name in file_values:
+            raw, source, base_dir = file_values[option.name], file_source, file_base
+        else:
+            raw, source = option.default, 'defaults'
+        result[option.name] = _convert(option, raw, source, base_dir)
+    return result
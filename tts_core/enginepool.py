@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+引擎进程池
+每种引擎保留若干个常驻的引擎脚本进程，作业经管道发送，省去每次调用的解释器启动与模块导入，
+同时保留子进程隔离：引擎崩溃或内存泄漏不会影响主进程
+
+协议为 JSON 行：主入口向 worker 的标准输入写 {"args": [...], "text": "...", "env": {...}}，
+worker 以原来的命令行方式执行一次引擎的 main()，再向标准输出写 {"code": 退出码, "rss_mb": 峰值内存}。
+worker 内引擎打印的信息改写到标准错误，不与协议混在一起。
+
+worker 处理满 max_jobs 个作业或峰值内存超过 max_rss_mb 后退出并在下次使用时重新启动；
+空闲 worker 超过 max_idle 个时多余的直接关闭，并发调用不会因池满而等待。
+
+各引擎脚本启动时都会导入本模块（run_main），subprocess 与 traceback 在用到时才导入。
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+POOL_ENV = 'TTS_POOL_WORKER'
+
+DEFAULT_MAX_IDLE = 2
+DEFAULT_MAX_JOBS = 100
+DEFAULT_MAX_RSS_MB = 1024
+
+
+def peak_rss_mb() -> float:
+    """本进程的峰值内存 (MB)；无法获取时为 0"""
+    try:
+        import resource
+    except ImportError:
+        # Windows 没有 resource 模块，不按内存回收
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb() -> float:
+    """本进程当前的常驻内存 (MB)，随释放而下降；无法获取时退回峰值内存"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return peak_rss_mb()
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def run_main(main: Callable[[], None]):
+    """引擎脚本入口：由进程池启动时进入 worker 循环，否则照常执行一次 main()"""
+    if os.environ.get(POOL_ENV) == '1':
+        serve_worker(main)
+    else:
+        main()
+
+
+def serve_worker(main: Callable[[], None]):
+    """worker 循环：逐个读取作业，替换 sys.argv / sys.stdin / 环境变量后调用 main()"""
+    requests = os.fdopen(os.dup(0), 'r', encoding='utf-8')
+    responses = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    # 引擎代码与它启动的子进程不能读写协议管道：标准输入改为空设备，标准输出并入标准错误
+    null_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null_fd, 0)
+    os.close(null_fd)
+    os.dup2(2, 1)
+
+    argv0 = sys.argv[0]
+    for line in requests:
+        try:
+            job = json.loads(line)
+        except ValueError:
+            continue
+        job_env = job.get('env') or {}
+        saved_env = {name: os.environ.get(name) for name in job_env}
+        os.environ.update(job_env)
+        sys.argv = [argv0] + list(job.get('args') or [])
+        sys.stdin = io.StringIO(job.get('text') or '')
+        code = 0
+        try:
+            main()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            sys.stdout.flush()
+            sys.stderr.flush()
+        responses.write(json.dumps({'code': code, 'rss_mb': round(peak_rss_mb(), 1)}) + '\n')
+        responses.flush()
+
+
+class EngineWorker:
+    """一个常驻的引擎脚本进程"""
+
+    def __init__(self, script, cwd, env: Optional[Dict[str, str]] = None):
+        import subprocess
+        self.script = str(script)
+        self.process = subprocess.Popen(
+            [sys.executable, self.script], cwd=str(cwd), env={**(env or os.environ), POOL_ENV: '1'},
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, encoding='utf-8', errors='replace', bufsize=1,
+        )
+        self.jobs = 0
+        self.rss_mb = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, args: List[str], text: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> int:
+        """执行一个作业并返回退出码；worker 意外退出时返回 1 并标记为不可复用"""
+        request = {'args': list(args), 'text': text or '', 'env': env or {}}
+        try:
+            self.process.stdin.write(json.dumps(request, ensure_ascii=False) + '\n')
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        except (OSError, ValueError):
+            line = ''
+        self.jobs += 1
+        if not line:
+            self.kill()
+            return 1
+        response = json.loads(line)
+        self.rss_mb = response.get('rss_mb') or 0.0
+        return int(response.get('code', 1))
+
+    def close(self, timeout: float = 5.0):
+        import subprocess
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+
+class EnginePool:
+    """按引擎脚本划分的 worker 池，线程安全"""
+
+    def __init__(self, max_idle: int = DEFAULT_MAX_IDLE, max_jobs: int = DEFAULT_MAX_JOBS,
+                 max_rss_mb: float = DEFAULT_MAX_RSS_MB, env: Optional[Dict[str, str]] = None):
+        self.max_idle = max_idle
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.env = env
+        self.started = 0
+        self.recycled = 0
+        self._idle: Dict[str, List[EngineWorker]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def run(self, script, cwd, args: List[str], text: Optional[str] = None,
+            env: Optional[Dict[str, str]] = None) -> int:
+        """在空闲 worker 上执行一次引擎调用，没有空闲 worker 时启动新的"""
+        key = str(Path(script).resolve())
+        worker = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and worker is None:
+                candidate = idle.pop()
+                if candidate.alive:
+                    worker = candidate
+        if worker is None:
+            worker = EngineWorker(key, cwd, self.env)
+            with self._lock:
+                self.started += 1
+        try:
+            return worker.run(args, text, env)
+        finally:
+            self._release(key, worker)
+
+    def _release(self, key: str, worker: EngineWorker):
+        worn = worker.jobs >= self.max_jobs or (self.max_rss_mb and worker.rss_mb > self.max_rss_mb)
+        with self._lock:
+            keep = worker.alive and not worn and not self._closed and len(self._idle.get(key, [])) < self.max_idle
+            if keep:
+                self._idle.setdefault(key, []).append(worker)
+            elif worn:
+                self.recycled += 1
+        if not keep:
+            worker.close()
+
+    def close(self):
+        """关闭所有空闲 worker；之后归还的 worker 也会被关闭"""
+        with self._lock:
+            self._closed = True
+            workers = [worker for idle in self._idle.values() for worker in idle]
+            self._idle.clear()
+        for worker in workers:
+            worker.close()
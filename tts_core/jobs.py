@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+异步作业
+--submit 把一次合成登记到本地作业库 (SQLite) 后立即返回作业 ID，调用方不必等待合成完成；
+之后用 --status / --result 查询，或在作业结束时接收本机 webhook 回调、检查完成标记文件。
+
+作业由后台 runner 进程执行：--submit 发现没有存活的 runner 时启动一个，runner 同时执行至多 job_workers 个作业，
+队列清空后退出，不常驻。每个作业在独立的 tts-skill.py 子进程中运行（命令行与提交时相同），输出写入作业日志。
+runner 定期心跳并登记进程号；runner 被强制结束后（同一主机上进程已不存在，或心跳过期），
+它运行中的作业重新排队。--submit 与 --status / --result 都会做这项检查，有排队的作业而没有存活的 runner 时启动新的 runner。
+
+作业结束时（成功或失败）:
+  - 完成标记：把作业状态 (JSON) 原子写入 marker 路径，编排程序检查文件是否存在即可
+  - 回调：向 callback 地址 POST 同样的 JSON；只允许本机地址，失败只记录到作业日志，不影响作业状态
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from tts_core.scheduler import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+# runner 心跳间隔与判定 runner 已退出的超时 (秒)
+HEARTBEAT_SECONDS = 10.0
+RUNNER_TIMEOUT = 60.0
+# runner 退出（被强制结束）后作业最多重新执行的次数
+MAX_ATTEMPTS = 2
+# 空闲的 runner 线程查询新作业的间隔 (秒)
+POLL_SECONDS = 1.0
+# 结束超过该时长的作业记录与日志在提交新作业时清理 (秒)
+RETENTION_SECONDS = 7 * 24 * 3600
+# 回调请求超时 (秒)
+CALLBACK_TIMEOUT = 10.0
+
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+def _pid_alive(runner: str, pid: Optional[int]) -> bool:
+    """runner 进程是否仍存在；其他主机上的 runner（作业库在共享目录时）只能依靠心跳判断"""
+    import socket
+
+    if not pid or os.name == 'nt' or runner.rsplit('-', 1)[0] != socket.gethostname():
+        # Windows 上 os.kill 会结束目标进程，不能用来探测
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def new_job_id() -> str:
+    """按提交时间排序的作业 ID"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+
+
+def check_callback(url: str) -> str:
+    """回调只允许本机的 http(s) 地址"""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or parts.hostname not in LOOPBACK_HOSTS:
+        raise ValueError(f'callback must be an http(s) URL on this machine (localhost / 127.0.0.1): {url}')
+    return url
+
+
+class JobStore:
+    """作业库；每个线程使用各自的实例（sqlite3 连接不跨线程共享）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.log_dir = self.path.parent / 'jobs'
+        # isolation_level=None：由本类显式控制事务边界
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            '''CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                argv TEXT NOT NULL,
+                cwd TEXT NOT NULL,
+                output TEXT NOT NULL,
+                callback TEXT,
+                marker TEXT,
+                runner TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                exit_code INTEGER,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )'''
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS runners (runner TEXT PRIMARY KEY, pid INTEGER, heartbeat_at REAL NOT NULL)'
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def log_path(self, job_id: str) -> Path:
+        return self.log_dir / f'{job_id}.log'
+
+    def submit(self, job_id: str, argv: List[str], cwd: str, output: str, callback: Optional[str] = None,
+               marker: Optional[str] = None) -> Dict:
+        self.conn.execute(
+            '''INSERT INTO jobs (job_id, state, argv, cwd, output, callback, marker, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+            (job_id, JOB_QUEUED, json.dumps(argv, ensure_ascii=False), cwd, output, callback, marker, time.time())
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self.conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['argv'] = json.loads(job['argv'])
+        return job
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        rows = self.conn.execute('SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,))
+        return [self.get(row['job_id']) for row in rows.fetchall()]
+
+    def summary(self) -> Dict[str, int]:
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        for row in self.conn.execute('SELECT state, COUNT(*) AS n FROM jobs GROUP BY state'):
+            counts[row['state']] = row['n']
+        return counts
+
+    def prune(self, max_age: float = RETENTION_SECONDS) -> int:
+        """删除结束已久的作业记录及其日志（输出文件保留）"""
+        cutoff = time.time() - max_age
+        rows = self.conn.execute('SELECT job_id FROM jobs WHERE finished_at < ?', (cutoff,)).fetchall()
+        for row in rows:
+            try:
+                self.log_path(row['job_id']).unlink()
+            except FileNotFoundError:
+                pass
+        self.conn.execute('DELETE FROM jobs WHERE finished_at < ?', (cutoff,))
+        return len(rows)
+
+    # -- runner ------------------------------------------------------------
+
+    def _expire_runners(self, now: float):
+        """清理已退出（进程不存在或心跳过期）的 runner，把它们运行中的作业重新排队（调用方持有写锁）"""
+        stale = [row['runner'] for row in self.conn.execute('SELECT runner, pid, heartbeat_at FROM runners')
+                 if row['heartbeat_at'] < now - RUNNER_TIMEOUT or not _pid_alive(row['runner'], row['pid'])]
+        for runner in stale:
+            self.conn.execute(
+                '''UPDATE jobs SET state = CASE WHEN attempts < ? THEN ? ELSE ? END, runner = NULL,
+                       error = CASE WHEN attempts < ? THEN NULL ELSE 'runner exited' END,
+                       finished_at = CASE WHEN attempts < ? THEN NULL ELSE ? END
+                   WHERE runner = ? AND state = ?''',
+                (MAX_ATTEMPTS, JOB_QUEUED, JOB_FAILED, MAX_ATTEMPTS, MAX_ATTEMPTS, now, runner, JOB_RUNNING)
+            )
+            self.conn.execute('DELETE FROM runners WHERE runner = ?', (runner,))
+
+    def needs_runner(self) -> bool:
+        """回收已退出 runner 的作业；有排队的作业而没有存活的 runner 时返回 True"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_runners(time.time())
+            alive = self.conn.execute('SELECT 1 FROM runners LIMIT 1').fetchone()
+            queued = self.conn.execute('SELECT 1 FROM jobs WHERE state = ? LIMIT 1', (JOB_QUEUED,)).fetchone()
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return queued is not None and alive is None
+
+    def register_runner(self, runner: str) -> bool:
+        """登记 runner；已有存活的 runner 时返回 False（每个作业库只运行一个 runner）"""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_runners(now)
+            if self.conn.execute('SELECT 1 FROM runners LIMIT 1').fetchone():
+                self.conn.execute('COMMIT')
+                return False
+            self.conn.execute('INSERT INTO runners (runner, pid, heartbeat_at) VALUES (?, ?, ?)',
+                              (runner, os.getpid(), now))
+            self.conn.execute('COMMIT')
+            return True
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def heartbeat(self, runner: str):
+        self.conn.execute('UPDATE runners SET heartbeat_at = ? WHERE runner = ?', (time.time(), runner))
+
+    def claim(self, runner: str) -> Optional[Dict]:
+        """按提交顺序取一个排队中的作业，没有时返回 None"""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._expire_runners(now)
+            row = self.conn.execute('SELECT job_id FROM jobs WHERE state = ? ORDER BY created_at, job_id LIMIT 1',
+                                    (JOB_QUEUED,)).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute(
+                'UPDATE jobs SET state = ?, runner = ?, attempts = attempts + 1, started_at = ? WHERE job_id = ?',
+                (JOB_RUNNING, runner, now, row['job_id'])
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return self.get(row['job_id'])
+
+    def finish(self, job_id: str, runner: str, exit_code: int, error: Optional[str] = None) -> Optional[Dict]:
+        """记录作业结果；作业已被重新排队（本 runner 被判定退出）时不修改，返回 None"""
+        cursor = self.conn.execute(
+            '''UPDATE jobs SET state = ?, exit_code = ?, error = ?, finished_at = ?
+               WHERE job_id = ? AND runner = ? AND state = ?''',
+            (JOB_FAILED if error else JOB_DONE, exit_code, error, time.time(), job_id, runner, JOB_RUNNING)
+        )
+        return self.get(job_id) if cursor.rowcount == 1 else None
+
+    def retire(self, runner: str) -> bool:
+        """队列已空时注销 runner 并返回 True；与 submit 互斥，注销后提交的作业会启动新的 runner"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self.conn.execute('SELECT 1 FROM jobs WHERE state = ? LIMIT 1', (JOB_QUEUED,)).fetchone():
+                self.conn.execute('COMMIT')
+                return False
+            self.conn.execute('DELETE FROM runners WHERE runner = ?', (runner,))
+            self.conn.execute('COMMIT')
+            return True
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+
+def describe(job: Dict) -> Dict:
+    """作业状态的公开视图（--status、完成标记、回调与服务接口共用）"""
+    return {
+        'job_id': job['job_id'],
+        'state': job['state'],
+        'output': job['output'],
+        'error': job.get('error'),
+        'exit_code': job.get('exit_code'),
+        'attempts': job.get('attempts', 0),
+        'created_at': job.get('created_at'),
+        'started_at': job.get('started_at'),
+        'finished_at': job.get('finished_at'),
+    }
+
+
+def notify(status: Dict, callback: Optional[str] = None, marker: Optional[str] = None, log=None):
+    """作业结束后写入完成标记并调用回调；失败只记录，不影响作业状态"""
+    body = json.dumps(status, ensure_ascii=False, indent=2).encode('utf-8')
+    if marker:
+        from tts_core.outputs import atomic_open
+        try:
+            with atomic_open(marker) as f:
+                f.write(body)
+        except OSError as e:
+            print(f'marker {marker} failed: {e}', file=log or sys.stderr)
+    if callback:
+        import urllib.request
+        request = urllib.request.Request(callback, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json; charset=utf-8'})
+        try:
+            urllib.request.urlopen(request, timeout=CALLBACK_TIMEOUT).close()
+        except Exception as e:
+            print(f'callback {callback} failed: {e}', file=log or sys.stderr)
+
+
+def start_runner(store_path, script, workers: int):
+    """启动脱离当前进程的 runner，输出写入作业库旁的 runner.log"""
+    import subprocess
+
+    store_path = Path(store_path)
+    env = {**os.environ, 'PYTHONIOENCODING': 'utf-8', 'PYTHONUTF8': '1', 'PYTHONUNBUFFERED': '1'}
+    cmd = [sys.executable, str(script), '--run-jobs', '--job-store', str(store_path),
+           '--job-workers', str(workers)]
+    if os.name == 'nt':
+        detach = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {'start_new_session': True}
+    with open(store_path.parent / 'runner.log', 'a', encoding='utf-8') as log:
+        subprocess.Popen(cmd, env=env, cwd=str(Path(script).resolve().parent), stdin=subprocess.DEVNULL,
+                         stdout=log, stderr=subprocess.STDOUT, **detach)
+
+
+def _run_job(store: JobStore, runner: str, job: Dict, script) -> Optional[Dict]:
+    import subprocess
+
+    log_path = store.log_path(job['job_id'])
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, 'PYTHONIOENCODING': 'utf-8', 'PYTHONUTF8': '1'}
+    with open(log_path, 'a', encoding='utf-8') as log:
+        print(f"== {time.strftime('%Y-%m-%d %H:%M:%S')} attempt {job['attempts']} (runner {runner})", file=log,
+              flush=True)
+        try:
+            exit_code = subprocess.run([sys.executable, str(script)] + job['argv'], cwd=job['cwd'], env=env,
+                                       stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT).returncode
+        except OSError as e:
+            print(f'failed to start: {e}', file=log)
+            exit_code = -1
+        if exit_code != 0:
+            error = f'exit code {exit_code}'
+        elif not Path(job['output']).exists():
+            error = 'no output produced'
+        else:
+            error = None
+        finished = store.finish(job['job_id'], runner, exit_code, error)
+        if finished is not None:
+            notify(describe(finished), finished['callback'], finished['marker'], log=log)
+    return finished
+
+
+def run_runner(store_path, script, workers: int = 1):
+    """runner 主循环：并行执行排队的作业，队列清空后退出"""
+    import socket
+
+    runner = f'{socket.gethostname()}-{os.getpid()}'
+    with JobStore(store_path) as store:
+        if not store.register_runner(runner):
+            print(f'another runner is active for {store_path}', flush=True)
+            return
+        print(f'runner {runner} started ({workers} workers)', flush=True)
+
+        stop = threading.Event()
+        busy = [0]
+        lock = threading.Lock()
+
+        def beat():
+            with JobStore(store_path) as conn:
+                while not stop.wait(HEARTBEAT_SECONDS):
+                    try:
+                        conn.heartbeat(runner)
+                    except sqlite3.Error:
+                        # 作业库短暂被锁时下个周期重试，心跳超时足够长可以容忍
+                        continue
+
+        def drain():
+            with JobStore(store_path) as conn:
+                while True:
+                    with lock:
+                        job = conn.claim(runner)
+                        if job is None and busy[0] == 0:
+                            return
+                        if job is not None:
+                            busy[0] += 1
+                    if job is None:
+                        # 其他线程仍在执行，它们结束前可能有新作业提交
+                        time.sleep(POLL_SECONDS)
+                        continue
+                    try:
+                        finished = _run_job(conn, runner, job, script)
+                        state = finished['state'] if finished else 'requeued'
+                        print(f"{job['job_id']} {state}", flush=True)
+                    finally:
+                        with lock:
+                            busy[0] -= 1
+
+        heartbeat = threading.Thread(target=beat, name='tts-job-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            while True:
+                threads = [threading.Thread(target=drain, name=f'tts-job-{n}') for n in range(max(1, workers))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                if store.retire(runner):
+                    break
+        finally:
+            stop.set()
+        print(f'runner {runner} finished', flush=True)
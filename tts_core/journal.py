@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+批处理任务日志 (Job Journal)
+基于 SQLite 记录每个条目的状态、输出路径与内容哈希，支持断点续跑
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+STATE_RUNNING = 'running'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+
+
+def content_hash(engine: str, text: str, voice: Optional[str] = None, extra_args: Optional[List[str]] = None) -> str:
+    """计算条目内容哈希：引擎 + 文本 + 音色 + 额外参数"""
+    payload = json.dumps([engine, text, voice or '', list(extra_args or [])], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class JobJournal:
+    """批处理任务日志，每次状态变更立即提交，进程中断后可从日志恢复"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            '''CREATE TABLE IF NOT EXISTS items (
+                item_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                output_path TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )'''
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, item_id: str) -> Optional[Dict]:
+        row = self.conn.execute('SELECT * FROM items WHERE item_id = ?', (item_id,)).fetchone()
+        return dict(row) if row else None
+
+    def is_done(self, item_id: str, item_hash: str, exists: Optional[Callable[[str], bool]] = None,
+                output_path: Optional[str] = None) -> bool:
+        """条目已完成、内容未变化且输出仍存在时返回 True
+
+        exists 用于自定义输出存在性检查（如打包输出），默认检查文件是否存在；
+        给出 output_path 时记录的输出还须与之相同（命名模板或输出目录改变后重新生成）
+        """
+        row = self.get(item_id)
+        if not row or row['state'] != STATE_DONE or row['content_hash'] != item_hash:
+            return False
+        if not row['output_path'] or (output_path is not None and row['output_path'] != output_path):
+            return False
+        output_path = row['output_path']
+        return exists(output_path) if exists else Path(output_path).exists()
+
+    def mark_running(self, item_id: str, item_hash: str, output_path: str):
+        self.conn.execute(
+            '''INSERT INTO items (item_id, state, content_hash, output_path, attempts, error, updated_at)
+               VALUES (?, ?, ?, ?, 1, NULL, ?)
+               ON CONFLICT(item_id) DO UPDATE SET
+                   state = excluded.state,
+                   content_hash = excluded.content_hash,
+                   output_path = excluded.output_path,
+                   attempts = items.attempts + 1,
+                   error = NULL,
+                   updated_at = excluded.updated_at''',
+            (item_id, STATE_RUNNING, item_hash, output_path, time.time())
+        )
+        self.conn.commit()
+
+    def mark_done(self, item_id: str):
+        self._set_state(item_id, STATE_DONE, None)
+
+    def mark_failed(self, item_id: str, error: str = ''):
+        self._set_state(item_id, STATE_FAILED, error)
+
+    def _set_state(self, item_id: str, state: str, error: Optional[str]):
+        self.conn.execute(
+            'UPDATE items SET state = ?, error = ?, updated_at = ? WHERE item_id = ?',
+            (state, error, time.time(), item_id)
+        )
+        self.conn.commit()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+语言/文字检测
+单次线性扫描文本，统计汉字与拉丁字母数量，并按连续片段返回语言区间
+
+扫描只产生 (起, 止, 语言) 区间，不复制文本；调用方按需切片。
+数字、标点与空白不决定语言，归入相邻片段。
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+LANG_ZH = 'zh'
+LANG_EN = 'en'
+
+# 连续汉字或连续拉丁字母为一段；lastgroup 即该段语言
+_RUN = re.compile(r'(?P<zh>[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)|(?P<en>[A-Za-z]+)')
+
+
+class LanguageSpan(NamedTuple):
+    start: int
+    end: int
+    lang: str
+
+
+def char_language(ch: str) -> Optional[str]:
+    """单个字符的语言；数字、标点等中性字符返回 None"""
+    if '\u4e00' <= ch <= '\u9fff' or '\u3400' <= ch <= '\u4dbf' or '\uf900' <= ch <= '\ufaff':
+        return LANG_ZH
+    if ('a' <= ch <= 'z') or ('A' <= ch <= 'Z'):
+        return LANG_EN
+    return None
+
+
+def script_counts(text: str) -> Tuple[int, int]:
+    """返回 (汉字数, 拉丁字母数)，只扫描一遍且不构建匹配列表"""
+    han = latin = 0
+    for match in _RUN.finditer(text):
+        if match.lastgroup == LANG_ZH:
+            han += match.end() - match.start()
+        else:
+            latin += match.end() - match.start()
+    return han, latin
+
+
+def detect_language(text: str) -> str:
+    """整段文本的主语言：汉字多于拉丁字母时为中文"""
+    han, latin = script_counts(text)
+    return LANG_ZH if han > latin else LANG_EN
+
+
+def _split_point(pending: List[Tuple[int, str, int]], left: str, right: str, end: int) -> int:
+    """两个不同语言的长片段之间，在短片段的间隙中选择分界：使与所并入一侧语言相同的字数最多
+
+    pending 为其间的短片段 (起, 语言, 长度)，end 为右侧长片段的起点；得分相同时取最靠前的分界。
+    """
+    score = sum(run for _, lang, run in pending if lang == right)
+    best, best_score = (pending[0][0] if pending else end), score
+    for index, (_, lang, run) in enumerate(pending):
+        score += (run if lang == left else 0) - (run if lang == right else 0)
+        if score > best_score:
+            best = pending[index + 1][0] if index + 1 < len(pending) else end
+            best_score = score
+    return best
+
+
+def iter_spans(text: str, default: str = LANG_ZH, min_chars: int = 1) -> Iterator[LanguageSpan]:
+    """按语言切分文本，依次产出覆盖全文的区间
+
+    不短于 min_chars 的字母/汉字片段决定分段；更短的片段（如 "A股" 中的单个字母）不单独成段，
+    并入两侧语言相同的一段（两侧语言不同时按字数选择分界，见 _split_point）。
+    中性字符并入前一段（开头的中性字符并入第一段）。
+    全文没有足够长的片段时按字数多数决定语言，字数相同或没有任何汉字/字母时为 default。
+    """
+    length = len(text)
+    if not length:
+        return
+
+    current_lang = None
+    current_start = 0
+    # 当前段之后、下一个长片段之前的短片段 (起, 语言, 长度)
+    pending: List[Tuple[int, str, int]] = []
+    for match in _RUN.finditer(text):
+        lang = match.lastgroup
+        run = match.end() - match.start()
+        if run < min_chars:
+            pending.append((match.start(), lang, run))
+            continue
+        if current_lang is None:
+            # 第一个长片段：此前的短片段与中性字符都并入第一段
+            current_lang = lang
+        elif lang != current_lang:
+            split = _split_point(pending, current_lang, lang, match.start())
+            yield LanguageSpan(current_start, split, current_lang)
+            current_lang = lang
+            current_start = split
+        pending = []
+
+    if current_lang is None:
+        han = sum(run for _, lang, run in pending if lang == LANG_ZH)
+        latin = sum(run for _, lang, run in pending if lang == LANG_EN)
+        current_lang = default if han == latin else (LANG_ZH if han > latin else LANG_EN)
+    yield LanguageSpan(current_start, length, current_lang)
+
+
+def language_spans(text: str, default: str = LANG_ZH, min_chars: int = 1) -> List[LanguageSpan]:
+    return list(iter_spans(text, default, min_chars))
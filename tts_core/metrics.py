@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标 (Prometheus 文本格式)
+计数器、仪表与直方图，服务模式通过 GET /metrics 暴露，命令行运行可用 --metrics-out 导出
+
+引擎运行在子进程中：主入口通过环境变量 TTS_METRICS_FILE 指定一个临时文件，
+引擎用 emit() 追加 JSON 行（如 HTTP 往返耗时、Qwen3 推理耗时），引擎退出后由主入口合并。
+"""
+
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+METRICS_ENV = 'TTS_METRICS_FILE'
+
+_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+_RTF_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 4, 8)
+
+# 名称 -> (类型, 说明, 直方图分桶)
+METRICS = {
+    'tts_requests_total': ('counter', 'Engine invocations by engine and result', None),
+    'tts_errors_total': ('counter', 'Failed engine invocations and post-processing errors', None),
+    'tts_cache_hits_total': ('counter', 'Cache hits by cache (textnorm, journal, dedup)', None),
+    'tts_cache_misses_total': ('counter', 'Cache misses by cache', None),
+    'tts_audio_seconds_total': ('counter', 'Seconds of audio produced by engine and voice', None),
+    'tts_chars_total': ('counter', 'Characters synthesized by engine', None),
+    'tts_queue_depth': ('gauge', 'Queued service jobs by priority class', None),
+    'tts_prefetch_dropped_total': ('counter', 'Session hints dropped without being requested', None),
+    'tts_synthesis_seconds': ('histogram', 'Wall time of one engine invocation', _SECONDS_BUCKETS),
+    'tts_realtime_factor': ('histogram', 'Synthesis wall time divided by audio duration', _RTF_BUCKETS),
+    'tts_http_request_seconds': ('histogram', 'HTTP round trip to online TTS APIs (Edge/OpenAI)', _SECONDS_BUCKETS),
+    'tts_inference_seconds': ('histogram', 'Qwen3-TTS model inference time', _SECONDS_BUCKETS),
+    'tts_model_load_seconds': ('histogram', 'Qwen3-TTS model load time per model process start', _SECONDS_BUCKETS),
+}
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _format_labels(key, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Registry:
+    """线程安全的指标集合"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[tuple, float]] = {name: {} for name in METRICS}
+        # 直方图: 名称 -> 标签 -> [各分桶计数..., 总和, 次数]
+        self._histograms: Dict[str, Dict[tuple, List[float]]] = {}
+        self._collectors: List[Callable[['Registry'], None]] = [collect_textnorm]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[name][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = METRICS[name][2]
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.setdefault(key, [0] * (len(buckets) + 2))
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def total(self, name: str) -> float:
+        """所有标签合计：计数器/仪表为数值之和，直方图为观测值之和"""
+        with self._lock:
+            if METRICS[name][0] == 'histogram':
+                return sum(counts[-2] for counts in self._histograms.get(name, {}).values())
+            return sum(self._values[name].values())
+
+    def add_collector(self, collector: Callable[['Registry'], None]):
+        """注册在导出前调用的回调，用于采集队列深度等瞬时值"""
+        self._collectors.append(collector)
+
+    def merge_file(self, path):
+        """合并引擎子进程通过 emit() 写入的指标"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+                name, value = record['name'], float(record['value'])
+                labels = record.get('labels') or {}
+            except (ValueError, KeyError, TypeError):
+                continue
+            if name not in METRICS:
+                continue
+            if METRICS[name][0] == 'histogram':
+                self.observe(name, value, **labels)
+            elif METRICS[name][0] == 'gauge':
+                self.set(name, value, **labels)
+            else:
+                self.inc(name, value, **labels)
+
+    def render(self) -> str:
+        """导出 Prometheus 文本格式"""
+        for collector in self._collectors:
+            collector(self)
+
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in METRICS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'histogram':
+                    for key, counts in sorted(self._histograms.get(name, {}).items()):
+                        # observe() 已按"小于等于上界"累计，各分桶计数即为累积值
+                        for bound, count in zip(buckets, counts):
+                            lines.append(f'{name}_bucket{_format_labels(key, ("le", _format_value(bound)))} {count}')
+                        lines.append(f'{name}_bucket{_format_labels(key, ("le", "+Inf"))} {counts[-1]}')
+                        lines.append(f'{name}_sum{_format_labels(key)} {_format_value(counts[-2])}')
+                        lines.append(f'{name}_count{_format_labels(key)} {counts[-1]}')
+                else:
+                    for key, value in sorted(self._values[name].items()):
+                        lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        from tts_core.outputs import atomic_open
+        with atomic_open(path) as f:
+            f.write(self.render().encode('utf-8'))
+
+
+def collect_textnorm(registry: Registry):
+    """采集文本规范化缓存命中情况；本进程未用到规范化时跳过"""
+    import sys
+    textnorm = sys.modules.get('tts_core.textnorm')
+    if textnorm is None:
+        return
+    info = textnorm.normalize_text.cache_info()
+    registry.set('tts_cache_hits_total', info.hits, cache='textnorm_memory')
+    registry.set('tts_cache_misses_total', info.misses, cache='textnorm_memory')
+    registry.set('tts_cache_hits_total', textnorm.DISK_CACHE_STATS['hits'], cache='textnorm_disk')
+    registry.set('tts_cache_misses_total', textnorm.DISK_CACHE_STATS['misses'], cache='textnorm_disk')
+
+
+def emit(name: str, value: float, **labels):
+    """引擎子进程内记录一条指标；未设置 TTS_METRICS_FILE 时不做任何事"""
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return
+    line = json.dumps({'name': name, 'value': value, 'labels': labels}, ensure_ascii=False) + '\n'
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+    except OSError:
+        pass
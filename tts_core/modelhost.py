@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+常驻模型进程
+Qwen3 模型连同 torch 每次加载需要数秒到数十秒、占用数 GB 内存。模型进程加载一次后常驻，
+经本机 TCP 连接逐个处理作业；同一模型目录只运行一个模型进程，所有引擎进程（包括进程池中的多个 worker）
+共用同一份权重，不会各自加载一份。
+
+模型进程空闲 idle_unload 秒后退出（未配置时只有进程池 worker 启动的模型进程会常驻，见 idle_unload_for），释放全部内存（torch 的缓存分配器不会把内存还给系统，退出是唯一可靠的卸载方式），
+下次调用时重新启动；处理完一个作业后当前内存超过 max_rss_mb 时同样退出，由下一次调用重新启动。
+按当前常驻内存而不是峰值判断：峰值只增不减，加载模型时的瞬时峰值会让每个作业之后都重新加载。
+
+状态文件记录端口与令牌（仅本用户可读），协议为 JSON 行：客户端发送 {"token": ..., "job": {...}}，
+模型进程把作业期间的输出以 {"out": 文本} 转发，结束时发送 {"code": 退出码, "rss_mb": 当前内存}。
+两端都只依赖标准库，模型进程运行在引擎自己的虚拟环境中。
+"""
+
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from tts_core.enginepool import POOL_ENV, current_rss_mb
+
+# 未配置 idle_unload 时，进程池 worker（主入口的批处理、长文本、服务等）启动的模型进程空闲多少秒后退出
+DEFAULT_IDLE_UNLOAD = 300.0
+# 模型进程启动后等待第一个作业的最短时间 (秒)；idle_unload 为 0 时也不会在第一个作业到达前退出
+START_GRACE = 60.0
+# 客户端启动模型进程后等待其发布状态文件的时间 (秒)
+START_TIMEOUT = 120.0
+
+
+def idle_unload_for(configured: Optional[float]) -> float:
+    """实际使用的 idle_unload：配置了就按配置；未配置时只在进程池 worker 中常驻，
+    单独的命令行调用处理完作业即退出，不在后台留下占用内存的模型进程"""
+    if configured is not None:
+        return configured
+    return DEFAULT_IDLE_UNLOAD if os.environ.get(POOL_ENV) == '1' else 0.0
+
+
+def read_state(state_file) -> Optional[dict]:
+    try:
+        state = json.loads(Path(state_file).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        # 不存在或正在写入
+        return None
+    return state if isinstance(state, dict) and 'port' in state and 'token' in state else None
+
+
+def _connect(state: Optional[dict], timeout: float = 2.0) -> Optional[socket.socket]:
+    if not state:
+        return None
+    try:
+        conn = socket.create_connection(('127.0.0.1', state['port']), timeout=timeout)
+    except OSError:
+        return None
+    conn.settimeout(None)
+    return conn
+
+
+def _wait_for_host(state_file, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = read_state(state_file)
+        conn = _connect(state)
+        if conn is not None:
+            return conn, state
+        time.sleep(0.2)
+    return None, None
+
+
+def _exchange(conn: socket.socket, token: str, job: dict, out):
+    """发送作业并转发输出，返回 (退出码, 是否已开始执行)；连接意外断开时退出码为 None"""
+    started = False
+    with conn, conn.makefile('r', encoding='utf-8') as replies:
+        try:
+            conn.sendall((json.dumps({'token': token, 'job': job}, ensure_ascii=False) + '\n').encode('utf-8'))
+            for line in replies:
+                message = json.loads(line)
+                if 'out' in message:
+                    started = True
+                    out.write(message['out'])
+                    out.flush()
+                elif 'code' in message:
+                    return int(message['code']), True
+        except (OSError, ValueError):
+            pass
+    return None, started
+
+
+def call(state_file, job: dict, spawn: Callable[[], None], out=None, start_timeout: float = START_TIMEOUT) -> int:
+    """把作业交给模型进程执行，返回退出码；模型进程未运行时调用 spawn() 启动
+
+    模型进程在作业开始前退出（空闲卸载与新作业同时发生、被强制结束等）时重新启动并重试一次。
+    """
+    out = out or sys.stdout
+    for _ in range(2):
+        state = read_state(state_file)
+        conn = _connect(state)
+        if conn is None:
+            spawn()
+            conn, state = _wait_for_host(state_file, start_timeout)
+            if conn is None:
+                return 1
+        code, started = _exchange(conn, state['token'], job, out)
+        if code is not None:
+            return code
+        if started:
+            break
+    return 1
+
+
+class _Forward:
+    """作业期间替换 sys.stdout / sys.stderr，把输出转发给客户端；客户端断开后输出直接丢弃"""
+
+    encoding = 'utf-8'
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.lock = threading.Lock()
+        self.broken = False
+
+    def send(self, message: dict):
+        with self.lock:
+            if self.broken:
+                return
+            try:
+                self.conn.sendall((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+            except OSError:
+                self.broken = True
+
+    def write(self, text: str) -> int:
+        if text:
+            self.send({'out': text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+def _claim(state_file: Path, state: dict) -> bool:
+    """以独占方式发布状态文件；已有可连接的模型进程时返回 False"""
+    for _ in range(2):
+        try:
+            fd = os.open(str(state_file), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            conn = _connect(read_state(state_file))
+            if conn is not None:
+                conn.close()
+                return False
+            # 上一个模型进程被强制结束，留下了状态文件
+            try:
+                state_file.unlink()
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        return True
+    return False
+
+
+def _release(state_file: Path, token: str):
+    state = read_state(state_file)
+    if state and state['token'] == token:
+        try:
+            state_file.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def serve(state_file, handler: Callable[[dict], int], idle_unload: float, max_rss_mb: float = 0):
+    """模型进程主循环：逐个执行作业，空闲超时或内存超限后退出"""
+    state_file = Path(state_file)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    token = secrets.token_hex(16)
+    if not _claim(state_file, {'pid': os.getpid(), 'port': server.getsockname()[1], 'token': token}):
+        server.close()
+        return
+
+    stdout, stderr = sys.stdout, sys.stderr
+    timeout = max(idle_unload, START_GRACE)
+    try:
+        while True:
+            server.settimeout(timeout)
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                print(f'idle for {timeout:.0f}s, unloading', flush=True)
+                break
+            with conn:
+                conn.settimeout(None)
+                try:
+                    request = json.loads(conn.makefile('r', encoding='utf-8').readline() or 'null')
+                except (OSError, ValueError):
+                    request = None
+                if not isinstance(request, dict) or request.get('token') != token:
+                    # 状态检查的空连接或令牌不符
+                    continue
+
+                job = request.get('job') or {}
+                forward = _Forward(conn)
+                sys.stdout = sys.stderr = forward
+                try:
+                    code = handler(job)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except Exception:
+                    import traceback
+                    traceback.print_exc()
+                    code = 1
+                finally:
+                    sys.stdout, sys.stderr = stdout, stderr
+                rss = current_rss_mb()
+                forward.send({'code': code, 'rss_mb': round(rss, 1)})
+
+            if idle_unload <= 0:
+                break
+            timeout = idle_unload
+            if max_rss_mb and rss > max_rss_mb:
+                print(f'RSS {rss:.0f} MB exceeds {max_rss_mb} MB, recycling', flush=True)
+                break
+    finally:
+        # 先撤下状态文件再关闭监听，之后到达的调用会启动新的模型进程
+        _release(state_file, token)
+        server.close()
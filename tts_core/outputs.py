@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+输出文件命名与原子写入
+并发运行时保证不同请求不会互相覆盖输出文件
+
+命名模板占位符:
+  {timestamp} 日期时间 (YYYYMMDD_HHMMSS)   {date} 日期 (YYYYMMDD)
+  {prefix}    文本前6个字                  {hash} 内容哈希 (12位，见 text_hash)
+  {id}        批处理条目 ID                 {engine} 引擎名   {voice} 音色
+模板中可以包含 "/" 表示子目录。
+"""
+
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+PRESET_TEMPLATES = {
+    'timestamp': '{timestamp}_{prefix}',
+    'hash': '{prefix}_{hash}',
+}
+DEFAULT_TEMPLATE = PRESET_TEMPLATES['timestamp']
+
+# 含以下占位符的模板每次生成的名字都不同，需要原子占位防止同名冲突
+_TIME_FIELDS = ('{timestamp}', '{date}')
+# 含以下占位符且不含时间字段的模板，同名即同一内容
+_IDENTITY_FIELDS = ('{hash}', '{id}')
+
+_INVALID_CHARS = '<>:"/\\|?*'
+
+
+def sanitize_filename_part(value: str, default: str = 'tts') -> str:
+    """清理文件名片段：空白转下划线，去除非法字符"""
+    if not value:
+        return default
+    value = value.strip().replace("\n", " ").replace("\r", " ")
+    value = "_".join(value.split())
+    value = "".join(c for c in value if c not in _INVALID_CHARS)
+    return value.strip(" ._") or default
+
+
+def text_hash(text: str, engine: str = '', voice: str = '', extra_args: Optional[List[str]] = None,
+              length: int = 12) -> str:
+    """内容哈希：与任务日志相同（引擎 + 文本 + 音色 + 额外参数与输出设置），任一项不同结果即不同"""
+    from tts_core.journal import content_hash
+    return content_hash(engine or '', text, voice, extra_args)[:length]
+
+
+def resolve_template(template: Optional[str]) -> str:
+    if not template:
+        return DEFAULT_TEMPLATE
+    return PRESET_TEMPLATES.get(template, template)
+
+
+def is_deterministic(template: Optional[str]) -> bool:
+    """模板由内容哈希或条目 ID 决定且不含时间字段时，同一内容总是得到同一文件名"""
+    template = resolve_template(template)
+    return (any(field in template for field in _IDENTITY_FIELDS)
+            and not any(field in template for field in _TIME_FIELDS))
+
+
+def render_name(template: Optional[str], text: str, extension: str, engine: Optional[str] = None,
+                voice: Optional[str] = None, item_id: Optional[str] = None,
+                extra_args: Optional[List[str]] = None) -> str:
+    """按模板生成相对文件名（可含子目录）
+
+    extra_args 为引擎额外参数与输出设置（格式、采样率、响度、裁剪等），与扩展名一起计入 {hash}
+    """
+    template = resolve_template(template)
+    now = time.localtime()
+    fields = {
+        'timestamp': time.strftime("%Y%m%d_%H%M%S", now),
+        'date': time.strftime("%Y%m%d", now),
+        'prefix': sanitize_filename_part(text[:6] if len(text) >= 6 else text),
+        'hash': text_hash(text, engine or '', voice or '', list(extra_args or []) + [f'ext={extension}']),
+        'id': sanitize_filename_part(item_id or ''),
+        'engine': sanitize_filename_part(engine or ''),
+        'voice': sanitize_filename_part(voice or ''),
+    }
+    try:
+        name = template.format(**fields)
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f'invalid naming template {template!r}: {e}')
+
+    # 字段值中的 "/" 已被清理，此处逐级清理模板本身，避免 .. 等路径穿越
+    parts = [sanitize_filename_part(part) for part in name.replace('\\', '/').split('/') if part.strip()]
+    return '/'.join(parts or ['tts']) + f'.{extension}'
+
+
+def reserve_path(path) -> Path:
+    """原子地占用输出路径；已被占用时依次尝试 name_1.ext、name_2.ext ..."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for n in itertools.count():
+        candidate = path if n == 0 else path.with_name(f"{path.stem}_{n}{path.suffix}")
+        try:
+            fd = os.open(str(candidate), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return candidate
+
+
+def new_output_path(output_dir, text: str, extension: str, template: Optional[str] = None,
+                    engine: Optional[str] = None, voice: Optional[str] = None,
+                    item_id: Optional[str] = None, extra_args: Optional[List[str]] = None) -> Path:
+    """生成输出路径；确定性模板同名即同内容，直接复用，其余模板原子占位
+
+    {id} 只在给出 item_id 时才确定，否则所有请求都会得到同一个名字，仍需占位
+    """
+    path = Path(output_dir) / render_name(template, text, extension, engine, voice, item_id, extra_args)
+    if is_deterministic(template) and ('{hash}' in resolve_template(template) or item_id):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+    return reserve_path(path)
+
+
+def temp_path_for(path) -> Path:
+    """与目标同目录的临时文件路径，进程与线程间不会冲突"""
+    path = Path(path)
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+
+
+@contextmanager
+def atomic_open(path, mode: str = 'wb'):
+    """写入临时文件，成功后原子替换目标文件；失败时目标文件保持不变"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temp_path_for(path)
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
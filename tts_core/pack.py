@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+打包输出 (Audio Pack)
+将大量短音频追加写入单个数据文件，并用偏移表索引，避免在 output/ 下产生海量小文件
+
+文件布局:
+  <name>.pack      头部魔数 + 依次追加的音频字节
+  <name>.pack.idx  每行一个 JSON 索引项: {"id", "offset", "length", "format", "sha256"}
+
+同一 ID 多次写入时以最后一条索引为准；多个 ID 可以指向同一段数据（内容相同的条目只存一份）。
+读取时通过 mmap 按 ID 零拷贝随机访问。
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from tts_core.outputs import sanitize_filename_part
+
+PACK_MAGIC = b'TTSPACK1'
+
+
+def _index_path(pack_path: Path) -> Path:
+    return pack_path.with_name(pack_path.name + '.idx')
+
+
+def _load_index(pack_path: Path) -> Dict[str, dict]:
+    index = {}
+    index_path = _index_path(pack_path)
+    if not index_path.exists():
+        return index
+    with open(index_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 进程中断时最后一行可能不完整，直接忽略
+                continue
+            index[entry['id']] = entry
+    return index
+
+
+class PackWriter:
+    """追加写入器；数据先落盘再写索引，中断后最多留下无索引的孤立字节"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.index = _load_index(self.path)
+        self.data_file = open(self.path, 'ab')
+        if self.data_file.tell() == 0:
+            self.data_file.write(PACK_MAGIC)
+        self.index_file = open(_index_path(self.path), 'a', encoding='utf-8')
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.index
+
+    def add(self, item_id: str, data: bytes, fmt: str = '') -> dict:
+        """追加一条音频，返回其索引项"""
+        offset = self.data_file.tell()
+        self.data_file.write(data)
+        self.data_file.flush()
+        os.fsync(self.data_file.fileno())
+
+        entry = {
+            'id': item_id,
+            'offset': offset,
+            'length': len(data),
+            'format': fmt,
+            'sha256': hashlib.sha256(data).hexdigest(),
+        }
+        self.index_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.index_file.flush()
+        self.index[item_id] = entry
+        return entry
+
+    def add_alias(self, item_id: str, source_id: str) -> dict:
+        """让 item_id 指向 source_id 的音频数据，不重复写入字节"""
+        entry = dict(self.index[source_id], id=item_id)
+        self.index_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.index_file.flush()
+        self.index[item_id] = entry
+        return entry
+
+    def add_file(self, item_id: str, path, remove: bool = True) -> dict:
+        """将已生成的音频文件写入包中，默认随后删除该文件"""
+        path = Path(path)
+        entry = self.add(item_id, path.read_bytes(), path.suffix.lstrip('.').lower())
+        if remove:
+            path.unlink()
+        return entry
+
+    def close(self):
+        self.data_file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PackReader:
+    """只读访问器；通过 mmap 按 ID 返回 memoryview，不复制音频数据"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.index = _load_index(self.path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(PACK_MAGIC)] != PACK_MAGIC:
+            self.close()
+            raise ValueError(f'not an audio pack: {self.path}')
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def ids(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def entry(self, item_id: str) -> Optional[dict]:
+        return self.index.get(item_id)
+
+    def get(self, item_id: str) -> memoryview:
+        entry = self.index[item_id]
+        start = entry['offset']
+        return memoryview(self._mmap)[start:start + entry['length']]
+
+    def extract(self, item_id: str, output_path) -> str:
+        """把单条音频导出为独立文件"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(self.get(item_id))
+        return str(output_path)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audio Pack - 查看与导出打包的音频')
+    parser.add_argument('pack', help='.pack 文件路径')
+    parser.add_argument('ids', nargs='*', help='要导出的条目 ID（默认全部）')
+    parser.add_argument('--list', action='store_true', help='列出包内条目')
+    parser.add_argument('--extract', metavar='DIR', help='导出到目录')
+    args = parser.parse_args()
+
+    with PackReader(args.pack) as reader:
+        if args.list or not args.extract:
+            for item_id in reader.ids():
+                entry = reader.entry(item_id)
+                print(f"{item_id}\t{entry['format']}\t{entry['length']}")
+            return
+
+        for item_id in args.ids or list(reader.ids()):
+            if item_id not in reader:
+                print(f"ERROR: 找不到条目: {item_id}", file=sys.stderr)
+                continue
+            # ID 与格式来自包内索引，清理后再作为文件名，不能借 ../ 或 / 写到导出目录之外
+            ext = sanitize_filename_part(reader.entry(item_id)['format'] or '', 'bin')
+            name = sanitize_filename_part(item_id, 'item')
+            print(reader.extract(item_id, Path(args.extract) / f"{name}.{ext}"))
+
+
+if __name__ == '__main__':
+    main()
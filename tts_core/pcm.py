@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+共享内存 PCM 交接
+引擎进程把 float32 原始采样写入内存映射文件，旁边放一个 JSON 描述文件（采样率、声道、帧数），
+主入口直接映射同一块内存读取，拼接、编码都在这块缓冲区上完成，不经过 WAV 编码与解码
+
+Linux 上文件放在 /dev/shm（tmpfs，不落盘），其他系统退回临时目录，由页缓存承担。
+描述文件在采样写完之后才原子写入，读取方看到描述文件即可认为数据完整。
+
+交接文件名带有主入口的进程号。主入口崩溃或被中断 (Ctrl+C) 时来不及删除的文件占用内存，
+每个进程第一次分配交接路径时清理一次：进程号对应的进程已不存在、或超过 STALE_SECONDS 的文件视为遗留。
+"""
+
+import json
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+PCM_FORMAT = 'pcm'
+_DTYPE = np.float32
+
+_PREFIX = '.tts-pcm-'
+# 超过该时长 (秒) 的交接文件即使创建进程仍在运行也视为遗留（防止进程号被复用）
+STALE_SECONDS = 24 * 3600
+_swept = False
+
+
+def shared_dir() -> Path:
+    """PCM 交接目录：优先使用 /dev/shm"""
+    shm = Path('/dev/shm')
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+    return Path(tempfile.gettempdir())
+
+
+def new_pcm_path(name: str = 'tts') -> Path:
+    """交接目录中一个新的 .pcm 路径（不创建文件，由引擎写入）"""
+    global _swept
+    if not _swept:
+        _swept = True
+        sweep_stale()
+    return shared_dir() / f'{_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}-{name}.{PCM_FORMAT}'
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        # Windows 上 os.kill 会结束目标进程，不能用来探测，只按时长清理
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def sweep_stale(max_age: float = STALE_SECONDS) -> int:
+    """删除遗留的交接文件（数据、描述文件与写了一半的描述文件），返回删除的文件数"""
+    removed = 0
+    cutoff = time.time() - max_age
+    for path in shared_dir().glob(f'{_PREFIX}*'):
+        try:
+            pid = int(path.name[len(_PREFIX):].split('-', 1)[0])
+            if path.stat().st_mtime >= cutoff and _pid_alive(pid):
+                continue
+            path.unlink()
+            removed += 1
+        except (OSError, ValueError):
+            continue
+    return removed
+
+
+def descriptor_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + '.json')
+
+
+def is_pcm(path) -> bool:
+    return Path(path).suffix.lower() == f'.{PCM_FORMAT}'
+
+
+def write_pcm(path, samples, sample_rate: int) -> dict:
+    """写入采样与描述文件，返回描述信息"""
+    path = Path(path)
+    samples = np.ascontiguousarray(samples, dtype=_DTYPE)
+    channels = 1 if samples.ndim == 1 else samples.shape[1]
+    if len(samples):
+        buffer = np.memmap(str(path), dtype=_DTYPE, mode='w+', shape=samples.shape)
+        buffer[:] = samples
+        buffer.flush()
+        del buffer
+    else:
+        path.write_bytes(b'')
+
+    descriptor = {'sample_rate': int(sample_rate), 'channels': channels, 'frames': len(samples),
+                  'dtype': np.dtype(_DTYPE).str}
+    target = descriptor_path(path)
+    tmp = target.with_name(target.name + '.tmp')
+    tmp.write_text(json.dumps(descriptor), encoding='utf-8')
+    os.replace(tmp, target)
+    return descriptor
+
+
+def open_pcm(path) -> Tuple[np.ndarray, int]:
+    """只读映射 PCM 数据，返回 (采样, 采样率)；采样与文件共享内存，不复制"""
+    path = Path(path)
+    descriptor = json.loads(descriptor_path(path).read_text(encoding='utf-8'))
+    frames, channels = descriptor['frames'], descriptor['channels']
+    shape = (frames,) if channels == 1 else (frames, channels)
+    if frames == 0:
+        return np.zeros(shape, dtype=_DTYPE), descriptor['sample_rate']
+    samples = np.memmap(str(path), dtype=np.dtype(descriptor['dtype']), mode='r', shape=shape)
+    return samples, descriptor['sample_rate']
+
+
+def pcm_duration(path) -> float:
+    descriptor = json.loads(descriptor_path(path).read_text(encoding='utf-8'))
+    return descriptor['frames'] / descriptor['sample_rate'] if descriptor['sample_rate'] else 0.0
+
+
+def remove_pcm(path):
+    """删除 PCM 数据与描述文件；已映射的缓冲区在释放前仍然有效"""
+    for target in (Path(path), descriptor_path(path)):
+        try:
+            target.unlink()
+        except FileNotFoundError:
+            pass
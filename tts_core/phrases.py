@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+短语库 (Phrase Bank)
+模板化请求（如 "您的订单 {N} 已发货"）的固定片段按 引擎 + 音色 + 额外参数 + 文本 合成一次后保存，
+请求时只合成变量槽位，再与库中的固定片段拼接，片段之间默认做短交叉淡化
+
+库中片段已裁掉首尾静音，保存为 WAV，文件名即内容哈希；多个进程同时补齐同一片段时以原子替换为准，
+不需要加锁。模板语法与 str.format 相同：{名称} 为槽位，{{ 与 }} 表示字面的花括号。
+"""
+
+import string
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from tts_core.audio import DEFAULT_SILENCE_DB, read_audio, remove_audio, trim_silence, write_audio
+from tts_core.journal import content_hash
+
+DEFAULT_BANK_DIR = Path(__file__).resolve().parent.parent / 'cache' / 'phrases'
+
+# 未设置 --crossfade-ms / --gap-ms 时拼接片段的交叉淡化时长 (毫秒)
+DEFAULT_CROSSFADE_MS = 30
+
+
+class TemplatePart(NamedTuple):
+    text: str
+    slot: Optional[str] = None  # 槽位名；固定片段为 None
+
+
+def parse_template(template: str) -> List[TemplatePart]:
+    """把模板拆成固定片段与槽位；花括号不配对或槽位名不合法时抛出 ValueError"""
+    parts = []
+    literal_text = ''
+    # 转义的花括号会把相邻的字面文本拆成多段，合并到下一个槽位之前
+    for literal, field, _, _ in string.Formatter().parse(template):
+        literal_text += literal
+        if field is None:
+            continue
+        if not field.isidentifier():
+            raise ValueError(f'invalid slot name in template: {{{field}}}')
+        if literal_text.strip():
+            parts.append(TemplatePart(literal_text.strip()))
+        literal_text = ''
+        parts.append(TemplatePart('', field))
+    if literal_text.strip():
+        parts.append(TemplatePart(literal_text.strip()))
+    if not parts:
+        raise ValueError('template is empty')
+    return parts
+
+
+def fill_template(parts: List[TemplatePart], slots: Dict[str, str]) -> List[TemplatePart]:
+    """填入槽位值；值为空的槽位直接省略"""
+    missing = sorted({part.slot for part in parts if part.slot and part.slot not in slots})
+    if missing:
+        raise ValueError(f'missing slot values: {", ".join(missing)}')
+    filled = []
+    for part in parts:
+        text = part.text if part.slot is None else str(slots[part.slot]).strip()
+        if text:
+            filled.append(TemplatePart(text, part.slot))
+    return filled
+
+
+def render_text(parts: List[TemplatePart]) -> str:
+    """完整文本，用于语言检测与输出命名"""
+    return ' '.join(part.text for part in parts)
+
+
+def splice_options(join_options: dict) -> dict:
+    """拼接参数：始终裁剪静音；未设置间隔与交叉淡化时使用默认交叉淡化"""
+    options = dict(join_options)
+    if options.get('trim_db') is None:
+        options['trim_db'] = DEFAULT_SILENCE_DB
+    if not options.get('gap_ms') and not options.get('crossfade_ms'):
+        options['crossfade_ms'] = DEFAULT_CROSSFADE_MS
+    return options
+
+
+class PhraseBank:
+    """固定片段库：目录 <root>/<哈希前两位>/<哈希>.wav"""
+
+    def __init__(self, root=DEFAULT_BANK_DIR, trim_db: float = DEFAULT_SILENCE_DB):
+        self.root = Path(root)
+        self.trim_db = trim_db
+
+    @staticmethod
+    def key(engine: str, text: str, voice: Optional[str] = None, extra_args: Optional[List[str]] = None) -> str:
+        return content_hash(engine, text, voice, extra_args)
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f'{key}.wav'
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path_for(key)
+        return path if path.exists() else None
+
+    def contains(self, path) -> bool:
+        return self.root.resolve() in Path(path).resolve().parents
+
+    def store(self, key: str, source) -> Path:
+        """裁剪引擎输出的静音后写入库中并删除源文件，返回库中路径"""
+        samples, sample_rate = read_audio(str(source))
+        path = self.path_for(key)
+        write_audio(path, trim_silence(samples, sample_rate, self.trim_db), sample_rate, 'wav')
+        del samples
+        remove_audio(source)
+        return path
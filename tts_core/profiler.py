@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+合成性能剖析
+用固定的标准语料多次调用引擎，报告实时率 (RTF = 合成耗时 / 音频时长)、每秒字数，
+以及冷启动（第一次调用）与预热后的延迟，便于比较不同硬件与参数
+
+耗时拆分依赖引擎通过 tts_core.metrics 上报的数据：Qwen3 上报模型加载与纯推理耗时，
+Edge/OpenAI 上报 HTTP 往返耗时，总耗时中其余部分计为进程启动、环境检查与编码等开销。
+"""
+
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from tts_core.metrics import Registry
+
+# 标准语料：(名称, 语言, 文本)。修改会使历史结果不可比，需要新增时请追加新条目
+CORPUS: List[Tuple[str, str, str]] = [
+    ('zh-short', 'zh', '胜利在呼唤，我们出发吧。'),
+    ('zh-medium', 'zh',
+     '清晨的阳光透过窗帘洒进房间，桌上的咖啡还冒着热气。'
+     '她打开笔记本，把昨天没写完的故事接着写下去，窗外偶尔传来几声鸟鸣。'
+     '今天的计划很简单：写完这一章，然后去公园散步。'),
+    ('en-short', 'en', 'The quick brown fox jumps over the lazy dog.'),
+    ('en-medium', 'en',
+     'Speech synthesis quality depends on more than the model. Text normalization, '
+     'sentence splitting and the audio pipeline all shape what listeners hear, '
+     'so we measure the whole path from text to a finished file.'),
+    ('mixed', 'zh', '本周三下午三点，我们在 Room 302 讨论 API 的发布计划。'),
+]
+
+# 引擎上报的"核心"耗时指标，其余部分计为开销
+_CORE_METRICS = ('tts_inference_seconds', 'tts_http_request_seconds')
+
+
+def load_corpus(path) -> List[Tuple[str, str, str]]:
+    """自定义语料：每行一条，非空行按顺序命名为 line-1、line-2 ..."""
+    from tts_core.lang import detect_language
+
+    corpus = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            text = line.strip()
+            if text:
+                corpus.append((f'line-{len(corpus) + 1}', detect_language(text), text))
+    return corpus
+
+
+def _delta(registry: Registry, before: Dict[str, float], names) -> Dict[str, float]:
+    return {name: registry.total(name) - before.get(name, 0.0) for name in names}
+
+
+def _summary(samples: List[dict]) -> dict:
+    """汇总一组调用结果；第一次调用为冷启动，其余为预热后的调用"""
+    ok = [s for s in samples if s['ok']]
+    result = {'calls': len(samples), 'failed': len(samples) - len(ok)}
+    if not ok:
+        return result
+    warm = ok[1:] if samples[0]['ok'] and len(ok) > 1 else ok
+    wall = sum(s['seconds'] for s in ok)
+    audio = sum(s['audio_seconds'] for s in ok)
+    chars = sum(s['chars'] for s in ok)
+    result.update({
+        'cold_seconds': samples[0]['seconds'] if samples[0]['ok'] else None,
+        'warm_median_seconds': statistics.median(s['seconds'] for s in warm),
+        'rtf': wall / audio if audio > 0 else None,
+        'chars_per_second': chars / wall if wall > 0 else None,
+        'core_seconds': sum(s['core_seconds'] for s in ok),
+        'model_load_seconds': sum(s['model_load_seconds'] for s in ok),
+        'overhead_seconds': wall - sum(s['core_seconds'] + s['model_load_seconds'] for s in ok),
+    })
+    if audio > 0 and result['core_seconds'] > 0:
+        result['core_rtf'] = result['core_seconds'] / audio
+    return result
+
+
+def profile_engine(skill, engine: str, voice: Optional[str] = None, runs: int = 3,
+                   extra_args: Optional[List[str]] = None, corpus=None, normalize: bool = True,
+                   dump_dir=None) -> dict:
+    """对每条语料调用 runs 次引擎并返回报告；dump_dir 不为空时为每次调用保存 cProfile 文件"""
+    corpus = corpus or CORPUS
+    if skill.metrics is None:
+        skill.metrics = Registry()
+    registry = skill.metrics
+    extension = skill.default_format(engine, extra_args)
+    names = ('tts_audio_seconds_total', 'tts_model_load_seconds') + _CORE_METRICS
+
+    calls: Dict[str, List[dict]] = {name: [] for name, _, _ in corpus}
+    # 按调用顺序记录，第一条即整个剖析过程的冷启动调用
+    history: List[dict] = []
+    with tempfile.TemporaryDirectory(prefix='tts-profile-') as work_dir:
+        for run in range(max(1, runs)):
+            for name, lang, text in corpus:
+                if normalize:
+                    from tts_core.textnorm import normalize_cached
+                    text = normalize_cached(text, lang)
+                output = Path(work_dir) / f'{name}-{run}.{extension}'
+                args = ['--text-file', '-', '--output', str(output)]
+                if voice:
+                    args.extend(['--voice', voice])
+                args.extend(extra_args or [])
+                if dump_dir:
+                    skill.profile_dump = Path(dump_dir) / f'{engine}-{name}-{run}.prof'
+
+                before = {metric: registry.total(metric) for metric in names}
+                start = time.perf_counter()
+                try:
+                    ok = skill.run_engine(engine, args, lang=lang, input_text=text)
+                finally:
+                    skill.profile_dump = None
+                seconds = time.perf_counter() - start
+                delta = _delta(registry, before, names)
+                call = {
+                    'run': run,
+                    'ok': bool(ok and output.exists()),
+                    'seconds': seconds,
+                    'chars': len(text),
+                    'audio_seconds': delta['tts_audio_seconds_total'],
+                    'core_seconds': sum(delta[metric] for metric in _CORE_METRICS),
+                    'model_load_seconds': delta['tts_model_load_seconds'],
+                }
+                calls[name].append(call)
+                history.append(call)
+
+    return {
+        'engine': engine,
+        'voice': voice or 'default',
+        'runs': max(1, runs),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'samples': {name: _summary(calls[name]) for name, _, _ in corpus},
+        'total': _summary(history),
+    }
+
+
+def _fmt(value, pattern='{:.2f}') -> str:
+    return pattern.format(value) if value is not None else '-'
+
+
+def print_report(report: dict):
+    print(f"\n📊 Profile: {report['engine']} / {report['voice']}  (runs={report['runs']})")
+    print(f"{'sample':<12} {'cold s':>8} {'warm s':>8} {'RTF':>7} {'chars/s':>8} {'core s':>8} {'load s':>8} {'overhead s':>11}")
+    rows = list(report['samples'].items()) + [('TOTAL', report['total'])]
+    for name, row in rows:
+        if 'warm_median_seconds' not in row:
+            print(f"{name:<12} failed ({row['failed']}/{row['calls']})")
+            continue
+        print(f"{name:<12} {_fmt(row['cold_seconds']):>8} {_fmt(row['warm_median_seconds']):>8} "
+              f"{_fmt(row['rtf'], '{:.3f}'):>7} {_fmt(row['chars_per_second'], '{:.1f}'):>8} "
+              f"{_fmt(row['core_seconds']):>8} {_fmt(row['model_load_seconds']):>8} "
+              f"{_fmt(row['overhead_seconds']):>11}")
+    total = report['total']
+    if total.get('core_rtf') is not None:
+        print(f"core RTF (engine-reported inference / HTTP time only): {total['core_rtf']:.3f}")
+    if total.get('failed'):
+        print(f"⚠️  {total['failed']} of {total['calls']} calls failed")
+
+
+def write_report(report: dict, path):
+    from tts_core.outputs import atomic_open
+    with atomic_open(path) as f:
+        f.write(json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8'))
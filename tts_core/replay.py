@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+引擎录制与回放
+录制模式下引擎照常访问 API / 运行模型，同时把每次请求的响应保存到录制目录；回放模式下直接返回录制的响应，
+不访问网络也不加载模型。主入口 --record / --replay 通过环境变量把模式传给引擎进程，
+配合 benchmarks/golden.py 可以离线验证性能改动没有改变输出音频。
+
+- Edge / OpenAI：按 引擎 + URL + 请求体 的哈希保存 HTTP 状态码、Content-Type 与响应体（不含请求头，API 密钥不会写入录制）
+- Qwen3：按 文本 + 参考音频内容 + 参考文本 + 输出格式 + 采样率 的哈希保存生成的音频；录制时固定随机种子
+
+录制目录结构为 <目录>/<引擎>/<哈希>.json（元数据）与 <哈希>.bin（响应体或音频）。
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+REPLAY_ENV = 'TTS_REPLAY'
+REPLAY_DIR_ENV = 'TTS_REPLAY_DIR'
+RECORD = 'record'
+REPLAY = 'replay'
+
+# 录制 Qwen3 时使用的随机种子，可用 TTS_REPLAY_SEED 修改
+DEFAULT_SEED = 0
+
+
+class ReplayMissing(LookupError):
+    """回放模式下没有对应的录制"""
+
+
+class Recording(NamedTuple):
+    status_code: int
+    content_type: str
+    content: bytes
+
+    # 与 requests.Response 兼容的只读接口，引擎按原来的方式读取响应
+    @property
+    def headers(self) -> dict:
+        return {'content-type': self.content_type}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 8192):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+
+class _NotRaised(Exception):
+    """回放模式下代替 requests 的网络异常类型，不会被抛出"""
+
+
+def mode() -> Optional[str]:
+    value = os.environ.get(REPLAY_ENV, '').strip().lower()
+    return value if value in (RECORD, REPLAY) else None
+
+
+def seed() -> Optional[int]:
+    """录制模式下的随机种子；不录制时为 None，保持模型原有的随机性"""
+    if mode() != RECORD:
+        return None
+    return int(os.environ.get('TTS_REPLAY_SEED') or DEFAULT_SEED)
+
+
+def request_key(engine: str, *parts) -> str:
+    payload = json.dumps([engine, *parts], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _paths(engine: str, key: str):
+    root = Path(os.environ.get(REPLAY_DIR_ENV) or 'recordings') / engine
+    return root / f'{key}.json', root / f'{key}.bin'
+
+
+def load(engine: str, key: str) -> Recording:
+    meta_path, body_path = _paths(engine, key)
+    try:
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        body = body_path.read_bytes()
+    except (OSError, ValueError):
+        raise ReplayMissing(f'no recording for {engine} request {key[:12]} in {meta_path.parent}')
+    return Recording(meta['status_code'], meta.get('content_type', ''), body)
+
+
+def save(engine: str, key: str, status_code: int, content_type: str, content: bytes, request: dict):
+    from tts_core.outputs import atomic_open
+
+    meta_path, body_path = _paths(engine, key)
+    with atomic_open(body_path) as f:
+        f.write(content)
+    meta = {'status_code': status_code, 'content_type': content_type, 'request': request}
+    with atomic_open(meta_path) as f:
+        f.write(json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def request_error():
+    """网络请求异常的基类；回放模式下不导入 requests，离线环境不需要安装它"""
+    if mode() == REPLAY:
+        return _NotRaised
+    import requests
+    return requests.exceptions.RequestException
+
+
+def http_post(engine: str, url: str, payload: dict, headers: dict, **kwargs):
+    """发送 JSON POST 请求；录制模式保存响应，回放模式返回录制的响应，不访问网络"""
+    current = mode()
+    key = request_key(engine, url, payload)
+    if current == REPLAY:
+        return load(engine, key)
+
+    import requests
+    response = requests.post(url, headers=headers, data=json.dumps(payload), **kwargs)
+    if current != RECORD:
+        return response
+    recording = Recording(response.status_code, response.headers.get('content-type', ''), response.content)
+    save(engine, key, recording.status_code, recording.content_type, recording.content,
+         {'url': url, 'payload': payload})
+    return recording
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+合成任务调度
+优先级分级 + 租户加权公平队列 (WFQ) + 截止时间感知，在分块边界抢占
+
+调度单位是"块"：作业每合成完一块都重新排队，因此新到的高优先级作业最多等待当前块完成，
+两小时的有声书不会挡住一秒钟的交互请求。选择下一块的顺序:
+  1. 截止时间临近（剩余时间不超过 urgent_slack 秒）的作业，按截止时间最早优先
+  2. 优先级最高的类别 (interactive > normal > batch > prefetch)，低优先级只使用空闲算力
+  3. 同一类别内选虚拟时间最小的租户（已用字数 / 权重），租户内按截止时间、提交顺序
+
+prefetch 类别用于预取（服务模式的会话提示），被真正请求时用 promote() 提升，不再需要时用 cancel() 丢弃。
+"""
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+PRIORITY_CLASSES = {'interactive': 0, 'normal': 1, 'batch': 2, 'prefetch': 3}
+DEFAULT_PRIORITY = 'normal'
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+def parse_priority(value) -> int:
+    """优先级可写类别名或数字，数字越小越优先"""
+    if value is None or value == '':
+        return PRIORITY_CLASSES[DEFAULT_PRIORITY]
+    if isinstance(value, int):
+        return value
+    value = str(value).strip().lower()
+    if value in PRIORITY_CLASSES:
+        return PRIORITY_CLASSES[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'unknown priority: {value} (expected one of {", ".join(PRIORITY_CLASSES)})')
+
+
+@dataclass
+class Job:
+    """一个合成作业；chunks 为已分好的文本块，results 与其一一对应"""
+    chunks: List[str]
+    tenant: str = 'default'
+    priority: int = PRIORITY_CLASSES[DEFAULT_PRIORITY]
+    deadline: Optional[float] = None  # time.monotonic() 时间点
+    payload: Dict[str, Any] = field(default_factory=dict)
+    job_id: str = ''
+    state: str = JOB_QUEUED
+    next_chunk: int = 0
+    results: List[Any] = field(default_factory=list)
+    error: Optional[str] = None
+    cancelled: bool = False
+    submitted_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    _seq: int = 0
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+
+class FairScheduler:
+    """按块调度合成作业的线程池
+
+    run_chunk(job, index, text) 在工作线程中执行并返回该块的结果；
+    抛出异常时整个作业失败。on_finish(job) 在作业完成或失败后调用。
+    """
+
+    def __init__(self, run_chunk: Callable[[Job, int, str], Any], workers: int = 1,
+                 weights: Optional[Dict[str, float]] = None, urgent_slack: float = 5.0,
+                 on_finish: Optional[Callable[[Job], None]] = None):
+        self.run_chunk = run_chunk
+        self.on_finish = on_finish
+        self.weights = dict(weights or {})
+        self.urgent_slack = urgent_slack
+        self._cond = threading.Condition()
+        self._queued: List[Job] = []
+        self._virtual_time: Dict[tuple, float] = {}
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._worker, name=f'tts-scheduler-{n}', daemon=True)
+                         for n in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def weight(self, tenant: str) -> float:
+        return max(self.weights.get(tenant, 1.0), 1e-6)
+
+    def submit(self, job: Job) -> Job:
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError('scheduler is shutting down')
+            job.job_id = job.job_id or f'job-{next(self._ids)}'
+            job.submitted_at = time.monotonic()
+            job.results = [None] * len(job.chunks)
+            if not job.chunks:
+                self._complete(job)
+                return job
+            self._activate(job)
+            self._enqueue(job)
+            self._cond.notify()
+        return job
+
+    def promote(self, job: Job, priority: int, deadline: Optional[float] = None):
+        """提升未完成作业的优先级与截止时间（只升不降），从下一个分块起生效"""
+        with self._cond:
+            if job.finished or job.cancelled:
+                return
+            if priority < job.priority:
+                # 按新类别重新激活租户的虚拟时间；正在合成的作业在当前块完成后按新类别排队
+                queued = job in self._queued
+                if queued:
+                    self._queued.remove(job)
+                job.priority = priority
+                self._activate(job)
+                if queued:
+                    self._queued.append(job)
+            if deadline is not None and (job.deadline is None or deadline < job.deadline):
+                job.deadline = deadline
+            self._cond.notify()
+
+    def cancel(self, job: Job) -> bool:
+        """取消未完成的作业：排队中的立即结束，正在合成的在当前块完成后结束；返回是否取消"""
+        with self._cond:
+            if job.finished or job.cancelled:
+                return False
+            job.cancelled = True
+            job.error = 'cancelled'
+            queued = job in self._queued
+            if queued:
+                self._queued.remove(job)
+        if queued:
+            self._complete(job)
+        return True
+
+    def queue_depth(self) -> Dict[int, int]:
+        """各优先级类别排队中的作业数"""
+        with self._cond:
+            depth: Dict[int, int] = {}
+            for job in self._queued:
+                depth[job.priority] = depth.get(job.priority, 0) + 1
+            return depth
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    # -- 内部实现 ---------------------------------------------------------
+
+    def _activate(self, job: Job):
+        # 租户重新变为活跃时，虚拟时间追平同类别中最小的活跃租户，避免用闲置期攒下的额度长时间独占
+        key = (job.priority, job.tenant)
+        active = [self._virtual_time[(j.priority, j.tenant)] for j in self._queued if j.priority == job.priority]
+        floor = min(active) if active else 0.0
+        self._virtual_time[key] = max(self._virtual_time.get(key, 0.0), floor)
+
+    def _enqueue(self, job: Job):
+        job._seq = next(self._seq)
+        self._queued.append(job)
+
+    def _pick(self) -> Job:
+        now = time.monotonic()
+        urgent = [job for job in self._queued
+                  if job.deadline is not None and job.deadline - now <= self.urgent_slack]
+        if urgent:
+            return min(urgent, key=lambda job: (job.deadline, job._seq))
+
+        top = min(job.priority for job in self._queued)
+        candidates = [job for job in self._queued if job.priority == top]
+        tenant = min({job.tenant for job in candidates},
+                     key=lambda name: (self._virtual_time[(top, name)], name))
+        return min((job for job in candidates if job.tenant == tenant),
+                   key=lambda job: (job.deadline if job.deadline is not None else float('inf'), job._seq))
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queued and not self._stopping:
+                    self._cond.wait()
+                if not self._queued:
+                    return
+                job = self._pick()
+                self._queued.remove(job)
+                index = job.next_chunk
+                job.next_chunk += 1
+                job.state = JOB_RUNNING
+                if job.started_at is None:
+                    job.started_at = time.monotonic()
+
+            text = job.chunks[index]
+            try:
+                result = self.run_chunk(job, index, text)
+            except Exception as e:
+                with self._cond:
+                    job.error = str(e) or e.__class__.__name__
+                self._complete(job)
+                continue
+
+            with self._cond:
+                job.results[index] = result
+                key = (job.priority, job.tenant)
+                self._virtual_time[key] = self._virtual_time.get(key, 0.0) + len(text) / self.weight(job.tenant)
+                if job.next_chunk < len(job.chunks) and not job.cancelled:
+                    # 分块边界：重新排队，让更高优先级或更"欠账"的租户先执行
+                    job.state = JOB_QUEUED
+                    self._enqueue(job)
+                    self._cond.notify()
+                    continue
+            self._complete(job)
+
+    def _complete(self, job: Job):
+        job.state = JOB_FAILED if job.error else JOB_DONE
+        job.finished_at = time.monotonic()
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                job.error = job.error or f'on_finish failed: {e}'
+                job.state = JOB_FAILED
+        job._done.set()
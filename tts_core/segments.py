@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+增量重合成的分块存档
+长文本按稳定的分块（见 chunking.iter_chunks 的 paragraphs 参数）合成后，每块音频连同内容哈希
+保存在输出文件旁的 .<文件名>.segments/ 目录；再次运行时哈希未变的块直接复用，只合成改动过的块，再重新拼接
+
+内容哈希为 引擎 + 规范化后的文本 + 音色 + 额外参数，与输出格式、采样率、响度无关：
+只改这些设置时所有块都能复用，只需重新拼接。清单 manifest.json 记录每个哈希对应的文件与上次输出的块顺序，
+运行成功后删除不再被引用的块；运行中断时已合成的块保留，下次继续复用。
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tts_core.audio import read_audio, remove_audio, write_audio
+from tts_core.journal import content_hash
+from tts_core.outputs import atomic_open
+from tts_core.pcm import is_pcm
+
+MANIFEST_VERSION = 1
+
+
+def segments_dir(output_path) -> Path:
+    output_path = Path(output_path)
+    return output_path.parent / f'.{output_path.name}.segments'
+
+
+class SegmentStore:
+    """一个输出文件的分块存档"""
+
+    def __init__(self, output_path):
+        self.root = segments_dir(output_path)
+        self.manifest_path = self.root / 'manifest.json'
+        self.segments: Dict[str, str] = {}
+        self.order: List[str] = []
+        self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('version') != MANIFEST_VERSION:
+            return
+        self.segments = dict(data.get('segments') or {})
+        self.order = list(data.get('order') or [])
+
+    @staticmethod
+    def key(engine: str, text: str, voice: Optional[str] = None, extra_args: Optional[List[str]] = None) -> str:
+        return content_hash(engine, text, voice, extra_args)
+
+    def get(self, key: str) -> Optional[Path]:
+        name = self.segments.get(key)
+        if not name:
+            return None
+        path = self.root / name
+        return path if path.exists() else None
+
+    def store(self, key: str, source) -> Path:
+        """把引擎输出移入存档并返回存档中的路径；共享内存 PCM 转存为 WAV，其他格式原样移动，不重新编码"""
+        source = Path(source)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if is_pcm(source):
+            path = self.root / f'{key}.wav'
+            samples, sample_rate = read_audio(source)
+            write_audio(path, samples, sample_rate, 'wav')
+            del samples
+            remove_audio(source)
+        else:
+            path = self.root / f'{key}{source.suffix}'
+            os.replace(source, path)
+        self.segments[key] = path.name
+        return path
+
+    def commit(self, order: List[str]):
+        """记录本次输出的块顺序并删除不再引用的块"""
+        self.order = list(order)
+        keep = set(order)
+        for key in [key for key in self.segments if key not in keep]:
+            name = self.segments.pop(key)
+            try:
+                (self.root / name).unlink()
+            except FileNotFoundError:
+                pass
+        self.save()
+
+    def save(self):
+        """写入清单；运行失败时也调用，已合成的块留待下次复用"""
+        if not self.segments and not self.root.exists():
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = {'version': MANIFEST_VERSION, 'segments': self.segments, 'order': self.order}
+        with atomic_open(self.manifest_path) as f:
+            f.write(json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
@@ -0,0 +1,586 @@
+# -*- coding: utf-8 -*-
+"""
+合成服务 (HTTP)
+所有请求经过 FairScheduler 排队，按块调度到引擎，完成后拼接为一个音频文件
+
+接口:
+  POST /synthesize  JSON 请求体，返回音频字节（同步等待完成），发送后删除服务端的输出文件
+      {"text": "...", "engine": "qwen3-tts", "voice": "赵信", "format": "mp3",
+       "sample_rate": 24000, "loudness": -16,
+       "tenant": "team-a", "priority": "interactive|normal|batch", "deadline_ms": 3000}
+      tenant / priority 也可用请求头 X-Tenant / X-Priority 指定
+      模板请求以 "template" 与 "slots" 代替 "text"，固定片段取自短语库 (tts_core/phrases.py)：
+      {"template": "您的订单 {N} 已发货", "slots": {"N": "12345"}, "voice": "赵信"}
+  POST /sessions/<id>/hints  会话提示：预先以最低优先级 (prefetch) 合成可能的下一句
+      {"hints": ["好的，马上为您查询", {"text": "...", "voice": "yunxi"}], "engine": "edge-tts", "voice": "xiaoxiao"}
+      顶层字段是各条提示的默认请求参数。之后内容相同的 /synthesize 请求直接取用（合成中则提升优先级并等待），
+      同一会话再次提交提示时，上一轮未被请求的提示被丢弃；超过 TTL 未被请求的提示同样丢弃
+  DELETE /sessions/<id>      丢弃会话中所有未被请求的提示
+  POST /jobs        异步提交：请求体与 /synthesize 相同，立即返回 202 与作业 ID（默认 batch 优先级）
+      可选 "callback": 本机 webhook 地址，"marker": 完成标记文件名（写在 output/service/markers/ 下），
+      作业结束时收到 / 写入作业状态 (JSON)，见 tts_core/jobs.py
+  GET  /jobs/<id>         作业状态；也能查询命令行 --submit 提交的作业
+  GET  /jobs/<id>/result  作业成功时返回音频字节，未结束时返回 202 与作业状态
+      异步作业的输出与完成标记保留 output_retention 秒（配置 service_retention），之后由服务清理
+  GET  /health      服务状态与各优先级排队数
+  GET  /metrics     Prometheus 文本格式的运行指标
+  GET  /voices      音色目录 (JSON)，可用 engine / lang / gender / style 查询参数筛选
+"""
+
+import json
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, quote
+
+from tts_core.chunking import chunk_text
+from tts_core.config import load_config
+from tts_core.jobs import JobStore, check_callback, describe, new_job_id, notify
+from tts_core.lang import detect_language
+from tts_core.metrics import Registry
+from tts_core.phrases import (DEFAULT_BANK_DIR, PhraseBank, fill_template, parse_template, render_text,
+                             splice_options)
+from tts_core.scheduler import (JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, PRIORITY_CLASSES, FairScheduler,
+                                Job, parse_priority)
+from tts_core.voices import build_catalog, query
+
+CONTENT_TYPES = {
+    'wav': 'audio/wav',
+    'flac': 'audio/flac',
+    'opus': 'audio/ogg',
+    'mp3': 'audio/mpeg',
+}
+
+# 请求体上限，防止单个请求占满内存
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+# 每次提交的提示条数上限与未被请求的提示保留时长（秒）
+MAX_HINTS = 32
+DEFAULT_PREFETCH_TTL = 300.0
+
+# 异步作业的默认优先级，与结束后的状态、输出及完成标记默认保留的时长（秒，配置 service_retention）
+ASYNC_PRIORITY = 'batch'
+ASYNC_RETENTION = 3600.0
+# 清理 output/service/ 下过期文件的最短间隔（秒）
+SWEEP_INTERVAL = 60.0
+
+
+class RequestError(ValueError):
+    """请求参数不合法，对应 HTTP 400"""
+
+
+class SynthesisService:
+    """调度器与引擎之间的胶水：分块、逐块调用引擎、拼接输出"""
+
+    def __init__(self, skill, workers: int = 1, weights: Optional[Dict[str, float]] = None,
+                 chunk_chars: Optional[int] = None, normalize: bool = True,
+                 prefetch_ttl: float = DEFAULT_PREFETCH_TTL, job_store=None, adaptive_chunks: bool = False,
+                 output_retention: float = ASYNC_RETENTION):
+        self.skill = skill
+        self.chunk_chars = chunk_chars
+        self.normalize = normalize
+        self.prefetch_ttl = prefetch_ttl
+        # 请求内容键 -> {'job', 'session', 'expires'}：已提交但尚未被请求的提示
+        self._prefetch: Dict[str, dict] = {}
+        self._prefetch_lock = threading.Lock()
+        # 作业 ID -> 异步提交的作业；命令行提交的作业从作业库 job_store 查询
+        self._async: Dict[str, Job] = {}
+        self._async_lock = threading.Lock()
+        self.job_store = Path(job_store) if job_store else None
+        # 未在命令行指定分块大小时，按 引擎/音色 的耗时曲线选择（见 tts_core/chunksize.py）
+        self.adaptive_chunks = adaptive_chunks and not chunk_chars
+        self.output_dir = Path(skill.output_dir) / 'service'
+        # 同步请求的输出发送后即删除；异步作业的输出与完成标记保留该时长（秒，0 为不清理）
+        self.output_retention = output_retention
+        self._next_sweep = 0.0
+        self.scheduler = FairScheduler(self._run_chunk, workers=workers, weights=weights,
+                                       on_finish=self._finish)
+        if skill.metrics is None:
+            skill.metrics = Registry()
+        self.metrics = skill.metrics
+        self.metrics.add_collector(self._collect_queue_depth)
+
+    def submit(self, request: dict, tenant: Optional[str] = None, priority=None) -> Job:
+        """校验请求并提交到调度器，立即返回作业；内容相同的提示已预取时直接返回该作业"""
+        job = self._build_job(request, tenant, priority)
+        self._sweep_outputs()
+        prefetched = self._claim(job)
+        if prefetched is not None:
+            return prefetched
+        self._assign_output(job)
+        return self.scheduler.submit(job)
+
+    def submit_async(self, request: dict, tenant: Optional[str] = None, priority=None) -> Job:
+        """异步提交：立即返回作业，结束时按请求写入完成标记、调用回调
+
+        异步作业不取用会话提示的预取结果，预取留给交互请求
+        """
+        hooks = {}
+        try:
+            if request.get('callback'):
+                hooks['callback'] = check_callback(str(request['callback']))
+        except ValueError as e:
+            raise RequestError(str(e))
+        if request.get('marker'):
+            hooks['marker'] = str(self._marker_path(str(request['marker'])))
+        job = self._build_job(request, tenant, priority or ASYNC_PRIORITY)
+        job.job_id = new_job_id()
+        job.payload['notify'] = hooks
+        self._sweep_outputs()
+        self._assign_output(job)
+
+        now = time.monotonic()
+        with self._async_lock:
+            # 作业状态与输出文件保留同样长的时间（0 为不清理）：状态可查时结果一定还在
+            if self.output_retention:
+                for job_id in [job_id for job_id, done in self._async.items()
+                               if done.finished and now - done.finished_at > self.output_retention]:
+                    del self._async[job_id]
+            self._async[job.job_id] = job
+        return self.scheduler.submit(job)
+
+    def release(self, job: Job):
+        """同步请求的音频已发送，删除服务端的输出文件"""
+        output = job.payload.get('output')
+        if output is not None and output.exists():
+            output.unlink()
+
+    def _sweep_outputs(self):
+        """删除 output/service/ 与 markers/ 下超过保留时长的文件；运行中的异步作业的输出除外"""
+        now = time.monotonic()
+        if not self.output_retention or now < self._next_sweep:
+            return
+        self._next_sweep = now + SWEEP_INTERVAL
+        with self._async_lock:
+            active = {job.payload['output'] for job in self._async.values() if not job.finished}
+        cutoff = time.time() - self.output_retention
+        for directory in (self.output_dir, self.output_dir / 'markers'):
+            if not directory.is_dir():
+                continue
+            for path in directory.iterdir():
+                # 以 . 开头的是进行中请求的分块目录与临时文件，由作业自己清理
+                if path.name.startswith('.') or path in active or not path.is_file():
+                    continue
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def job_status(self, job_id: str) -> Optional[dict]:
+        """异步作业的状态 (与 --status --json 相同的字段)；未知作业返回 None"""
+        with self._async_lock:
+            job = self._async.get(job_id)
+        if job is not None:
+            return self._describe(job)
+        if self.job_store is None or not self.job_store.exists():
+            return None
+        with JobStore(self.job_store) as store:
+            stored = store.get(job_id)
+        return describe(stored) if stored else None
+
+    def _describe(self, job: Job, finishing: bool = False) -> dict:
+        if job.finished or finishing:
+            state = JOB_FAILED if job.error else JOB_DONE
+        else:
+            # 调度器在分块之间把作业放回队列，已开始的作业对外始终是 running
+            state = JOB_RUNNING if job.started_at is not None else JOB_QUEUED
+        offset = time.time() - time.monotonic()
+        return describe({
+            'job_id': job.job_id,
+            'state': state,
+            'output': str(job.payload['output']),
+            'error': job.error,
+            'attempts': 1 if job.started_at is not None else 0,
+            'created_at': job.submitted_at + offset,
+            'started_at': job.started_at + offset if job.started_at is not None else None,
+            'finished_at': job.finished_at + offset if job.finished_at is not None else None,
+        })
+
+    def _marker_path(self, name: str) -> Path:
+        """完成标记只能写在 output/service/markers/ 下，请求不能借此写入任意路径"""
+        root = (self.output_dir / 'markers').resolve()
+        path = (root / name).resolve()
+        if root not in path.parents:
+            raise RequestError('marker must be a relative file name')
+        return path
+
+    def hint(self, session: str, request: dict, tenant: Optional[str] = None) -> dict:
+        """提交会话提示：以 prefetch 优先级合成，取代该会话上一轮未被请求的提示"""
+        hints = request.get('hints')
+        if not isinstance(hints, list) or not hints:
+            raise RequestError('hints must be a non-empty list')
+        if len(hints) > MAX_HINTS:
+            raise RequestError(f'at most {MAX_HINTS} hints per request')
+        defaults = {key: value for key, value in request.items() if key not in ('hints', 'priority', 'deadline_ms')}
+        jobs = []
+        for hint in hints:
+            item = dict(defaults, **hint) if isinstance(hint, dict) else dict(defaults, text=hint)
+            item.pop('deadline_ms', None)
+            item['priority'] = 'prefetch'
+            jobs.append(self._build_job(item, tenant, None))
+
+        keys = {job.payload['key'] for job in jobs}
+        queued = 0
+        with self._prefetch_lock:
+            dropped = self._take_stale(lambda entry: entry['session'] == session
+                                       and entry['job'].payload['key'] not in keys)
+            expires = time.monotonic() + self.prefetch_ttl
+            for job in jobs:
+                entry = self._prefetch.get(job.payload['key'])
+                if entry is not None:
+                    # 已在预取（可能来自其他会话）：归入本会话并续期
+                    entry.update(session=session, expires=expires)
+                    continue
+                # 提交与登记在同一把锁内完成，被取用或丢弃的提示一定已经提交
+                self._assign_output(job)
+                self._prefetch[job.payload['key']] = {'job': self.scheduler.submit(job), 'session': session,
+                                                      'expires': expires}
+                queued += 1
+        self._discard(dropped)
+        return {'session': session, 'queued': queued, 'kept': len(jobs) - queued, 'dropped': len(dropped)}
+
+    def end_session(self, session: str) -> int:
+        """丢弃会话中所有未被请求的提示，返回丢弃条数"""
+        with self._prefetch_lock:
+            dropped = self._take_stale(lambda entry: entry['session'] == session)
+        self._discard(dropped)
+        return len(dropped)
+
+    def _take_stale(self, predicate) -> List[Job]:
+        """取出满足条件或已过期的提示（调用方持有 _prefetch_lock）"""
+        now = time.monotonic()
+        stale = [key for key, entry in self._prefetch.items() if entry['expires'] < now or predicate(entry)]
+        return [self._prefetch.pop(key)['job'] for key in stale]
+
+    def _discard(self, jobs: List[Job]):
+        """取消未完成的提示作业，删除已完成的输出"""
+        for job in jobs:
+            if not self.scheduler.cancel(job):
+                job.wait()
+                output = job.payload['output']
+                if output.exists():
+                    output.unlink()
+            self.metrics.inc('tts_prefetch_dropped_total', engine=job.payload['engine'])
+
+    def _claim(self, job: Job) -> Optional[Job]:
+        """取用内容相同的提示作业并提升到请求的优先级；没有可用提示时返回 None"""
+        with self._prefetch_lock:
+            expired = self._take_stale(lambda entry: False)
+            entry = self._prefetch.pop(job.payload['key'], None)
+        self._discard(expired)
+        prefetched = entry['job'] if entry else None
+        if prefetched is None or (prefetched.finished and prefetched.error):
+            self.metrics.inc('tts_cache_misses_total', cache='prefetch')
+            return None
+        self.scheduler.promote(prefetched, job.priority, job.deadline)
+        prefetched.payload['prefetched'] = True
+        self.metrics.inc('tts_cache_hits_total', cache='prefetch')
+        return prefetched
+
+    def _assign_output(self, job: Job):
+        """提交前占位输出文件；取用预取结果的请求不会占位"""
+        from tts_core.outputs import new_output_path
+
+        payload = job.payload
+        output_path = new_output_path(self.output_dir, payload['text'], payload['format'],
+                                      engine=payload['engine'], voice=payload['voice'])
+        payload['output'] = output_path
+        payload['work_dir'] = output_path.parent / f'.{output_path.stem}.chunks'
+
+    def _build_job(self, request: dict, tenant: Optional[str], priority) -> Job:
+        parts = None
+        if request.get('template') is not None:
+            slots = request.get('slots') or {}
+            if not isinstance(slots, dict):
+                raise RequestError('slots must be a JSON object')
+            try:
+                parts = fill_template(parse_template(str(request['template'])), slots)
+            except ValueError as e:
+                raise RequestError(str(e))
+            text = render_text(parts)
+        else:
+            text = str(request.get('text') or '').strip()
+        if not text:
+            raise RequestError('text is required')
+        engine = request.get('engine') or 'edge-tts'
+        if engine not in self.skill.supported_engines:
+            raise RequestError(f'unsupported engine: {engine}')
+        fmt = request.get('format') or self.skill.default_format(engine)
+        if fmt not in CONTENT_TYPES:
+            raise RequestError(f'unsupported format: {fmt}')
+        try:
+            priority = parse_priority(request.get('priority', priority))
+            sample_rate = int(request['sample_rate']) if request.get('sample_rate') else None
+            loudness = float(request['loudness']) if request.get('loudness') is not None else None
+            deadline_ms = float(request['deadline_ms']) if request.get('deadline_ms') is not None else None
+        except (TypeError, ValueError) as e:
+            raise RequestError(str(e))
+
+        if parts is not None:
+            # 模板请求：每个片段即一块，语言按固定片段判断（与 TTSSkill.run_template 一致）
+            lang = detect_language(render_text([part for part in parts if part.slot is None]) or text)
+            chunks = [part.text for part in parts]
+        else:
+            lang = detect_language(text)
+            chunks = None
+        if self.normalize:
+            from tts_core.textnorm import normalize_cached
+            text = normalize_cached(text, lang)
+            if chunks is not None:
+                chunks = [normalize_cached(chunk, lang) for chunk in chunks]
+        voice = request.get('voice')
+        key = json.dumps([engine, voice, fmt, sample_rate, loudness, text, parts is not None], ensure_ascii=False)
+
+        if chunks is None:
+            # 未显式指定时按请求读取配置（文件未修改时使用缓存），调整分块大小无需重启服务
+            chunk_chars = self.chunk_chars or load_config('tts-skill')['chunk_chars']
+            if self.adaptive_chunks and self.skill.timing_store:
+                from tts_core.chunksize import plan_chunk_chars
+                chunk_chars, _ = plan_chunk_chars(self.skill.timing_store, engine, voice, chunk_chars, len(text))
+            chunks = chunk_text(text, chunk_chars)
+        job = Job(
+            chunks=chunks,
+            tenant=str(request.get('tenant') or tenant or 'default'),
+            priority=priority,
+            deadline=time.monotonic() + deadline_ms / 1000 if deadline_ms is not None else None,
+            payload={
+                'engine': engine,
+                'voice': voice,
+                'format': fmt,
+                'sample_rate': sample_rate,
+                'loudness': loudness,
+                'lang': lang,
+                'text': text,
+                # 预取匹配用的请求内容键
+                'key': key,
+                # 模板请求中各块是否为固定片段（取自短语库，拼接后保留）
+                'fixed': [part.slot is None for part in parts] if parts is not None else None,
+            },
+        )
+        return job
+
+    def _run_chunk(self, job: Job, index: int, text: str) -> Path:
+        payload = job.payload
+        work_dir = payload['work_dir']
+        work_dir.mkdir(parents=True, exist_ok=True)
+        if payload['fixed'] and payload['fixed'][index]:
+            chunk_path, _ = self.skill.phrase_audio(self._phrase_bank(), payload['engine'], text, work_dir, index,
+                                                    payload['voice'], lang=payload['lang'])
+        else:
+            chunk_path = self.skill.synthesize_chunk(payload['engine'], text, work_dir, index, payload['voice'],
+                                                     lang=payload['lang'])
+        if chunk_path is None:
+            raise RuntimeError(f'engine failed on chunk {index + 1}/{len(job.chunks)}')
+        return chunk_path
+
+    def _phrase_bank(self) -> PhraseBank:
+        return PhraseBank(self.skill.phrase_dir or DEFAULT_BANK_DIR)
+
+    def _finish(self, job: Job):
+        try:
+            self._assemble(job)
+        except Exception as e:
+            # 调度器随后把作业标记为失败；先记下错误，通知中的状态与之一致
+            job.error = job.error or f'on_finish failed: {e}'
+            raise
+        finally:
+            hooks = job.payload.get('notify')
+            if hooks:
+                # 回调可能较慢，不占用调度线程
+                threading.Thread(target=notify, args=(self._describe(job, finishing=True),), kwargs=hooks,
+                                 name='tts-job-notify', daemon=True).start()
+
+    def _assemble(self, job: Job):
+        payload = job.payload
+        try:
+            if not job.error:
+                from tts_core.audio import concat_files
+                if payload['fixed']:
+                    concat_files(job.results, payload['output'], payload['format'], payload['sample_rate'],
+                                 payload['loudness'], remove=False, **splice_options(self.skill.join_options))
+                else:
+                    concat_files(job.results, payload['output'], payload['format'],
+                                 payload['sample_rate'], payload['loudness'], **self.skill.join_options)
+        except Exception:
+            self.metrics.inc('tts_errors_total', engine=payload['engine'], stage='concat')
+            raise
+        finally:
+            # 失败时清理已生成的片段（共享内存中的交接文件不在 work_dir 下）
+            from tts_core.audio import remove_audio
+            bank = self._phrase_bank() if payload['fixed'] else None
+            for chunk_path in job.results:
+                if chunk_path is None or not Path(chunk_path).exists() or (bank and bank.contains(chunk_path)):
+                    continue
+                remove_audio(chunk_path)
+            shutil.rmtree(payload['work_dir'], ignore_errors=True)
+            output = payload['output']
+            if output.exists() and (job.cancelled or job.error and output.stat().st_size == 0):
+                output.unlink()
+
+    def _collect_queue_depth(self, registry: Registry):
+        depth = self.scheduler.queue_depth()
+        for name, value in PRIORITY_CLASSES.items():
+            registry.set('tts_queue_depth', depth.get(value, 0), priority=name)
+
+    def status(self) -> dict:
+        names = {value: name for name, value in PRIORITY_CLASSES.items()}
+        depth = self.scheduler.queue_depth()
+        return {'status': 'ok', 'queued': {names.get(p, str(p)): n for p, n in sorted(depth.items())},
+                'prefetched': len(self._prefetch)}
+
+    def shutdown(self):
+        # 未被请求的提示不再需要，先丢弃再等待进行中的作业
+        with self._prefetch_lock:
+            dropped = self._take_stale(lambda entry: True)
+        self._discard(dropped)
+        self.scheduler.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: SynthesisService = None
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: dict):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+    def _job_path(self, path: str) -> Optional[List[str]]:
+        """/jobs/<id>[/result] 拆分为 [id, ...]，其他路径返回 None"""
+        segments = path.strip('/').split('/')
+        if len(segments) in (2, 3) and segments[0] == 'jobs' and segments[1]:
+            return segments[1:]
+        return None
+
+    def _send_job(self, job_id: str, result: bool):
+        status = self.service.job_status(job_id)
+        if status is None:
+            self._send_json(404, {'error': 'unknown job', 'job_id': job_id})
+        elif not result:
+            self._send_json(200, status)
+        elif status['state'] == JOB_FAILED:
+            self._send_json(500, {'error': status['error'], 'job_id': job_id})
+        elif status['state'] != JOB_DONE:
+            self._send_json(202, status)
+        else:
+            output = Path(status['output'])
+            if not output.exists():
+                self._send_json(410, {'error': 'output no longer exists', 'job_id': job_id})
+                return
+            self._send(200, output.read_bytes(), CONTENT_TYPES.get(output.suffix[1:], 'application/octet-stream'), {
+                'X-Job-Id': job_id,
+                'X-Output-Name': quote(output.name),
+            })
+
+    def do_GET(self):
+        path, _, query_string = self.path.partition('?')
+        job = self._job_path(path)
+        if job is not None and job[1:] in ([], ['result']):
+            self._send_job(job[0], result=bool(job[1:]))
+        elif path == '/health':
+            self._send_json(200, self.service.status())
+        elif path == '/metrics':
+            self._send(200, self.service.metrics.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+        elif path == '/voices':
+            params = {key: values[-1] for key, values in parse_qs(query_string).items()
+                      if key in ('engine', 'lang', 'gender', 'style')}
+            self._send_json(200, {'voices': query(build_catalog(self.service.skill.assets_dir), **params)})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _session_path(self, path: str) -> Optional[List[str]]:
+        """/sessions/<id>[/...] 拆分为 [id, ...]，其他路径返回 None"""
+        segments = path.strip('/').split('/')
+        if len(segments) >= 2 and segments[0] == 'sessions' and segments[1]:
+            return segments[1:]
+        return None
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise RequestError('request body too large')
+        request = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        if not isinstance(request, dict):
+            raise RequestError('request body must be a JSON object')
+        return request
+
+    def do_DELETE(self):
+        session = self._session_path(self.path.split('?', 1)[0])
+        if session is None or len(session) != 1:
+            self._send_json(404, {'error': 'not found'})
+            return
+        self._send_json(200, {'session': session[0], 'dropped': self.service.end_session(session[0])})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        session = self._session_path(path)
+        if session is not None and session[1:] == ['hints']:
+            try:
+                result = self.service.hint(session[0], self._read_json(), tenant=self.headers.get('X-Tenant'))
+            except (RequestError, ValueError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(202, result)
+            return
+        if path == '/jobs':
+            try:
+                job = self.service.submit_async(self._read_json(), tenant=self.headers.get('X-Tenant'),
+                                                priority=self.headers.get('X-Priority'))
+            except (RequestError, ValueError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(202, dict(self.service.job_status(job.job_id),
+                                      status_url=f'/jobs/{job.job_id}', result_url=f'/jobs/{job.job_id}/result'))
+            return
+        if path != '/synthesize':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            job = self.service.submit(self._read_json(), tenant=self.headers.get('X-Tenant'),
+                                      priority=self.headers.get('X-Priority'))
+        except (RequestError, ValueError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        job.wait()
+        if job.error:
+            self._send_json(500, {'error': job.error, 'job_id': job.job_id})
+            return
+        output = job.payload['output']
+        try:
+            body = output.read_bytes()
+        finally:
+            self.service.release(job)
+        self._send(200, body, CONTENT_TYPES[job.payload['format']], {
+            'X-Job-Id': job.job_id,
+            'X-Output-Name': quote(output.name),
+            'X-Queue-Seconds': f'{job.started_at - job.submitted_at:.3f}',
+            'X-Prefetched': 'true' if job.payload.get('prefetched') else 'false',
+        })
+
+
+def serve(skill, host: str = '127.0.0.1', port: int = 8765, **options):
+    """启动服务并阻塞运行，Ctrl+C 退出"""
+    service = SynthesisService(skill, **options)
+    handler = type('SynthesisHandler', (_Handler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"🌐 TTS service listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
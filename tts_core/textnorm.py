@@ -0,0 +1,488 @@
+# -*- coding: utf-8 -*-
+"""
+文本规范化
+在送入引擎前把数字、日期、时间、货币、单位、网址与常见缩写转换为可朗读的文字，并清理标点。
+每个请求只执行一次，结果按文本缓存（进程内 LRU + 大文本磁盘缓存），
+规范化后的文本同时用于任务日志/命名的内容哈希与引擎输入。
+
+中英混排时，每个数字按其所在的语言片段（tts_core.lang.iter_spans）决定读法。
+"""
+
+import hashlib
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from tts_core.lang import char_language, detect_language, language_spans
+
+# 规则变化时递增，使磁盘缓存失效
+NORMALIZER_VERSION = 4
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'cache' / 'textnorm'
+
+# 小于该长度的文本只使用进程内缓存，磁盘读写反而更慢
+DISK_CACHE_MIN_CHARS = 2000
+
+# 磁盘缓存命中统计（进程内缓存见 normalize_text.cache_info()）
+DISK_CACHE_STATS = {'hits': 0, 'misses': 0}
+
+# 语言片段的最短字数：更短的字母/汉字（A股、型号X）随所在片段的语言读
+_SPAN_MIN_CHARS = 2
+
+
+# ---------------------------------------------------------------------------
+# 数字读法
+# ---------------------------------------------------------------------------
+
+_ZH_DIGITS = '零一二三四五六七八九'
+_ZH_UNITS = ('', '十', '百', '千')
+_ZH_GROUPS = ('', '万', '亿', '万亿')
+
+_EN_ONES = ('zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+            'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen',
+            'eighteen', 'nineteen')
+_EN_TENS = ('', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety')
+_EN_SCALES = ('', 'thousand', 'million', 'billion', 'trillion')
+_EN_ORDINAL_SUFFIX = {'one': 'first', 'two': 'second', 'three': 'third', 'five': 'fifth',
+                      'eight': 'eighth', 'nine': 'ninth', 'twelve': 'twelfth'}
+_EN_MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+              'September', 'October', 'November', 'December')
+
+
+def zh_digits(digits: str) -> str:
+    """逐位读数字：2024 -> 二零二四"""
+    return ''.join(_ZH_DIGITS[int(d)] for d in digits if d.isdigit())
+
+
+def _zh_under_10000(n: int) -> str:
+    result = ''
+    pending_zero = False
+    for pos in (3, 2, 1, 0):
+        digit = n // 10 ** pos % 10
+        if digit == 0:
+            pending_zero = bool(result)
+            continue
+        if pending_zero:
+            result += '零'
+            pending_zero = False
+        result += _ZH_DIGITS[digit] + _ZH_UNITS[pos]
+    return result
+
+
+def zh_integer(n: int) -> str:
+    """整数读法：10010 -> 一万零一十，15 -> 十五"""
+    if n < 0:
+        return '负' + zh_integer(-n)
+    if n == 0:
+        return '零'
+
+    groups = []
+    while n:
+        groups.append(n % 10000)
+        n //= 10000
+    if len(groups) > len(_ZH_GROUPS):
+        return zh_digits(''.join(str(g) for g in reversed(groups)))
+
+    result = ''
+    pending_zero = False
+    for index in reversed(range(len(groups))):
+        group = groups[index]
+        if group == 0:
+            pending_zero = bool(result)
+            continue
+        if result and (pending_zero or group < 1000):
+            result += '零'
+        result += _zh_under_10000(group) + _ZH_GROUPS[index]
+        pending_zero = False
+
+    if result.startswith('一十'):
+        result = result[1:]
+    return result
+
+
+def zh_number(text: str) -> str:
+    """数字串读法，支持千分位、小数与负号"""
+    text = text.replace(',', '')
+    negative = text.startswith('-')
+    text = text.lstrip('-')
+    integer, _, fraction = text.partition('.')
+    result = zh_integer(int(integer or '0'))
+    if fraction:
+        result += '点' + zh_digits(fraction)
+    return ('负' if negative else '') + result
+
+
+def _en_under_1000(n: int) -> str:
+    parts = []
+    if n >= 100:
+        parts.append(f'{_EN_ONES[n // 100]} hundred')
+        n %= 100
+    if n >= 20:
+        parts.append(_EN_TENS[n // 10] + (f'-{_EN_ONES[n % 10]}' if n % 10 else ''))
+    elif n > 0:
+        parts.append(_EN_ONES[n])
+    return ' '.join(parts)
+
+
+def en_integer(n: int) -> str:
+    """整数英文读法：1234 -> one thousand two hundred thirty-four"""
+    if n < 0:
+        return 'minus ' + en_integer(-n)
+    if n < 20:
+        return _EN_ONES[n]
+
+    groups = []
+    while n:
+        groups.append(n % 1000)
+        n //= 1000
+    if len(groups) > len(_EN_SCALES):
+        return en_digits(''.join(str(g).zfill(3) for g in reversed(groups)).lstrip('0'))
+
+    parts = []
+    for index in reversed(range(len(groups))):
+        if groups[index]:
+            parts.append(_en_under_1000(groups[index]) + (f' {_EN_SCALES[index]}' if index else ''))
+    return ' '.join(parts)
+
+
+def en_digits(digits: str) -> str:
+    return ' '.join(_EN_ONES[int(d)] for d in digits if d.isdigit())
+
+
+def en_number(text: str) -> str:
+    text = text.replace(',', '')
+    negative = text.startswith('-')
+    text = text.lstrip('-')
+    integer, _, fraction = text.partition('.')
+    result = en_integer(int(integer or '0'))
+    if fraction:
+        result += ' point ' + en_digits(fraction)
+    return ('minus ' if negative else '') + result
+
+
+def en_ordinal(n: int) -> str:
+    words = en_integer(n)
+    head, sep, last = words.rpartition(' ')
+    tail_head, dash, tail = last.rpartition('-')
+    if tail in _EN_ORDINAL_SUFFIX:
+        tail = _EN_ORDINAL_SUFFIX[tail]
+    elif tail.endswith('y'):
+        tail = tail[:-1] + 'ieth'
+    else:
+        tail += 'th'
+    return head + sep + tail_head + dash + tail
+
+
+def en_year(n: int) -> str:
+    """年份读法：2024 -> twenty twenty-four，1905 -> nineteen oh-five"""
+    if n < 1000 or n >= 10000 or (2000 <= n < 2010):
+        return en_integer(n)
+    high, low = divmod(n, 100)
+    if low == 0:
+        return f'{en_integer(high)} hundred'
+    if low < 10:
+        return f'{en_integer(high)} oh-{_EN_ONES[low]}'
+    return f'{en_integer(high)} {en_integer(low)}'
+
+
+# ---------------------------------------------------------------------------
+# 规则表
+# ---------------------------------------------------------------------------
+
+_UNITS = {
+    # 单位: (中文, 英文)
+    'km/h': ('公里每小时', 'kilometers per hour'),
+    'km': ('公里', 'kilometers'),
+    'kg': ('千克', 'kilograms'),
+    'cm': ('厘米', 'centimeters'),
+    'mm': ('毫米', 'millimeters'),
+    'ml': ('毫升', 'milliliters'),
+    'mL': ('毫升', 'milliliters'),
+    'm': ('米', 'meters'),
+    'g': ('克', 'grams'),
+    'L': ('升', 'liters'),
+    '°C': ('摄氏度', 'degrees Celsius'),
+    '℃': ('摄氏度', 'degrees Celsius'),
+    'kHz': ('千赫兹', 'kilohertz'),
+    'MHz': ('兆赫兹', 'megahertz'),
+    'GHz': ('吉赫兹', 'gigahertz'),
+    'Hz': ('赫兹', 'hertz'),
+    'KB': ('KB', 'kilobytes'),
+    'MB': ('MB', 'megabytes'),
+    'GB': ('GB', 'gigabytes'),
+    'TB': ('TB', 'terabytes'),
+}
+
+_CURRENCIES = {
+    '$': ('美元', 'dollars'),
+    '¥': ('元', 'yuan'),
+    '￥': ('元', 'yuan'),
+    '€': ('欧元', 'euros'),
+    '£': ('英镑', 'pounds'),
+}
+
+_EN_ABBREVIATIONS = {
+    'Mr.': 'Mister',
+    'Mrs.': 'Missus',
+    'Ms.': 'Miz',
+    'Dr.': 'Doctor',
+    'Prof.': 'Professor',
+    'St.': 'Saint',
+    'e.g.': 'for example',
+    'i.e.': 'that is',
+    'etc.': 'et cetera',
+    'vs.': 'versus',
+    'approx.': 'approximately',
+}
+
+# 负号只在行首、空白、左括号、运算符或货币符号之后识别，GPT-4、COVID-19 中的连字符不是负号；
+# 中文不用空格分词，汉字之后的“-”同样视为负号（气温-3.5℃）
+_SIGN = r'(?:(?<![^\s(\[{（【《「=+*/<>:：,，;；、$¥￥€£\u4e00-\u9fff])-)?'
+_NUMBER = _SIGN + r'(?:\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)'
+
+_RE_FULLWIDTH = re.compile(r'[\uff10-\uff19\uff21-\uff3a\uff41-\uff5a\uff05]')
+_RE_CONTROL = re.compile(r'[\u0000-\u0008\u000b\u000c\u000e-\u001f\u007f\u200b-\u200f\ufeff]')
+_RE_EMOJI = re.compile('[\U0001F300-\U0001FAFF\u2600-\u27bf\ufe0f]')
+_RE_SPACES = re.compile(r'[ \t\u3000\u00a0]+')
+_RE_URL = re.compile(r'https?://([A-Za-z0-9.-]+)(?::\d+)?(?:[/?#][^\s\u4e00-\u9fff，。！？；]*)?')
+_RE_EMAIL = re.compile(r'\b([A-Za-z0-9._%+-]+)@([A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+)\b')
+_RE_DATE = re.compile(r'(?<!\d)(\d{4})[-/.年](\d{1,2})[-/.月](\d{1,2})[日号]?(?!\d)')
+# 四位数字，或后面紧跟月份的两三位数字才按年份逐位读；其余（10年、100年）是时长，按整数读
+_RE_ZH_YEAR = re.compile(r'(?<!\d)(?<!\d[-–—~～])(\d{4}|\d{2,3}(?=年\d{1,2}月))年')
+_RE_TIME = re.compile(r'(?<![\d:])([01]?\d|2[0-3]):([0-5]\d)(?::([0-5]\d))?(?![\d:])')
+_RE_PHONE = re.compile(r'(?<![\d-])(?:\+\d{1,3}[ -])?(?:\d{3,4}[ -]\d{3,4}[ -]\d{4}|0\d{2,3}-\d{7,8})(?![\d-])')
+_RE_VERSION = re.compile(r'(?<![A-Za-z0-9.])[vV]?(\d+(?:\.\d+){2,})(?![A-Za-z0-9]|\.\d)')
+_RE_CURRENCY = re.compile(r'([$¥￥€£])\s?(' + _NUMBER + r')')
+_RE_PERCENT = re.compile(r'(' + _NUMBER + r')\s?%')
+_RE_UNIT = re.compile(r'(' + _NUMBER + r')\s?(' + '|'.join(re.escape(u) for u in sorted(_UNITS, key=len, reverse=True)) + r')(?![A-Za-z])')
+_RE_RANGE = re.compile(r'(?<![\d.-])(\d{1,4})\s?([~～\-–—])\s?(\d{1,4})(?![\d.])')
+# 量词：前面的“二”读作“两”（2个 -> 两个，200本 -> 两百本）
+_RE_ZH_MEASURE = re.compile(r'个|位|只|本|条|张|件|次|种|台|辆|名|人|天|周|年(?!级)|岁|倍|块|片|份|双|对|层|家|句|首|部|篇|项|遍|杯|小时|分钟|秒钟')
+_RE_EN_ORDINAL = re.compile(r'\b(\d+)(st|nd|rd|th)\b')
+# 与拉丁字母相连的数字是型号或名称的一部分（5G、MP3、H2O、K8s），保持原样
+_RE_NUMBER = re.compile(r'(?<![\d.A-Za-z])(' + _NUMBER + r')(?![\dA-Za-z])')
+_RE_ABBREVIATION = re.compile('|'.join(r'(?<![A-Za-z])' + re.escape(a) for a in _EN_ABBREVIATIONS))
+_RE_AMPERSAND = re.compile(r'\s*&\s*')
+_RE_REPEAT_PUNCT = re.compile(r'([!?！？,，;；])\1+')
+_RE_ELLIPSIS = re.compile(r'\.{3,}|。{2,}|…+')
+_RE_SPACE_BEFORE_ZH_PUNCT = re.compile(r'\s+([，。！？；：、）》」』])')
+
+
+def _sub(pattern, text: str, default: str, handler) -> str:
+    """按匹配所在的语言片段（见 tts_core.lang.iter_spans）决定读法；
+    匹配后紧跟汉字或字母时（5个、3kg的）按后面的片段读，否则按所在片段读"""
+    spans = starts = None
+
+    def replace(match):
+        nonlocal spans, starts
+        if spans is None:
+            # 有匹配时才切分，每轮替换前文本已变化，需重新切分
+            spans = language_spans(text, default, min_chars=_SPAN_MIN_CHARS)
+            starts = [span.start for span in spans]
+        end = match.end()
+        position = end if end < len(text) and char_language(text[end]) else match.start()
+        return handler(match, spans[bisect_right(starts, position) - 1].lang)
+
+    return pattern.sub(replace, text)
+
+
+def _fullwidth_to_ascii(match) -> str:
+    return chr(ord(match.group(0)) - 0xFEE0)
+
+
+def _url(match, lang):
+    host = match.group(1).rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    return host.replace('.', '点' if lang == 'zh' else ' dot ')
+
+
+def _email(match, lang):
+    user, domain = match.groups()
+    if lang == 'zh':
+        return f"{user} at {domain.replace('.', '点')}"
+    return f"{user} at {domain.replace('.', ' dot ')}"
+
+
+def _date(match, lang):
+    year, month, day = (int(g) for g in match.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return match.group(0)
+    if lang == 'zh':
+        return f"{zh_digits(match.group(1))}年{zh_integer(month)}月{zh_integer(day)}日"
+    return f"{_EN_MONTHS[month - 1]} {en_ordinal(day)}, {en_year(year)}"
+
+
+def _zh_year(match, lang):
+    return zh_digits(match.group(1)) + '年'
+
+
+def _time(match, lang):
+    hour, minute, second = match.group(1), match.group(2), match.group(3)
+    if lang == 'zh':
+        result = f"{zh_integer(int(hour))}点"
+        if int(minute):
+            result += f"{zh_integer(int(minute))}分"
+        if second and int(second):
+            result += f"{zh_integer(int(second))}秒"
+        return result
+    result = en_integer(int(hour))
+    if int(minute) == 0:
+        result += " o'clock"
+    elif int(minute) < 10:
+        result += f' oh {en_integer(int(minute))}'
+    else:
+        result += f' {en_integer(int(minute))}'
+    if second and int(second):
+        result += f' and {en_integer(int(second))} seconds'
+    return result
+
+
+def _phone(match, lang):
+    groups = re.split(r'[ -]', match.group(0))
+    if lang == 'zh':
+        return '，'.join(zh_digits(g) for g in groups)
+    return ', '.join(en_digits(g) for g in groups)
+
+
+def _version(match, lang):
+    parts = match.group(1).split('.')
+    if lang == 'zh':
+        return '点'.join(zh_number(p) for p in parts)
+    return ' point '.join(en_number(p) for p in parts)
+
+
+def _currency(match, lang):
+    symbol, amount = match.groups()
+    zh_name, en_name = _CURRENCIES[symbol]
+    if lang == 'zh':
+        return zh_number(amount) + zh_name
+    return f"{en_number(amount)} {en_name}"
+
+
+def _percent(match, lang):
+    amount = match.group(1)
+    if lang == 'zh':
+        return '百分之' + zh_number(amount)
+    return f"{en_number(amount)} percent"
+
+
+def _unit(match, lang):
+    amount, unit = match.groups()
+    zh_name, en_name = _UNITS[unit]
+    if lang == 'zh':
+        return zh_number(amount) + zh_name
+    if en_name.endswith('s') and amount in ('1', '1.0'):
+        en_name = en_name[:-1]
+    return f"{en_number(amount)} {en_name}"
+
+
+def _range(match, lang):
+    low, dash, high = match.groups()
+    # 连字符两侧不是递增的数字时不当作范围（比分、编号等）
+    if dash not in '~～' and int(low) >= int(high):
+        return match.group(0)
+    years = len(low) == len(high) == 4
+    if lang == 'zh':
+        if years and match.string.startswith('年', match.end()):
+            return f"{zh_digits(low)}到{zh_digits(high)}"
+        return f"{zh_integer(int(low))}到{zh_integer(int(high))}"
+    if years and int(low) >= 1100:
+        return f"{en_year(int(low))} to {en_year(int(high))}"
+    return f"{en_integer(int(low))} to {en_integer(int(high))}"
+
+
+def _en_ordinal(match, lang):
+    return en_ordinal(int(match.group(1)))
+
+
+def _number(match, lang):
+    number = match.group(1)
+    digits = number.lstrip('-')
+    # 长数字串（编号、卡号等）及前导零数字逐位读
+    if ',' not in digits and '.' not in digits and (len(digits) >= 7 or (len(digits) > 1 and digits[0] == '0')):
+        return zh_digits(digits) if lang == 'zh' else en_digits(digits)
+    if lang == 'zh':
+        result = zh_number(number)
+        if (result[:1] == '二' and result[1:2] in ('', '百', '千', '万', '亿') and number.isdigit()
+                and _RE_ZH_MEASURE.match(match.string, match.end())):
+            result = '两' + result[1:]
+        return result
+    # 英文中单独的四位整数多为年份：1990 -> nineteen ninety
+    if len(number) == 4 and number.isdigit() and int(number) >= 1100:
+        return en_year(int(number))
+    return en_number(number)
+
+
+def _abbreviation(match):
+    return _EN_ABBREVIATIONS[match.group(0)]
+
+
+def _ampersand(match, lang):
+    return '和' if lang == 'zh' else ' and '
+
+
+def _ellipsis(match):
+    return '…'
+
+
+@lru_cache(maxsize=1024)
+def normalize_text(text: str, lang: Optional[str] = None) -> str:
+    """规范化文本；lang 为文档主语言，数字读法按局部上下文决定"""
+    if not text:
+        return text
+    lang = lang or detect_language(text)
+
+    text = _RE_FULLWIDTH.sub(_fullwidth_to_ascii, text)
+    text = _RE_CONTROL.sub('', text)
+    text = _RE_EMOJI.sub('', text)
+    text = _RE_SPACES.sub(' ', text)
+
+    text = _sub(_RE_URL, text, lang, _url)
+    text = _sub(_RE_EMAIL, text, lang, _email)
+    text = _RE_ABBREVIATION.sub(_abbreviation, text)
+    text = _sub(_RE_DATE, text, lang, _date)
+    text = _sub(_RE_ZH_YEAR, text, lang, _zh_year)
+    text = _sub(_RE_TIME, text, lang, _time)
+    text = _sub(_RE_PHONE, text, lang, _phone)
+    text = _sub(_RE_VERSION, text, lang, _version)
+    text = _sub(_RE_CURRENCY, text, lang, _currency)
+    text = _sub(_RE_PERCENT, text, lang, _percent)
+    text = _sub(_RE_UNIT, text, lang, _unit)
+    text = _sub(_RE_RANGE, text, lang, _range)
+    text = _sub(_RE_EN_ORDINAL, text, lang, _en_ordinal)
+    text = _sub(_RE_NUMBER, text, lang, _number)
+    text = _sub(_RE_AMPERSAND, text, lang, _ampersand)
+
+    text = _RE_ELLIPSIS.sub(_ellipsis, text)
+    text = _RE_REPEAT_PUNCT.sub(r'\1', text)
+    text = _RE_SPACE_BEFORE_ZH_PUNCT.sub(r'\1', text)
+    text = _RE_SPACES.sub(' ', text)
+    return '\n'.join(line.strip() for line in text.split('\n')).strip()
+
+
+def normalize_cached(text: str, lang: Optional[str] = None, cache_dir=DEFAULT_CACHE_DIR,
+                     min_chars: int = DISK_CACHE_MIN_CHARS) -> str:
+    """带磁盘缓存的规范化：大文本重复运行时直接读取上次的结果"""
+    if cache_dir is None or len(text) < min_chars:
+        return normalize_text(text, lang)
+
+    key = hashlib.sha256(f'{NORMALIZER_VERSION}\0{lang or ""}\0{text}'.encode('utf-8')).hexdigest()
+    cache_path = Path(cache_dir) / key[:2] / f'{key}.txt'
+    try:
+        result = cache_path.read_text(encoding='utf-8')
+        DISK_CACHE_STATS['hits'] += 1
+        return result
+    except OSError:
+        DISK_CACHE_STATS['misses'] += 1
+
+    result = normalize_text(text, lang)
+    try:
+        from tts_core.outputs import atomic_open
+        with atomic_open(cache_path) as f:
+            f.write(result.encode('utf-8'))
+    except OSError:
+        pass
+    return result
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+音色目录
+汇总所有引擎可用音色的元数据（语言、性别、引擎、参考音频时长、是否支持风格），
+供 --list-voices、服务模式 GET /voices 与各引擎共用
+
+在线音色（Edge、OpenAI）是这里的静态表，引擎直接引用，不再各自维护一份；
+Qwen3 本地音色来自 assets 目录顶层的参考音频（需有同名 .txt 转写文本，与引擎的查找规则一致）。
+扫描结果连同参考音频时长缓存在 cache/voices.json，以 assets 目录的修改时间为键：
+增删或重命名音色文件都会改变目录的修改时间，缓存随之失效；目录未变时只需一次 stat。
+
+--list-voices 走主入口的快速路径，本模块因此不导入 typing、threading 与 tts_core.config。
+"""
+
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+CACHE_FILE = Path(__file__).resolve().parent.parent / 'cache' / 'voices.json'
+# 缓存条目结构变化时递增，旧缓存自动失效
+CATALOG_VERSION = 1
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.flac')
+MULTILINGUAL = 'multilingual'
+
+
+# name 为中文名，description 为中文描述
+Voice = namedtuple('Voice', 'voice_id gender name description')
+
+# Edge 在线音色：关键词 -> 音色信息
+EDGE_VOICES = {
+    # 女声
+    'xiaoxiao': Voice('zh-CN-XiaoxiaoNeural', 'female', '晓晓', '温柔'),
+    'xiaoyi': Voice('zh-CN-XiaoyiNeural', 'female', '晓伊', '甜美'),
+    'xiaochen': Voice('zh-CN-XiaochenNeural', 'female', '晓辰', '知性'),
+    'xiaohan': Voice('zh-CN-XiaohanNeural', 'female', '晓涵', '优雅'),
+    'xiaomeng': Voice('zh-CN-XiaomengNeural', 'female', '晓梦', '梦幻'),
+    'xiaomo': Voice('zh-CN-XiaomoNeural', 'female', '晓墨', '文艺'),
+    'xiaoqiu': Voice('zh-CN-XiaoqiuNeural', 'female', '晓秋', '成熟'),
+    'xiaorui': Voice('zh-CN-XiaoruiNeural', 'female', '晓睿', '智慧'),
+    'xiaoshuang': Voice('zh-CN-XiaoshuangNeural', 'female', '晓双', '活泼'),
+    'xiaoxuan': Voice('zh-CN-XiaoxuanNeural', 'female', '晓萱', '清新'),
+    'xiaoyan': Voice('zh-CN-XiaoyanNeural', 'female', '晓颜', '柔美'),
+    'xiaoyou': Voice('zh-CN-XiaoyouNeural', 'female', '晓悠', '悠扬'),
+    'xiaozhen': Voice('zh-CN-XiaozhenNeural', 'female', '晓甄', '端庄'),
+
+    # 男声
+    'yunxi': Voice('zh-CN-YunxiNeural', 'male', '云希', '清朗'),
+    'yunyang': Voice('zh-CN-YunyangNeural', 'male', '云扬', '阳光'),
+    'yunjian': Voice('zh-CN-YunjianNeural', 'male', '云健', '稳重'),
+    'yunfeng': Voice('zh-CN-YunfengNeural', 'male', '云枫', '磁性'),
+    'yunhao': Voice('zh-CN-YunhaoNeural', 'male', '云皓', '豪迈'),
+    'yunxia': Voice('zh-CN-YunxiaNeural', 'male', '云夏', '热情'),
+    'yunye': Voice('zh-CN-YunyeNeural', 'male', '云野', '野性'),
+    'yunze': Voice('zh-CN-YunzeNeural', 'male', '云泽', '深沉'),
+}
+
+# Edge 支持的语音风格
+EDGE_STYLES = [
+    'general',           # 通用风格
+    'assistant',         # 智能助手
+    'chat',             # 聊天对话
+    'customerservice',   # 客服专业
+    'newscast',         # 新闻播报
+    'affectionate',     # 亲切温暖
+    'calm',             # 平静舒缓
+    'cheerful',         # 愉快欢乐
+    'gentle',           # 温和柔美
+    'lyrical',          # 抒情诗意
+    'serious',          # 严肃正式
+]
+
+# OpenAI 音色：名称 -> (性别, 中文描述, 英文描述)；OpenAI 音色可朗读多种语言
+OPENAI_VOICES = {
+    'alloy': ('neutral', '中性平衡的声音', 'Neutral and balanced'),
+    'echo': ('male', '深沉有磁性的声音', 'Deep and resonant'),
+    'fable': ('neutral', '轻快活泼的声音', 'Light and lively'),
+    'onyx': ('male', '严肃有力的声音', 'Serious and powerful'),
+    'nova': ('female', '温暖女性的声音', 'Warm and feminine'),
+    'shimmer': ('female', '清晰悦耳的声音', 'Clear and bright'),
+}
+
+# assets 目录 -> (修改时间戳, 本地音色条目)，服务模式下每次查询只需一次目录遍历（不读文件内容）；
+# 整项替换而不原地修改，多线程读写无需加锁
+_memo = {}
+
+
+def _online_voices() -> list:
+    entries = []
+    for key, voice in EDGE_VOICES.items():
+        entries.append({
+            'engine': 'edge-tts', 'voice': key, 'id': voice.voice_id, 'language': 'zh-CN',
+            'gender': voice.gender, 'description': f'{voice.name} ({voice.description})',
+            'styles': list(EDGE_STYLES), 'sample_seconds': None,
+        })
+    for key, (gender, zh, en) in OPENAI_VOICES.items():
+        entries.append({
+            'engine': 'openai-tts', 'voice': key, 'id': key, 'language': MULTILINGUAL,
+            'gender': gender, 'description': zh, 'description_en': en,
+            'styles': [], 'sample_seconds': None,
+        })
+    return entries
+
+
+def _sample_seconds(path: Path):
+    try:
+        import soundfile as sf
+        return round(sf.info(str(path)).duration, 2)
+    except Exception:
+        # 未安装 soundfile 或格式不受支持（如 m4a）时不记录时长
+        return None
+
+
+def _scan_assets(assets_dir: Path) -> list:
+    """扫描 assets 目录顶层的参考音频；只有带同名转写文本的音频才能被 Qwen3 引擎使用"""
+    from tts_core.lang import detect_language
+
+    entries = []
+    for entry in sorted(os.scandir(assets_dir), key=lambda e: e.name):
+        path = Path(entry.path)
+        if not entry.is_file() or path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        transcript = path.with_suffix('.txt')
+        if not transcript.is_file():
+            continue
+        try:
+            text = transcript.read_text(encoding='utf-8-sig').strip()
+        except (OSError, UnicodeDecodeError):
+            text = ''
+        entries.append({
+            'engine': 'qwen3-tts', 'voice': path.stem, 'id': path.name,
+            'language': detect_language(text) if text else None, 'gender': None,
+            'description': text[:40] + ('...' if len(text) > 40 else ''),
+            'styles': [], 'sample_seconds': _sample_seconds(path),
+        })
+    return entries
+
+
+def _read_cache(key: dict):
+    try:
+        data = json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('key') != key:
+        return None
+    return data.get('voices')
+
+
+def _write_cache(key: dict, voices: list):
+    from tts_core.outputs import atomic_open
+    try:
+        with atomic_open(CACHE_FILE) as f:
+            f.write(json.dumps({'key': key, 'voices': voices}, ensure_ascii=False, indent=2).encode('utf-8'))
+    except OSError:
+        # 缓存写不进去（只读安装目录等）不影响查询
+        pass
+
+
+def _assets_stamp(assets_dir: Path) -> list:
+    """目录与其中参考音频、转写文本的最大 mtime_ns：原地改写文件不会改变目录的 mtime"""
+    newest = 0
+    for entry in os.scandir(assets_dir):
+        suffix = os.path.splitext(entry.name)[1].lower()
+        if suffix in AUDIO_EXTENSIONS or suffix == '.txt':
+            try:
+                newest = max(newest, entry.stat().st_mtime_ns)
+            except OSError:
+                continue
+    return [assets_dir.stat().st_mtime_ns, newest]
+
+
+def local_voices(assets_dir, refresh: bool = False) -> list:
+    """Qwen3 本地音色：进程内缓存 -> 磁盘缓存 -> 扫描 assets 目录"""
+    assets_dir = Path(assets_dir).resolve()
+    try:
+        mtime = _assets_stamp(assets_dir)
+    except OSError:
+        return []
+
+    memo_key = str(assets_dir)
+    cached = _memo.get(memo_key)
+    if cached and cached[0] == mtime and not refresh:
+        return cached[1]
+
+    key = {'version': CATALOG_VERSION, 'assets_dir': memo_key, 'mtime_ns': mtime}
+    voices = None if refresh else _read_cache(key)
+    if voices is None:
+        voices = _scan_assets(assets_dir)
+        _write_cache(key, voices)
+    _memo[memo_key] = (mtime, voices)
+    return voices
+
+
+def build_catalog(assets_dir, refresh: bool = False) -> list:
+    """完整音色目录：在线音色 + assets_dir 中的 Qwen3 本地音色"""
+    return _online_voices() + local_voices(assets_dir, refresh=refresh)
+
+
+def query(catalog: list, engine: str = None, lang: str = None, gender: str = None,
+          style: str = None) -> list:
+    """按条件筛选音色；lang 按前缀匹配（zh 匹配 zh-CN），多语言音色匹配任何语言"""
+    result = []
+    for voice in catalog:
+        if engine and voice['engine'] != engine:
+            continue
+        if lang:
+            language = voice['language'] or ''
+            if language != MULTILINGUAL and not language.lower().startswith(lang.lower()):
+                continue
+        if gender and voice['gender'] != gender.lower():
+            continue
+        if style and style not in voice['styles']:
+            continue
+        result.append(voice)
+    return result
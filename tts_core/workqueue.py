@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+分布式批处理工作队列
+基于单个 SQLite 文件的共享队列：协调者把清单切分为工作单元入队，
+各节点上的 worker 租用 (lease) 单元、定期心跳续租，失败或租约过期后单元重新入队
+
+队列文件需放在所有节点都能访问的共享存储上。为兼容网络文件系统，
+这里不使用 WAL 模式，租用时以 BEGIN IMMEDIATE 取得写锁，保证同一单元不会被两个 worker 同时租到。
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+UNIT_QUEUED = 'queued'
+UNIT_LEASED = 'leased'
+UNIT_DONE = 'done'
+UNIT_FAILED = 'failed'
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class WorkQueue:
+    """共享工作队列；每个线程使用各自的实例（sqlite3 连接不跨线程共享）"""
+
+    def __init__(self, path, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # isolation_level=None：由本类显式控制事务边界
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(
+            '''CREATE TABLE IF NOT EXISTS units (
+                unit_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )'''
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def enqueue(self, unit_id: str, payload: dict) -> bool:
+        """加入工作单元；同 ID 单元已存在且内容未变时保持原状态（协调者可重复执行），返回是否新入队"""
+        data = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute('SELECT payload, state FROM units WHERE unit_id = ?', (unit_id,)).fetchone()
+            if row and row['payload'] == data and row['state'] != UNIT_FAILED:
+                self.conn.execute('COMMIT')
+                return False
+            self.conn.execute(
+                '''INSERT INTO units (unit_id, payload, state, worker, lease_expires, attempts, error, updated_at)
+                   VALUES (?, ?, ?, NULL, NULL, 0, NULL, ?)
+                   ON CONFLICT(unit_id) DO UPDATE SET
+                       payload = excluded.payload, state = excluded.state, worker = NULL,
+                       lease_expires = NULL, attempts = 0, error = NULL, updated_at = excluded.updated_at''',
+                (unit_id, data, UNIT_QUEUED, time.time())
+            )
+            self.conn.execute('COMMIT')
+            return True
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def lease(self, worker: str) -> Optional[Dict]:
+        """租用一个待处理单元（含租约过期的单元），没有可租单元时返回 None"""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 租约过期且已用完重试次数的单元（worker 反复崩溃）不再重试
+            self.conn.execute(
+                '''UPDATE units SET state = ?, error = COALESCE(error, 'lease expired'), updated_at = ?
+                   WHERE state = ? AND lease_expires < ? AND attempts >= ?''',
+                (UNIT_FAILED, now, UNIT_LEASED, now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                '''SELECT * FROM units
+                   WHERE state = ? OR (state = ? AND lease_expires < ?)
+                   ORDER BY attempts, unit_id LIMIT 1''',
+                (UNIT_QUEUED, UNIT_LEASED, now)
+            ).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute(
+                '''UPDATE units SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ?
+                   WHERE unit_id = ?''',
+                (UNIT_LEASED, worker, now + self.lease_seconds, now, row['unit_id'])
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        unit = dict(row, state=UNIT_LEASED, worker=worker, lease_expires=now + self.lease_seconds,
+                    attempts=row['attempts'] + 1)
+        unit['payload'] = json.loads(unit['payload'])
+        return unit
+
+    def heartbeat(self, unit_id: str, worker: str) -> bool:
+        """续租；单元已被其他 worker 接管时返回 False"""
+        now = time.time()
+        cursor = self.conn.execute(
+            'UPDATE units SET lease_expires = ?, updated_at = ? WHERE unit_id = ? AND worker = ? AND state = ?',
+            (now + self.lease_seconds, now, unit_id, worker, UNIT_LEASED)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, unit_id: str, worker: str) -> bool:
+        cursor = self.conn.execute(
+            'UPDATE units SET state = ?, error = NULL, updated_at = ? WHERE unit_id = ? AND worker = ? AND state = ?',
+            (UNIT_DONE, time.time(), unit_id, worker, UNIT_LEASED)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, unit_id: str, worker: str, error: str = ''):
+        """处理失败：未超过重试次数时重新入队，否则标记为失败"""
+        self.conn.execute(
+            '''UPDATE units SET state = CASE WHEN attempts < ? THEN ? ELSE ? END,
+                   worker = NULL, lease_expires = NULL, error = ?, updated_at = ?
+               WHERE unit_id = ? AND worker = ? AND state = ?''',
+            (self.max_attempts, UNIT_QUEUED, UNIT_FAILED, error, time.time(), unit_id, worker, UNIT_LEASED)
+        )
+
+    def summary(self) -> Dict[str, int]:
+        counts = {UNIT_QUEUED: 0, UNIT_LEASED: 0, UNIT_DONE: 0, UNIT_FAILED: 0}
+        for row in self.conn.execute('SELECT state, COUNT(*) AS n FROM units GROUP BY state'):
+            counts[row['state']] = row['n']
+        return counts
+
+    def failures(self) -> List[Dict]:
+        rows = self.conn.execute('SELECT unit_id, attempts, error FROM units WHERE state = ?', (UNIT_FAILED,))
+        return [dict(row) for row in rows]
+
+
+class Heartbeat:
+    """后台线程定期续租，处理单元期间使用；租约丢失时 lost 被置位"""
+
+    def __init__(self, path, unit_id: str, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.unit_id = unit_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='tts-heartbeat', daemon=True)
+
+    def _run(self):
+        with WorkQueue(self.path, lease_seconds=self.lease_seconds) as queue:
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    if not queue.heartbeat(self.unit_id, self.worker):
+                        self.lost.set()
+                        return
+                except sqlite3.Error:
+                    # 共享存储短暂不可用时下个周期重试，租约足够长可以容忍
+                    continue
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()